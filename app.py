@@ -2,17 +2,22 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import altair as alt
+# altair (~0,3 s impor) hanya diimpor di halaman Dashboard; aset dimuat per halaman saat dibutuhkan
 # Import semua fungsi yang dibutuhkan dari recommender_core
 from recommender_core import (
-    load_data, load_ml_assets, calculate_station_similarity, 
-    get_hybrid_recommendation, get_actual_recommendation, 
+    load_core_frame, load_model_bundle, start_background_warmup,
+    get_actual_recommendation, 
     highlight_historical_recommendation, 
-    get_historical_pejabat_recommendation
+    load_historical_log, get_data_version,
+    load_kpi_cube_cached, get_shared_asset_version, get_model_version, load_latest_state
+)
+from kpi_cube import ringkasan_kpi
+from instrumentation import (
+    ProfilRequest, aktif as instrumentasi_aktif, metrik_json, metrik_prometheus, profil_terakhir,
+    ringkasan_tahap, tahap
 )
 # Mengambil STATION_COL_NAME dan fungsi normalisasi dari config
-from config import STATION_COL_NAME, STATION_MAP, normalize_station 
+from config import STATION_COL_NAME, normalize_station 
 
 # --- KONFIGURASI TEMA DAN JUDUL APLIKASI ---
 APP_TITLE = "Atmosfera-X: Platform Intelligent Recommendation"
@@ -41,6 +46,28 @@ def display_usage_guide():
         - **Rekomendasi Kebijakan:** Saran terperinci untuk **Pejabat Berwenang** (berdasarkan Fusi/Data Aktual) untuk tindakan Jangka Pendek (Darurat), Menengah (Mitigasi), dan Panjang (Rutin/Investasi).
         """
     )
+
+
+def display_instrumentation_panel(profil_render):
+    """Panel sidebar durasi tahap, hit/miss cache, dan profil render (hanya jika instrumentasi aktif)."""
+    if profil_render is not None:
+        profil_render.selesai()
+    with st.sidebar.expander("🔬 Instrumentasi"):
+        st.caption("Durasi per tahap sejak proses dimulai, diurutkan dari waktu *sendiri* (tanpa sub-tahap) terbesar.")
+        st.dataframe(pd.DataFrame(
+            ringkasan_tahap(), columns=['tahap', 'n', 'total_s', 'sendiri_s', 'rata_s', 'maks_s']
+        ), hide_index=True)
+        st.caption("Cache Streamlit (hit/miss)")
+        st.dataframe(pd.DataFrame.from_dict(metrik_json()['cache'], orient='index'))
+        profil = profil_terakhir('app.render')
+        if profil:
+            st.caption(f"Profil render terakhir: {profil['detik']:.3f} s, puncak memori {profil.get('puncak_mb', 0):.1f} MB")
+            st.code(profil['cprofile'])
+            st.code('\n'.join(profil.get('alokasi_teratas', [])))
+        else:
+            st.caption("Tambahkan `?profil=1` ke URL untuk merekam cProfile + tracemalloc satu render.")
+        st.download_button("Unduh metrik (Prometheus)", metrik_prometheus(), file_name="metrik_ispu.prom")
+
     
 # --- MAIN APP START ---
 st.set_page_config(
@@ -49,26 +76,27 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Muat Data dan Model
-df_full = load_data()
-scaler, cbf_model, fitur_list = load_ml_assets()
+# Instrumentasi nonaktif secara default (ISPU_INSTRUMENTASI=1); ?profil=1 merekam satu render
+profil_render = None
+if instrumentasi_aktif() and st.query_params.get('profil') == '1':
+    profil_render = ProfilRequest('app.render').mulai()
 
-if df_full.empty:
-    st.error("Gagal memuat data. Mohon pastikan file CSV dan model ada.")
-    st.stop()
-    
-# Pengaturan Tema di Sidebar (DIHAPUS)
-
-# Load aset
-sim_df = calculate_station_similarity(df_full)
+# Versi data, aset & model hanya stat/baca file kecil; data dan model dimuat di halaman yang membutuhkannya
+data_version = get_data_version()
+asset_version = get_shared_asset_version()
+model_version = get_model_version()
 
-# --- MEMBUAT DAFTAR STASIUN UNIK DAN BERSIH ---
-# 1. Terapkan normalisasi ke semua nama stasiun mentah di DataFrame
-df_full['stasiun_normal'] = df_full[STATION_COL_NAME].astype(str).apply(normalize_station)
 
-# 2. Ambil hanya nama stasiun yang unik dan sudah bersih
-all_stations_clean = sorted(df_full['stasiun_normal'].unique().tolist())
-# ===================================================================
+def load_page_data():
+    """Data kolom inti (cache per versi), atau None (pesan error sudah tampil) jika data tidak tersedia."""
+    with tahap('app.muat_data'):
+        df = load_core_frame(data_version, asset_version)
+    if df.empty:
+        st.error("Gagal memuat data. Mohon pastikan file CSV dan model ada.")
+        return None
+    return df
+    
+# Pengaturan Tema di Sidebar (DIHAPUS)
 
 
 # Header Utama Aplikasi
@@ -77,30 +105,32 @@ st.markdown("Analisis Data Kualitas Udara DKI Jakarta (2020-2025)", unsafe_allow
 st.markdown("---")
 
 
-# Sidebar untuk Navigasi
-page = st.sidebar.radio("Pilih Tampilan", ["Cara Penggunaan", "Dashboard KPI Historis", "Sistem Rekomendasi Proaktif"])
-
-if page == "Cara Penggunaan":
-    display_usage_guide()
+# Halaman berhenti lebih awal dengan `return` (bukan st.stop()), sehingga panel instrumentasi
+# dan pemanasan aset di akhir skrip tetap berjalan
+def display_kpi_dashboard():
+    """Halaman Dashboard KPI Historis."""
+    import altair as alt
 
-elif page == "Dashboard KPI Historis":
+    df_full = load_page_data()
+    if df_full is None:
+        return
     
     st.header("📈 Dashboard KPI & Tracking Rekomendasi Historis")
     st.markdown("Lacak tren polusi dan efektivitas rekomendasi aktual di masa lalu.")
     st.markdown("---")
     
     # --- Bagian 1: KPI Historis dengan FILTER TAHUN ---
-    all_years = sorted(df_full['tanggal_lengkap'].dt.year.unique())
+    # Filter tahun dijawab dari kubus KPI bulanan (agregat), bukan dengan memindai baris mentah
+    kpi_cube = load_kpi_cube_cached(data_version, df_full)
+    all_years = sorted(kpi_cube['tahun'].unique().tolist())
     selected_years = st.multiselect("Filter Tahun", options=all_years, default=all_years)
     
-    df_filtered = df_full[df_full['tanggal_lengkap'].dt.year.isin(selected_years)]
+    with tahap('app.ringkasan_kpi'):
+        kpi_monthly, pm25_global, worst_station = ringkasan_kpi(kpi_cube, selected_years, polutan='pm25')
     
-    if df_filtered.empty:
+    if kpi_monthly.empty:
         st.warning("Tidak ada data untuk tahun yang dipilih.")
-        st.stop()
-        
-    df_filtered['Bulan_Tahun'] = df_filtered['tanggal_lengkap'].dt.strftime('%Y-%m')
-    kpi_monthly = df_filtered.groupby('Bulan_Tahun')['pm25'].mean().reset_index()
+        return
     
     # 3. Metrik
     col_metric_1, col_metric_2, col_metric_3 = st.columns(3)
@@ -108,10 +138,9 @@ elif page == "Dashboard KPI Historis":
     with col_metric_1:
         st.metric(label="Periode Analisis (Terfilter)", value=f"{min(selected_years)} - {max(selected_years)}")
     with col_metric_2:
-        st.metric(label="PM2.5 Rata-rata Global (Terfilter)", value=f"{df_filtered['pm25'].mean():.2f}")
+        st.metric(label="PM2.5 Rata-rata Global (Terfilter)", value=f"{pm25_global:.2f}")
     with col_metric_3:
         # Gunakan stasiun normal untuk Kritis
-        worst_station = df_filtered[df_filtered['kategori'] == 'TIDAK SEHAT']['stasiun_normal'].mode().iloc[0] if not df_filtered.empty else "N/A"
         st.metric(label="Stasiun Paling Kritis (Terfilter)", value=worst_station)
 
     # 4. Chart dengan Altair (untuk kontrol axis miring)
@@ -127,52 +156,64 @@ elif page == "Dashboard KPI Historis":
         title='Perbandingan Kualitas Udara Bulanan'
     ).interactive()
 
-    st.altair_chart(line, use_container_width=True)
+    with tahap('app.render_grafik'):
+        st.altair_chart(line, use_container_width=True)
 
     st.markdown("---")
 
     # --- Bagian 2: Tracking Rekomendasi Historis (FINAL) ---
     st.subheader("📚 Log Rekomendasi Historis (100 Data Terbaru)")
     
-    # 1. Buat kolom Rekomendasi Aktual (Masyarakat)
-    df_full['Rekomendasi_Aktual_Masyarakat'] = df_full['kategori'].apply(get_actual_recommendation)
-    
-    # 2. Buat kolom Rekomendasi Kebijakan (Pejabat)
-    df_full['Rekomendasi_Kebijakan_Pejabat'] = df_full.apply(get_historical_pejabat_recommendation, axis=1)
-    
-    # 3. Kolom yang ditampilkan
-    df_tracking = df_full[[
-        'tanggal_lengkap', 'stasiun_normal', 'kategori', 'pm25', 'Rekomendasi_Aktual_Masyarakat', 'Rekomendasi_Kebijakan_Pejabat'
-    ]].tail(100).sort_values('tanggal_lengkap', ascending=False).reset_index(drop=True)
+    # Kolom rekomendasi dihitung sekali per versi dataset (vektor, hanya baris yang ditampilkan)
+    df_tracking = load_historical_log(data_version, df_full, n_rows=100)
     
     # 4. Tampilkan dengan styling
-    st.dataframe(
-        df_tracking.style.applymap(
-            highlight_historical_recommendation, 
-            subset=['Rekomendasi_Aktual_Masyarakat', 'Rekomendasi_Kebijakan_Pejabat']
-        ), 
-        use_container_width=True
-    )
+    with tahap('app.render_tabel_log'):
+        st.dataframe(
+            df_tracking.style.map(
+                highlight_historical_recommendation, 
+                subset=['Rekomendasi_Aktual_Masyarakat', 'Rekomendasi_Kebijakan_Pejabat']
+            ), 
+            use_container_width=True
+        )
 
 
-elif page == "Sistem Rekomendasi Proaktif":
-    
+def display_recommendation_system():
+    """Halaman Sistem Rekomendasi Proaktif (Hybrid)."""
     st.header("🔮 Sistem Rekomendasi Proaktif (Hybrid)")
     st.markdown("Gabungan rekomendasi **Aktual (sekarang)** dan **Prediksi (24 jam)** untuk tindakan proaktif.")
     st.markdown("---")
     
+    df_full = load_page_data()
+    if df_full is None:
+        return
+    with tahap('app.muat_model'):
+        # Versi model yang sedang dilayani (bisa masih versi lama selama versi baru dimuat di latar)
+        scaler, cbf_model, fitur_list, neighbour_index, versi_model = load_model_bundle(data_version, asset_version)
+
+    # --- MEMBUAT DAFTAR STASIUN UNIK DAN BERSIH ---
+    # Nama stasiun sudah kanonik sejak preprocessing; normalisasi hanya per nama unik
+    # (tetap kompatibel dengan dataset lama yang masih berisi nama alias)
+    raw_station_groups = {}
+    for raw_name in df_full[STATION_COL_NAME].astype(str).unique():
+        raw_station_groups.setdefault(normalize_station(raw_name), []).append(raw_name)
+    all_stations_clean = sorted(raw_station_groups)
+
     # --- Input Widget Simulasi ---
     selected_station = st.selectbox("Pilih Stasiun Target", options=all_stations_clean) # Menggunakan all_stations_clean
     
-    # Filter DataFrame menggunakan nama stasiun yang sudah dinormalisasi
-    df_latest_by_station = df_full[df_full['stasiun_normal'] == selected_station].sort_values('tanggal_lengkap', ascending=False)
+    # Baris terbaru, vektor terskala, dan prediksi semua stasiun dihitung sekali per versi data & model;
+    # berganti stasiun cukup lookup dict (tanpa filter + sort seluruh riwayat stasiun)
+    latest_state = load_latest_state(
+        data_version, asset_version, versi_model, df_full, scaler, cbf_model, fitur_list, neighbour_index
+    )
+    state_stasiun = latest_state.get(selected_station)
     
-    if df_latest_by_station.empty:
+    if state_stasiun is None:
         st.warning("Data tidak tersedia untuk stasiun ini.")
-        st.stop()
+        return
 
-    latest_data_row = df_latest_by_station.iloc[[0]]
-    input_df_for_hybrid = latest_data_row
+    latest_data_row = state_stasiun['baris']
     
     tanggal_aktual = latest_data_row['tanggal_lengkap'].dt.strftime('%Y-%m-%d %H:%M:%S').iloc[0]
     kategori_aktual = latest_data_row['kategori'].iloc[0]
@@ -199,10 +240,8 @@ elif page == "Sistem Rekomendasi Proaktif":
         
         st.caption(f"Saran ini berdasarkan kategori ISPU **{kategori_aktual}** yang tercatat saat ini.")
 
-    # B. Rekomendasi PREDIKSI (Masa Depan)
-    results_prediksi = get_hybrid_recommendation(
-        input_df_for_hybrid, selected_station, sim_df, scaler, cbf_model, fitur_list
-    )
+    # B. Rekomendasi PREDIKSI (Masa Depan), sudah dihitung di state terbaru
+    results_prediksi = state_stasiun['rekomendasi']
 
     with col_prediksi:
         st.markdown("#### 🔭 Prediksi (Tindakan Proaktif 24 Jam)")
@@ -215,7 +254,8 @@ elif page == "Sistem Rekomendasi Proaktif":
         else:
             st.success(f"### {rekomendasi_prediksi}")
 
-        st.caption(f"Prediksi model CBF: **{status_prediksi}** (Probabilitas TIDAK SEHAT: **{results_prediksi.get('Probabilitas TIDAK SEHAT', 0)*100:.1f}%**).")
+        st.caption(f"Prediksi model CBF: **{status_prediksi}** (Probabilitas TIDAK SEHAT: **{results_prediksi.get('Probabilitas TIDAK SEHAT', 0)*100:.1f}%**)."
+                   + (f" Versi model: `{versi_model}`." if versi_model else ""))
         
     st.markdown("---")
     
@@ -245,4 +285,23 @@ elif page == "Sistem Rekomendasi Proaktif":
 
     # --- Collaborative Filtering (CF) ---
     st.subheader("🔗 Data Insight (Collaborative Filtering)")
-    st.caption(results_prediksi['Peringatan Situasional (CF)'])
\ No newline at end of file
+    st.caption(results_prediksi['Peringatan Situasional (CF)'])
+
+
+# Sidebar untuk Navigasi
+page = st.sidebar.radio("Pilih Tampilan", ["Cara Penggunaan", "Dashboard KPI Historis", "Sistem Rekomendasi Proaktif"])
+
+if page == "Cara Penggunaan":
+    display_usage_guide()
+elif page == "Dashboard KPI Historis":
+    display_kpi_dashboard()
+elif page == "Sistem Rekomendasi Proaktif":
+    display_recommendation_system()
+
+# --- PANEL INSTRUMENTASI (hanya jika ISPU_INSTRUMENTASI=1) ---
+if instrumentasi_aktif():
+    display_instrumentation_panel(profil_render)
+
+# Halaman sudah tergambar: aset halaman berat dipanaskan di thread latar (sekali per proses & versi);
+# versi model baru dari registry ikut dimuat di sini sehingga retrain tidak perlu restart
+start_background_warmup(data_version, asset_version, model_version)
@@ -0,0 +1,416 @@
+# benchmark.py
+# Benchmark end-to-end pipeline ISPU pada data sintetis berskema sama dengan data mentah
+# (data_kualitas_udara_gabungan_final.csv): ukuran asli (~5,5 ribu baris bersih), 10x, 100x,
+# dan varian per jam. Setiap tahap diukur waktunya (median dari beberapa ulangan, tanpa
+# tracemalloc) dan puncak memorinya (satu run terpisah dengan tracemalloc). Hasil ditambahkan
+# ke benchmark_history.json beserta hash commit, sehingga regresi antar commit langsung terlihat.
+#
+# Impor level-modul app.py juga diukur di interpreter baru dan dibandingkan dengan BUDGET_IMPOR_APP.
+#
+# Jalankan:  python benchmark.py [--profil 1x 10x per_jam 100x] [--ulang N] [--render] [--ketat]
+# Output:    tabel per tahap (dibandingkan dengan run sebelumnya) dan benchmark_history.json
+
+import argparse
+import ast
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from streamlit.logger import set_log_level
+
+from config import STATION_COL_NAME, STATION_MAP
+
+HISTORY_PATH = 'benchmark_history.json'
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SEED = 42
+TANGGAL_AKHIR = '2025-08-31'
+N_PANGGILAN_TUNGGAL = 200 # Rekomendasi tunggal diukur per panggilan dari N panggilan berturut-turut
+TOLERANSI_REGRESI = 0.25 # Lebih lambat > 25% dari run sebelumnya (profil sama) = regresi
+MIN_SELISIH_REGRESI = 0.005 # Detik; selisih lebih kecil dianggap noise pengukuran
+BUDGET_IMPOR_APP = 1.0 # Detik; impor level-modul app.py di interpreter baru (cold start replika)
+HALAMAN_APP = ['Cara Penggunaan', 'Dashboard KPI Historis', 'Sistem Rekomendasi Proaktif']
+
+# Ukuran data mentah per profil; '1x' setara data asli (5 stasiun, 2020-2025)
+PROFIL = {
+    '1x': {'n_stasiun': 5, 'n_hari': 1100, 'frekuensi': 'D'},
+    '10x': {'n_stasiun': 25, 'n_hari': 2200, 'frekuensi': 'D'},
+    '100x': {'n_stasiun': 50, 'n_hari': 11000, 'frekuensi': 'D'},
+    'per_jam': {'n_stasiun': 5, 'n_hari': 1100, 'frekuensi': 'h'}, # Rentang sama dengan 1x, 24 baris per hari
+}
+PROFIL_DEFAULT = ['1x', '10x', 'per_jam'] # 100x (~550 ribu baris) hanya jika diminta eksplisit
+
+# Mean & persentase NaN per polutan, kira-kira mengikuti data asli
+POLUTAN_SINTETIS = {
+    'pm10': (52.0, 0.06), 'pm25': (76.0, 0.11), 'so2': (37.0, 0.03),
+    'co': (14.0, 0.02), 'o3': (31.0, 0.02), 'no2': (22.0, 0.02),
+}
+PARAMETER_KRITIS = {'pm10': 'PM10', 'pm25': 'PM25', 'so2': 'SO2', 'co': 'CO', 'o3': 'O3', 'no2': 'NO2'}
+
+
+# --- A. DATA SINTETIS ---
+def nama_stasiun_sintetis(n_stasiun):
+    """5 stasiun kanonik dari config.STATION_MAP, sisanya 'DKI{n} Sintetis' (id 0)."""
+    kanonik = sorted(set(STATION_MAP.values()))
+    return kanonik[:n_stasiun] + [f"DKI{i} Sintetis" for i in range(len(kanonik) + 1, n_stasiun + 1)]
+
+
+def buat_data_sintetis(n_stasiun, n_hari, frekuensi='D', seed=SEED):
+    """DataFrame mentah sintetis: musiman tahunan + pola mingguan + offset stasiun + noise, dengan NaN."""
+    rng = np.random.default_rng(seed)
+    per_hari = 24 if frekuensi == 'h' else 1
+    akhir = pd.Timestamp(TANGGAL_AKHIR) + pd.Timedelta(hours=23 if per_hari == 24 else 0)
+    waktu = pd.date_range(end=akhir, periods=n_hari * per_hari, freq=frekuensi)
+    stasiun = nama_stasiun_sintetis(n_stasiun)
+
+    n_waktu = len(waktu)
+    tanggal = np.tile(waktu, len(stasiun))
+    idx_stasiun = np.repeat(np.arange(len(stasiun)), n_waktu)
+    musim = np.tile(np.sin(2 * np.pi * waktu.dayofyear.to_numpy() / 365.25), len(stasiun))
+    hari_kerja = np.tile((waktu.dayofweek.to_numpy() < 5).astype(float), len(stasiun))
+
+    df = pd.DataFrame({'tanggal_lengkap': pd.DatetimeIndex(tanggal)})
+    for polutan, (mean, porsi_nan) in POLUTAN_SINTETIS.items():
+        offset = rng.normal(0, 0.1 * mean, len(stasiun))[idx_stasiun]
+        nilai = mean * (1 + 0.25 * musim + 0.08 * hari_kerja) + offset + rng.normal(0, 0.3 * mean, len(df))
+        nilai = np.round(np.clip(nilai, 1, None))
+        nilai[rng.random(len(df)) < porsi_nan] = np.nan
+        df[polutan] = nilai
+
+    polutan = list(POLUTAN_SINTETIS)
+    X = df[polutan].to_numpy()
+    ada = ~np.isnan(X).all(axis=1)
+    df['max_ispu'] = np.where(ada, np.nanmax(np.where(np.isnan(X), -np.inf, X), axis=1), np.nan)
+    kritis = np.array([PARAMETER_KRITIS[p] for p in polutan], dtype=object)[np.nanargmax(np.where(np.isnan(X), -np.inf, X), axis=1)]
+    df['parameter_kritis'] = np.where(ada, kritis, None)
+    df['kategori'] = pd.cut(
+        df['max_ispu'], [-np.inf, 50, 100, 200, np.inf],
+        labels=['BAIK', 'SEDANG', 'TIDAK SEHAT', 'SANGAT TIDAK SEHAT']
+    ).astype(object).where(ada, 'TIDAK ADA DATA')
+
+    df['periode_data'] = df['tanggal_lengkap'].dt.year * 100 + df['tanggal_lengkap'].dt.month
+    df['tahun'] = df['tanggal_lengkap'].dt.year.astype(float)
+    df['bulan'] = df['tanggal_lengkap'].dt.month.astype(float)
+    df['hari'] = df['tanggal_lengkap'].dt.day.astype(float)
+    df['stasiun'] = np.array(stasiun, dtype=object)[idx_stasiun]
+    if per_hari == 1:
+        df['tanggal_lengkap'] = df['tanggal_lengkap'].dt.strftime('%Y-%m-%d')
+    return df[['periode_data', 'tanggal_lengkap', 'tahun', 'bulan', 'hari', 'stasiun', *polutan,
+               'max_ispu', 'parameter_kritis', 'kategori']]
+
+
+# --- B. PENGUKURAN ---
+def ukur(fungsi, ulang=3, n_panggilan=1, memori=True, persiapan=None):
+    """Median & minimum detik (per panggilan) dari `ulang` run, lalu puncak memori dari satu run tracemalloc.
+
+    `persiapan` (opsional) dijalankan sebelum setiap run, di luar pengukuran.
+    """
+    durasi = []
+    for _ in range(ulang):
+        if persiapan is not None:
+            persiapan()
+        mulai = time.perf_counter()
+        fungsi()
+        durasi.append((time.perf_counter() - mulai) / n_panggilan)
+
+    hasil = {'detik': float(np.median(durasi)), 'detik_min': float(min(durasi)), 'ulang': ulang}
+    if memori:
+        if persiapan is not None:
+            persiapan()
+        tracemalloc.start()
+        try:
+            fungsi()
+            hasil['puncak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return hasil
+
+
+def _tanpa_output(fungsi):
+    """Membungkus fungsi pipeline agar log print/emoji-nya tidak ikut mengotori tabel benchmark."""
+    def jalankan():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fungsi()
+    return jalankan
+
+
+def _bersihkan_cache_streamlit():
+    import streamlit as st
+    set_log_level('error') # AppTest memuat ulang konfigurasi log Streamlit setiap run
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def _tunggu_pemanasan():
+    """Menunggu thread pemanasan aset app.py (recommender_core.start_background_warmup) selesai."""
+    from recommender_core import NAMA_THREAD_PEMANASAN
+    for thread in threading.enumerate():
+        if thread.name == NAMA_THREAD_PEMANASAN:
+            thread.join()
+
+
+def _siapkan_render():
+    _tunggu_pemanasan()
+    _bersihkan_cache_streamlit()
+
+
+# --- C. TAHAPAN YANG DIUKUR ---
+def tahapan_benchmark(ulang, render=False):
+    """Daftar (nama, fungsi, ulang, n_panggilan, persiapan); dijalankan di direktori kerja berisi data mentah."""
+    import streamlit as st
+
+    import preprocessing
+    import recommender_core as rc
+    from kpi_cube import ringkasan_kpi
+
+    konteks = {}
+
+    def build():
+        preprocessing.build_assets_and_train()
+
+    def muat_dingin():
+        rc.load_data.clear()
+        konteks['df'] = rc.load_data(data_version=rc.get_data_version())
+
+    def muat_hangat():
+        rc.load_data(data_version=rc.get_data_version())
+
+    def aset():
+        st.cache_resource.clear()
+        konteks['scaler'], konteks['model'], konteks['fitur'] = rc.load_ml_assets()
+        konteks['tetangga'] = rc.load_neighbour_index(rc.get_data_version())
+
+    def similarity():
+        rc.calculate_station_similarity(konteks['df'])
+
+    def tunggal():
+        df = konteks['df']
+        for i in range(N_PANGGILAN_TUNGGAL):
+            baris = df.iloc[[len(df) - 1 - i % len(df)]]
+            rc.get_hybrid_recommendation(
+                baris, baris[STATION_COL_NAME].iloc[0], konteks['tetangga'],
+                konteks['scaler'], konteks['model'], konteks['fitur']
+            )
+
+    def batch():
+        df = konteks['df']
+        rc.get_hybrid_recommendation_batch(
+            df, df[STATION_COL_NAME].to_numpy(), konteks['tetangga'],
+            konteks['scaler'], konteks['model'], konteks['fitur']
+        )
+
+    def dashboard():
+        # Jalur agregasi halaman Dashboard di app.py, dengan cache dingin
+        rc.load_data.clear()
+        rc.load_kpi_cube_cached.clear()
+        rc.load_historical_log.clear()
+        versi = rc.get_data_version()
+        df_inti = rc.load_data(columns=rc.KOLOM_INTI, data_version=versi)
+        cube = rc.load_kpi_cube_cached(versi, df_inti)
+        ringkasan_kpi(cube, sorted(cube['tahun'].unique().tolist()), polutan='pm25')
+        rc.load_historical_log(versi, df_inti)
+
+    tahap = [
+        ('build_assets_and_train', _tanpa_output(build), 1, 1, None),
+        ('load_data_dingin', muat_dingin, ulang, 1, None),
+        ('load_data_hangat', muat_hangat, ulang, 1, None),
+        ('load_aset_model', aset, ulang, 1, None),
+        ('calculate_station_similarity', similarity, ulang, 1, None),
+        ('hybrid_tunggal', tunggal, ulang, N_PANGGILAN_TUNGGAL, None),
+        ('hybrid_batch', batch, ulang, 1, None),
+        ('dashboard_agregasi', dashboard, ulang, 1, None),
+    ]
+    if render:
+        # Cache dingin per render; thread pemanasan run sebelumnya ditunggu di luar pengukuran
+        for halaman in HALAMAN_APP:
+            tahap.append((f"render_{halaman.split()[0].lower()}", _render_halaman(halaman), ulang, 1, _siapkan_render))
+    return tahap
+
+
+def _render_halaman(halaman):
+    """Run penuh app.py (Streamlit AppTest) sampai halaman `halaman` tampil."""
+    def render():
+        from streamlit.testing.v1 import AppTest
+        at = AppTest.from_file(os.path.join(REPO_DIR, 'app.py'), default_timeout=600)
+        at.run()
+        if halaman != HALAMAN_APP[0]: # Halaman pertama = halaman default radio
+            at.sidebar.radio[0].set_value(halaman).run()
+        if at.exception:
+            raise RuntimeError(f"app.py gagal dirender ({halaman}): {at.exception[0].value}")
+    return render
+
+
+def jalankan_profil(nama, ulang=3, render=False, memori=True):
+    """Membuat data mentah profil di direktori sementara, lalu mengukur semua tahap di sana."""
+    spesifikasi = PROFIL[nama]
+    df_mentah = buat_data_sintetis(**spesifikasi)
+    asal = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f"bench_ispu_{nama}_") as kerja:
+        # Semua path aset relatif terhadap direktori kerja (lihat config.py / preprocessing.py)
+        os.chdir(kerja)
+        try:
+            import preprocessing
+            df_mentah.to_csv(preprocessing.FILE_DATA, index=False)
+            _bersihkan_cache_streamlit()
+            hasil = {}
+            for tahap, fungsi, n_ulang, n_panggilan, persiapan in tahapan_benchmark(ulang, render):
+                hasil[tahap] = ukur(fungsi, n_ulang, n_panggilan, memori, persiapan)
+                print(f"   ⏱️ {tahap:<30} {hasil[tahap]['detik']:>9.4f} s")
+            n_bersih = len(pd.read_csv(preprocessing.OUTPUT_FILE_ADVANCED, usecols=['stasiun']))
+        finally:
+            _tunggu_pemanasan() # Thread latar tidak boleh membaca direktori yang akan dihapus
+            os.chdir(asal)
+            _bersihkan_cache_streamlit()
+    return {**spesifikasi, 'n_baris_mentah': len(df_mentah), 'n_baris_bersih': n_bersih, 'tahap': hasil}
+
+
+def ukur_impor_app(ulang=3, n_teratas=5):
+    """Waktu impor level-modul app.py di interpreter baru (median) dan modul teratas (-X importtime)."""
+    with open(os.path.join(REPO_DIR, 'app.py'), encoding='utf-8') as f:
+        pohon = ast.parse(f.read())
+    impor = [ast.unparse(node) for node in pohon.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    kode = "import time\nmulai = time.perf_counter()\n" + "\n".join(impor) + "\nprint(time.perf_counter() - mulai)"
+
+    def jalankan(*opsi):
+        return subprocess.run([sys.executable, *opsi, '-c', kode], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True)
+
+    durasi = [float(jalankan().stdout.split()[-1]) for _ in range(ulang)]
+
+    # Baris stderr: "import time: <self us> | <kumulatif us> | <modul>" (modul tingkat atas tanpa indentasi)
+    teratas = []
+    for baris in jalankan('-X', 'importtime').stderr.splitlines():
+        bagian = baris.split('|')
+        if len(bagian) == 3 and bagian[1].strip().isdigit() and not bagian[2].startswith('  '):
+            teratas.append((bagian[2].strip(), int(bagian[1]) / 1e6))
+    teratas.sort(key=lambda t: t[1], reverse=True)
+    return {'detik': float(np.median(durasi)), 'detik_min': float(min(durasi)), 'ulang': ulang,
+            'modul_teratas': dict(teratas[:n_teratas])}
+
+
+# --- D. RIWAYAT & PERBANDINGAN ---
+def info_commit():
+    """Hash commit HEAD & status tree kotor (None jika bukan repo git)."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        kotor = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip() != ''
+        return commit, kotor
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def muat_riwayat(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def simpan_riwayat(riwayat, path=HISTORY_PATH):
+    sementara = f"{path}.tmp"
+    with open(sementara, 'w', encoding='utf-8') as f:
+        json.dump(riwayat, f, indent=2)
+    os.replace(sementara, path)
+
+
+def run_sebelumnya(riwayat, profil, hasil_profil):
+    """Run terakhir di riwayat dengan profil & ukuran data yang sama (pembanding regresi)."""
+    for run in reversed(riwayat):
+        lama = run['profil'].get(profil)
+        if lama and lama['n_baris_mentah'] == hasil_profil['n_baris_mentah']:
+            return run, lama
+    return None, None
+
+
+def cetak_tabel(profil, hasil_profil, run_lama, hasil_lama, toleransi=TOLERANSI_REGRESI):
+    """Tabel per tahap; mengembalikan daftar tahap yang lebih lambat dari toleransi."""
+    acuan = f"vs {run_lama['commit'] or run_lama['waktu']}" if run_lama else "vs (belum ada)"
+    print(f"\n📊 Profil {profil}: {hasil_profil['n_baris_mentah']:,} baris mentah, "
+          f"{hasil_profil['n_baris_bersih']:,} baris bersih")
+    print(f"   {'tahap':<30} {'detik':>10} {'puncak MB':>10} {acuan:>16}")
+    regresi = []
+    for tahap, m in hasil_profil['tahap'].items():
+        lama = (hasil_lama or {}).get('tahap', {}).get(tahap)
+        rasio = m['detik'] / lama['detik'] if lama and lama['detik'] > 0 else None
+        tanda = ''
+        if rasio is not None and rasio > 1 + toleransi and m['detik'] - lama['detik'] > MIN_SELISIH_REGRESI:
+            tanda = ' ⚠️'
+            regresi.append(f"{profil}/{tahap}")
+        banding = f"{rasio:.2f}x{tanda}" if rasio is not None else '-'
+        puncak = f"{m['puncak_mb']:.1f}" if 'puncak_mb' in m else '-'
+        print(f"   {tahap:<30} {m['detik']:>10.4f} {puncak:>10} {banding:>16}")
+    return regresi
+
+
+def jalankan_benchmark(profil=PROFIL_DEFAULT, ulang=3, render=False, memori=True,
+                       history_path=HISTORY_PATH, toleransi=TOLERANSI_REGRESI, budget_impor=BUDGET_IMPOR_APP):
+    set_log_level('error') # Peringatan "No runtime found" dsb. dari mode bare Streamlit
+    history_path = os.path.abspath(history_path)
+    commit, kotor = info_commit()
+    print(f"--- 🏁 BENCHMARK PIPELINE ISPU (commit {commit}{' + perubahan lokal' if kotor else ''}) ---")
+
+    run = {
+        'waktu': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'tree_kotor': kotor,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpu': os.cpu_count(),
+        'ulang': ulang,
+        'profil': {},
+    }
+    run['impor_app'] = ukur_impor_app(ulang)
+    print(f"   ⏱️ {'impor_app':<30} {run['impor_app']['detik']:>9.4f} s (budget {budget_impor:.2f} s)")
+    for nama in profil:
+        print(f"\n--- 🧪 PROFIL {nama}: {PROFIL[nama]} ---")
+        run['profil'][nama] = jalankan_profil(nama, ulang, render, memori)
+
+    riwayat = muat_riwayat(history_path)
+    regresi = []
+    for nama, hasil_profil in run['profil'].items():
+        run_lama, hasil_lama = run_sebelumnya(riwayat, nama, hasil_profil)
+        regresi += cetak_tabel(nama, hasil_profil, run_lama, hasil_lama, toleransi)
+
+    impor = run['impor_app']
+    teratas = ', '.join(f"{modul} {detik:.2f} s" for modul, detik in impor['modul_teratas'].items())
+    lama = next((r['impor_app']['detik'] for r in reversed(riwayat) if 'impor_app' in r), None)
+    banding = f", sebelumnya {lama:.3f} s" if lama is not None else ''
+    print(f"\n📦 Impor app.py: {impor['detik']:.3f} s (budget {budget_impor:.2f} s{banding}) | terberat: {teratas}")
+    if impor['detik'] > budget_impor:
+        regresi.append('impor_app (melebihi budget)')
+
+    riwayat.append(run)
+    simpan_riwayat(riwayat, history_path)
+    print(f"\n✅ Hasil ditambahkan ke riwayat: {history_path} ({len(riwayat)} run)")
+    if regresi:
+        print(f"⚠️ Regresi (lebih lambat > {toleransi:.0%} dari run sebelumnya / melebihi budget): {', '.join(regresi)}")
+    return run, regresi
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark pipeline ISPU pada data sintetis.")
+    parser.add_argument('--profil', nargs='+', choices=list(PROFIL), default=PROFIL_DEFAULT,
+                        help="Profil ukuran data (default: 1x 10x per_jam)")
+    parser.add_argument('--ulang', type=int, default=3, help="Jumlah ulangan pengukuran waktu per tahap")
+    parser.add_argument('--render', action='store_true', help="Ukur juga render penuh app.py (Streamlit AppTest)")
+    parser.add_argument('--tanpa-memori', action='store_true', help="Lewati run tracemalloc (lebih cepat)")
+    parser.add_argument('--toleransi', type=float, default=TOLERANSI_REGRESI, help="Ambang regresi (0.25 = 25%%)")
+    parser.add_argument('--budget-impor', type=float, default=BUDGET_IMPOR_APP, help="Budget impor app.py (detik)")
+    parser.add_argument('--ketat', action='store_true', help="Exit code 1 jika ada regresi (untuk CI)")
+    args = parser.parse_args()
+    _, regresi = jalankan_benchmark(args.profil, args.ulang, args.render, not args.tanpa_memori,
+                                    toleransi=args.toleransi, budget_impor=args.budget_impor)
+    sys.exit(1 if args.ketat and regresi else 0)
@@ -1,16 +1,67 @@
 # config.py
 
+import json
 import os
 
+import numpy as np
+
 # --- KONFIGURASI PATH FILE ---
 FILE_ADVANCED = 'data_ispu_preprocess_final_ADVANCED.csv'
 MODEL_CBF_PATH = 'model_cbf_rekomendasi.pkl'
 SCALER_PATH = 'scaler_rekomendasi.pkl'
 FITUR_LIST_PATH = 'fitur_list.pkl'
+THRESHOLD_CBF_PATH = 'threshold_cbf_rekomendasi.pkl' # Threshold model .pkl lepas (ditulis bersama model/scaler/fitur)
+KPI_CUBE_PATH = 'kpi_cube_bulanan.csv' # Agregat stasiun x bulan x polutan untuk dashboard
+IMPUTER_PATH = 'imputer_ispu.pkl' # Imputer per stasiun; atribut cutoff = awal periode uji (split tanggal)
+SIMILARITY_STATE_PATH = 'similarity_state.pkl' # Statistik cukup kesamaan stasiun (semua polutan)
+NEIGHBOUR_INDEX_PATH = 'neighbour_index.pkl' # Top-k tetangga per stasiun kanonik untuk langkah CF
+LINEAR_SCORER_PATH = 'model_cbf_linear.npz' # Scaler + model dilipat (tanpa sklearn saat inferensi)
+FEATURE_STORE_DIR = 'feature_store_ispu' # Parquet terpartisi tahun/stasiun (format serving utama)
+SHARED_ASSET_PATH = 'aset_bersama_ispu.bin' # Fitur + kesamaan + bobot model dalam satu file memory-mapped
+BEST_CONFIG_PATH = 'best_config.json' # Konfigurasi terbaik hasil tuning walk-forward (tuning.py)
+FORECAST_MODEL_PATH = 'model_forecast_ispu.npz' # Registry model prakiraan per stasiun x horizon (forecast.py)
+MODEL_REGISTRY_DIR = 'registry_model_ispu' # Satu direktori ber-hash isi per run pelatihan + pointer versi aktif
+N_VERSI_DISIMPAN = 14 # Versi model lama yang dipertahankan untuk rollback (2 minggu retrain harian)
+
+# --- PARAMETER MODEL CBF ---
+# Label bobot kelas -> nilai class_weight sklearn (label dipakai di leaderboard & best_config.json)
+BOBOT_KELAS = {
+    'none': None,
+    'balanced': 'balanced',
+    '1:3': {0: 1, 1: 3},
+}
+KONFIG_MODEL_DEFAULT = {'window': '7D', 'C': 1.0, 'class_weight': 'balanced', 'threshold': 0.70}
+
+
+def _konfig_tersimpan(default, path=BEST_CONFIG_PATH):
+    """Konfigurasi model dari best_config.json (hasil tuning.py); kembali ke default jika belum ada/rusak.
+
+    Threshold hanya berlaku untuk C, bobot kelas, dan window yang dituning bersamanya, jadi
+    keempatnya dibaca sekaligus: file yang tidak lengkap dianggap tidak ada.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            tersimpan = json.load(f)
+        konfig = {
+            'window': str(tersimpan['window']),
+            'C': float(tersimpan['C']),
+            'class_weight': tersimpan['class_weight'],
+            'threshold': float(tersimpan['threshold']),
+        }
+        if konfig['class_weight'] not in BOBOT_KELAS:
+            return dict(default)
+        return konfig
+    except (OSError, ValueError, KeyError, TypeError):
+        return dict(default)
+
+
+# Dipakai build penuh/streaming untuk melatih model produksi (preprocessing.py)
+KONFIG_MODEL = _konfig_tersimpan(KONFIG_MODEL_DEFAULT)
 
 # --- PARAMETER REKOMENDASI ---
-OPTIMAL_THRESHOLD = 0.70 
+OPTIMAL_THRESHOLD = KONFIG_MODEL['threshold']
 STATION_COL_NAME = 'stasiun' 
+POLUTAN_COLS = ['pm10', 'pm25', 'so2', 'co', 'o3', 'no2']
 
 # Mapping untuk output rekomendasi tindak lanjut (Masyarakat)
 REKOMENDASI_TINDAKAN = {
@@ -18,6 +69,33 @@ REKOMENDASI_TINDAKAN = {
     1: "WASPADA TINGKAT TINGGI! Kualitas Udara diprediksi TIDAK SEHAT. Wajib gunakan masker N95 dan batasi aktivitas fisik di luar ruangan.",
 }
 
+# --- TEKS REKOMENDASI KEBIJAKAN PER TINGKAT (Fusion) ---
+REKOMENDASI_PEJABAT = {
+    'DARURAT': (
+        "TINDAKAN DARURAT: Terapkan kebijakan WFH atau pembatasan kendaraan berat (genap-ganjil) di zona ini selama 24 jam ke depan. "
+        "PERENCANAAN JANGKA MENENGAH: Segera finalisasi insentif bagi pengguna kendaraan listrik dan percepat konversi transportasi publik ke energi bersih."
+    ),
+    'MITIGASI': (
+        "PERKETAT UJI EMISI: Lakukan uji emisi mendadak di jalanan dan di titik keluar/masuk kawasan industri terdekat. "
+        "TATA RUANG: Kaji ulang izin operasional industri yang berdekatan. Tingkatkan efisiensi jalur Transjakarta dan KRL untuk mengurangi penggunaan mobil pribadi."
+    ),
+    'RUTIN': (
+        "PEMBANGUNAN BERKELANJUTAN: Lanjutkan pemantauan rutin dan investasikan dana untuk proyek "
+        "hijau seperti pengembangan kawasan bebas kendaraan bermotor (Low Emission Zone) dan penambahan 20% Ruang Terbuka Hijau (RTH) di lokasi korelasi tinggi."
+    ),
+}
+
+
+def hitung_tier_kebijakan(pm25, hari_dalam_minggu):
+    """Menentukan tingkat kebijakan (DARURAT/MITIGASI/RUTIN) secara vektor dari PM2.5 dan hari."""
+    pm25 = np.asarray(pm25, dtype=float)
+    is_weekday = np.asarray(hari_dalam_minggu, dtype=float) < 5
+    return np.select(
+        [pm25 > 100, (pm25 > 70) & is_weekday],
+        ['DARURAT', 'MITIGASI'],
+        default='RUTIN'
+    )
+
 # --- PERBAIKAN: STATION MAP DAN FUNGSI NORMALISASI ---
 STATION_MAP = {
     'DKI1': 'DKI1 Bunderan HI', 'DKI1 Bunderan HI': 'DKI1 Bunderan HI',
@@ -41,4 +119,13 @@ def normalize_station(station_name):
         if parts and parts[0] in ['DKI1', 'DKI2', 'DKI3', 'DKI4', 'DKI5']:
              return STATION_MAP.get(parts[0], standardized)
         return standardized 
-    return station_name
\ No newline at end of file
+    return station_name
+
+# --- TABEL ID STASIUN KANONIK (dipakai sekali saat ingest) ---
+# ID kecil (int8) untuk setiap stasiun kanonik; 0 = stasiun tidak dikenal
+STATION_IDS = {nama: i for i, nama in enumerate(sorted(set(STATION_MAP.values())), start=1)}
+STATION_NAMES = {i: nama for nama, i in STATION_IDS.items()}
+
+def station_id(station_name):
+    """ID kanonik sebuah nama stasiun mentah (0 jika tidak dikenal)."""
+    return STATION_IDS.get(normalize_station(station_name), 0)
\ No newline at end of file
@@ -0,0 +1,273 @@
+# evaluation.py
+# Evaluasi model CBF satu kali jalan: data uji di-skor SEKALI, probabilitasnya disimpan,
+# lalu confusion matrix, kurva PR/ROC, dan metrik per stasiun/musim untuk SEMUA threshold
+# dihitung dalam satu sapuan vektor. Hasil ditulis sebagai laporan JSON.
+#
+# Jalankan:  python evaluation.py [--threshold 0.6] [--paksa]
+
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import average_precision_score, precision_recall_curve, roc_auc_score, roc_curve
+
+from config import (
+    FILE_ADVANCED, FITUR_LIST_PATH, IMPUTER_PATH, MODEL_CBF_PATH, MODEL_REGISTRY_DIR, SCALER_PATH,
+    STATION_COL_NAME
+)
+from hybrid_core import muat_aset_pkl, threshold_model
+from imputer import mask_uji
+from linear_scorer import fold_scaler_into_model
+from model_registry import ModelVersion, active_version
+
+PREDIKSI_CACHE_PATH = 'prediksi_uji_cbf.npz'
+LAPORAN_PATH = 'laporan_evaluasi_cbf.json'
+TARGET_COL = 'kategori_TIDAK SEHAT'
+
+THRESHOLDS = np.round(np.linspace(0.0, 1.0, 101), 2)
+BETA = 2.0 # F-beta untuk rekomendasi threshold (recall TIDAK SEHAT diutamakan)
+
+# Kolom 'musim' dari preprocessing.tambah_fitur_waktu: (bulan % 12 + 3) // 3
+NAMA_MUSIM = {1: 'Des-Feb', 2: 'Mar-Mei', 3: 'Jun-Agu', 4: 'Sep-Nov'}
+LABEL_KELAS = ['0 (AMAN/SEDANG)', '1 (TIDAK SEHAT)']
+
+
+# --- A. SKOR SEKALI, SIMPAN PROBABILITAS ---
+def _tanda_file(*paths):
+    """Versi gabungan beberapa file (mtime_ns-size), untuk invalidasi cache prediksi."""
+    return '|'.join(f"{os.stat(p).st_mtime_ns}-{os.stat(p).st_size}" for p in paths)
+
+
+def _versi_model(root=MODEL_REGISTRY_DIR):
+    """Versi aktif registry, atau tanda file .pkl lepas jika registry kosong."""
+    return active_version(root) or _tanda_file(MODEL_CBF_PATH, SCALER_PATH, FITUR_LIST_PATH, IMPUTER_PATH)
+
+
+def muat_model_evaluasi(root=MODEL_REGISTRY_DIR):
+    """(versi, scorer, cutoff_uji) model yang dievaluasi beserta definisi split-nya.
+
+    Utama: versi aktif registry (scorer yang benar-benar dilayani) dengan cutoff uji yang
+    tercatat di manifest-nya. Registry kosong: .pkl lepas (threshold dari file pendampingnya),
+    cutoff dari imputer_ispu.pkl.
+    """
+    versi = active_version(root)
+    if versi is None:
+        scaler, cbf_model, fitur_list = muat_aset_pkl()
+        scorer = fold_scaler_into_model(scaler, cbf_model, fitur_list, threshold_model(cbf_model))
+        return _versi_model(root), scorer, joblib.load(IMPUTER_PATH).cutoff
+    model = ModelVersion(versi, root)
+    pelatihan = model.manifest.get('pelatihan', {})
+    cutoff = pelatihan.get('cutoff_uji', pelatihan.get('cutoff_imputasi'))
+    if cutoff is None:
+        cutoff = joblib.load(IMPUTER_PATH).cutoff # Versi lama tanpa definisi split
+    return versi, model.scorer, cutoff
+
+
+def skor_data_uji(paksa=False, cache_path=PREDIKSI_CACHE_PATH, root=MODEL_REGISTRY_DIR):
+    """Probabilitas TIDAK SEHAT pada data uji, beserta label, stasiun, dan musim.
+
+    Hasil di-cache ke .npz; selama dataset ADVANCED dan versi model tidak berubah,
+    pemanggilan berikutnya tidak memuat model maupun men-skor ulang.
+    """
+    versi = f"{_tanda_file(FILE_ADVANCED)}|{_versi_model(root)}"
+    if not paksa and os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as cache:
+            if str(cache['versi']) == versi:
+                return {k: cache[k] for k in cache.files}
+
+    versi_model, scorer, cutoff = muat_model_evaluasi(root)
+    kolom = ['tanggal_lengkap', STATION_COL_NAME, 'musim', TARGET_COL] + scorer.fitur_list
+    df = pd.read_csv(FILE_ADVANCED, usecols=lambda c: c in kolom, parse_dates=['tanggal_lengkap'])
+
+    # Split tanggal yang tersimpan bersama model (tanggal >= cutoff = data uji). Baris hasil
+    # --inkremental selalu sesudah cutoff, jadi masuk data uji, tidak pernah data latih.
+    uji = df[mask_uji(df['tanggal_lengkap'], cutoff)]
+
+    hasil = {
+        'versi': np.array(f"{_tanda_file(FILE_ADVANCED)}|{versi_model}"),
+        'versi_model': np.array(versi_model),
+        'threshold_model': np.array(scorer.threshold),
+        'proba': scorer.predict_proba(uji[scorer.fitur_list]), # Kolom hilang/NaN = 0, sama seperti pelatihan
+        'y': uji[TARGET_COL].astype(bool).to_numpy(),
+        'stasiun': uji[STATION_COL_NAME].to_numpy(dtype=str),
+        'musim': uji['musim'].to_numpy(dtype=np.int8),
+        'n_total': np.array(len(df)),
+        'cutoff_uji': np.array(str(cutoff)[:10]),
+    }
+    np.savez(cache_path, **hasil)
+    return hasil
+
+
+# --- B. SAPUAN THRESHOLD (vektor) ---
+def konfusi_per_threshold(y, proba, thresholds=THRESHOLDS):
+    """(tp, fp, fn, tn) untuk setiap threshold sekaligus, prediksi positif = proba >= threshold.
+
+    Probabilitas diurutkan sekali per kelas lalu dicari dengan searchsorted,
+    jadi biayanya O((n + T) log n), bukan satu pass data per threshold.
+    """
+    y = np.asarray(y, dtype=bool)
+    proba = np.asarray(proba, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    pos, neg = np.sort(proba[y]), np.sort(proba[~y])
+    fn = np.searchsorted(pos, thresholds, side='left')
+    tn = np.searchsorted(neg, thresholds, side='left')
+    tp = len(pos) - fn
+    fp = len(neg) - tn
+    return tp, fp, fn, tn
+
+
+def metrik_per_threshold(y, proba, thresholds=THRESHOLDS, beta=BETA):
+    """Confusion matrix dan presisi/recall/F1/F-beta/akurasi untuk setiap threshold (dict of array)."""
+    tp, fp, fn, tn = konfusi_per_threshold(y, proba, thresholds)
+    presisi = tp / np.maximum(tp + fp, 1)
+    recall = tp / np.maximum(tp + fn, 1)
+    b2 = beta ** 2
+    return {
+        'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn,
+        'presisi': presisi,
+        'recall': recall,
+        'f1': 2 * presisi * recall / np.maximum(presisi + recall, 1e-12),
+        f'f{beta:g}': (1 + b2) * presisi * recall / np.maximum(b2 * presisi + recall, 1e-12),
+        'akurasi': (tp + tn) / np.maximum(tp + fp + fn + tn, 1),
+    }
+
+
+def _indeks_threshold(threshold, thresholds=THRESHOLDS):
+    return int(np.argmin(np.abs(np.asarray(thresholds) - threshold)))
+
+
+def _json_metrik(metrik, i=None):
+    """Array metrik -> list (atau nilai pada indeks threshold i) yang bisa ditulis ke JSON."""
+    if i is None:
+        return {k: np.round(v, 6).tolist() if v.dtype.kind == 'f' else v.tolist() for k, v in metrik.items()}
+    return {k: round(float(v[i]), 6) if v.dtype.kind == 'f' else int(v[i]) for k, v in metrik.items()}
+
+
+def _auc_aman(fungsi, y, proba):
+    # AUC tidak terdefinisi jika grup hanya berisi satu kelas
+    return round(float(fungsi(y, proba)), 6) if 0 < y.sum() < len(y) else None
+
+
+def metrik_grup(y, proba, grup, threshold, thresholds=THRESHOLDS):
+    """Metrik per nilai grup (stasiun/musim): ringkasan pada threshold aktif + sapuan penuh."""
+    i = _indeks_threshold(threshold, thresholds)
+    hasil = {}
+    for nilai in sorted(np.unique(grup)):
+        mask = grup == nilai
+        metrik = metrik_per_threshold(y[mask], proba[mask], thresholds)
+        hasil[str(nilai)] = {
+            'n': int(mask.sum()),
+            'n_tidak_sehat': int(y[mask].sum()),
+            'roc_auc': _auc_aman(roc_auc_score, y[mask], proba[mask]),
+            'pada_threshold': _json_metrik(metrik, i),
+            'sapuan': _json_metrik(metrik),
+        }
+    return hasil
+
+
+# --- C. LAPORAN ---
+def buat_laporan(prediksi, threshold=None, thresholds=THRESHOLDS, beta=BETA):
+    """Laporan lengkap; `threshold` default = threshold yang ikut tersimpan di versi model."""
+    if threshold is None:
+        threshold = float(prediksi['threshold_model'])
+    y, proba = prediksi['y'], prediksi['proba']
+    metrik = metrik_per_threshold(y, proba, thresholds, beta)
+    i = _indeks_threshold(threshold, thresholds)
+    skor = f'f{beta:g}'
+    # Data uji kosong atau hanya satu kelas (mis. tidak ada hari TIDAK SEHAT): kurva dan
+    # threshold rekomendasi tidak terdefinisi, sama seperti AUC di _auc_aman
+    dua_kelas = 0 < y.sum() < len(y)
+    if dua_kelas:
+        i_terbaik = int(np.argmax(metrik[skor]))
+        fpr, tpr, thr_roc = roc_curve(y, proba)
+        presisi_pr, recall_pr, thr_pr = precision_recall_curve(y, proba)
+    musim = np.array([NAMA_MUSIM.get(int(m), str(m)) for m in prediksi['musim']])
+
+    return {
+        'meta': {
+            'dataset': FILE_ADVANCED,
+            'versi_model': str(prediksi['versi_model']),
+            'versi_data_model': str(prediksi['versi']),
+            'n_total': int(prediksi['n_total']),
+            'n_uji': int(len(y)),
+            'n_tidak_sehat_uji': int(y.sum()),
+            'split': {'kolom': 'tanggal_lengkap', 'cutoff_uji': str(prediksi['cutoff_uji'])},
+        },
+        'threshold_aktif': float(thresholds[i]),
+        'pada_threshold_aktif': _json_metrik(metrik, i),
+        'threshold_rekomendasi': {'metrik': skor, 'threshold': float(thresholds[i_terbaik]),
+                                  **_json_metrik(metrik, i_terbaik)} if dua_kelas else None,
+        'roc_auc': _auc_aman(roc_auc_score, y, proba),
+        'average_precision': _auc_aman(average_precision_score, y, proba),
+        'sapuan': {'threshold': thresholds.tolist(), **_json_metrik(metrik)},
+        'kurva_roc': {'fpr': np.round(fpr, 6).tolist(), 'tpr': np.round(tpr, 6).tolist(),
+                      'threshold': np.round(np.minimum(thr_roc, 1.0), 6).tolist()} if dua_kelas else None,
+        'kurva_pr': {'presisi': np.round(presisi_pr, 6).tolist(), 'recall': np.round(recall_pr, 6).tolist(),
+                     'threshold': np.round(thr_pr, 6).tolist()} if dua_kelas else None,
+        'per_stasiun': metrik_grup(y, proba, prediksi['stasiun'], threshold, thresholds),
+        'per_musim': metrik_grup(y, proba, musim, threshold, thresholds),
+    }
+
+
+def cetak_ringkasan(laporan):
+    """Confusion matrix dan classification report pada threshold aktif (dari laporan, tanpa skor ulang)."""
+    m = laporan['pada_threshold_aktif']
+    print(f"\n1. Confusion Matrix (Amb. Batas = {laporan['threshold_aktif']}):")
+    print(np.array([[m['tn'], m['fp']], [m['fn'], m['tp']]]))
+    print("[Baris: Aktual; Kolom: Prediksi] | [0: AMAN/SEDANG, 1: TIDAK SEHAT]")
+
+    presisi_0 = m['tn'] / max(m['tn'] + m['fn'], 1)
+    recall_0 = m['tn'] / max(m['tn'] + m['fp'], 1)
+    baris = pd.DataFrame({
+        'precision': [presisi_0, m['presisi']],
+        'recall': [recall_0, m['recall']],
+        'f1-score': [2 * presisi_0 * recall_0 / max(presisi_0 + recall_0, 1e-12), m['f1']],
+        'support': [m['tn'] + m['fp'], m['tp'] + m['fn']],
+    }, index=LABEL_KELAS)
+    print("\n2. Classification Report:")
+    print(baris.round(2).to_string())
+    print(f"\n   Akurasi: {m['akurasi']:.2f} | ROC AUC: {laporan['roc_auc']} | AP: {laporan['average_precision']}")
+
+    r = laporan['threshold_rekomendasi']
+    if r is None:
+        print("\nℹ️ Data uji hanya berisi satu kelas (atau kosong): kurva ROC/PR dan threshold rekomendasi dilewati.")
+        return
+    print(f"\n--- 💡 Threshold dengan {r['metrik'].upper()} tertinggi: {r['threshold']} "
+          f"(presisi {r['presisi']:.2f}, recall {r['recall']:.2f}) ---")
+
+
+def jalankan_evaluasi(threshold=None, paksa=False, laporan_path=LAPORAN_PATH):
+    print("--- 🔬 EVALUASI MODEL CBF (SATU KALI SKOR, SAPUAN THRESHOLD) ---")
+    mulai = time.perf_counter()
+    try:
+        prediksi = skor_data_uji(paksa=paksa)
+    except FileNotFoundError as e:
+        print(f"❌ ERROR: Aset tidak ditemukan. Pastikan file (.csv, .pkl) sudah dibuat di langkah pelatihan.")
+        print(f"Detail: {e}")
+        return None
+    t_skor = time.perf_counter() - mulai
+
+    mulai = time.perf_counter()
+    laporan = buat_laporan(prediksi, threshold)
+    t_sapuan = time.perf_counter() - mulai
+
+    with open(laporan_path, 'w', encoding='utf-8') as f:
+        json.dump(laporan, f, indent=1)
+
+    cetak_ringkasan(laporan)
+    print(f"\n✅ Skor data uji: {t_skor * 1000:.0f} ms | sapuan {len(THRESHOLDS)} threshold + kurva + per grup: {t_sapuan * 1000:.0f} ms")
+    print(f"✅ Laporan JSON tersimpan di: {laporan_path}")
+    return laporan
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Evaluasi model CBF ISPU (laporan JSON).")
+    parser.add_argument('--threshold', type=float, default=None,
+                        help="Threshold yang diringkas (default: threshold versi model aktif)")
+    parser.add_argument('--paksa', action='store_true', help="Skor ulang meski cache prediksi masih valid")
+    args = parser.parse_args()
+    jalankan_evaluasi(threshold=args.threshold, paksa=args.paksa)
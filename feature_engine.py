@@ -0,0 +1,101 @@
+# feature_engine.py
+# Mesin fitur per stasiun: data yang sudah terurut dipecah SEKALI menjadi irisan kontigu per
+# stasiun (tanpa groupby berulang per polutan), lalu semua polutan dihitung sekaligus sebagai
+# matriks NumPy. Rolling mean berbasis waktu = selisih cumulative sum, batas kiri window
+# (t - window, t] dicari dengan searchsorted. Stasiun dibagi ke proses worker bila data besar.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+MIN_BARIS_PARALEL = 200_000 # Di bawah ini biaya spawn & pickle proses lebih mahal dari komputasinya
+NAT = np.iinfo(np.int64).min # Representasi int64 dari NaT
+
+
+# --- A. PEMECAHAN PER STASIUN ---
+def batas_stasiun(stasiun):
+    """Indeks batas irisan per stasiun: stasiun ke-i = baris [batas[i], batas[i+1]).
+
+    Data wajib sudah terurut per stasiun (lihat preprocessing.bersihkan_data_mentah).
+    """
+    kode, unik = pd.factorize(stasiun)
+    if len(kode) == 0:
+        return np.zeros(1, dtype=np.int64)
+    awal = np.flatnonzero(kode[1:] != kode[:-1]) + 1
+    batas = np.concatenate(([0], awal, [len(kode)])).astype(np.int64)
+    if len(batas) - 1 != len(unik):
+        raise ValueError("Data belum terurut per stasiun; urutkan berdasarkan PRIMARY_KEY terlebih dahulu.")
+    return batas
+
+
+# --- B. KERNEL NUMPY ---
+def ffill_per_stasiun(nilai, batas):
+    """Forward fill semua kolom sekaligus tanpa melintasi batas stasiun (NaN awal tetap NaN)."""
+    n, k = nilai.shape
+    idx = np.where(np.isnan(nilai), -1, np.arange(n)[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    awal_stasiun = np.repeat(batas[:-1], np.diff(batas))[:, None]
+    hasil = nilai[np.maximum(idx, 0), np.arange(k)]
+    hasil[idx < awal_stasiun] = np.nan
+    return hasil
+
+
+def lag_roll_stasiun(waktu, nilai, rentang):
+    """Lag-1 dan rolling mean waktu (t - rentang, t] untuk satu stasiun, semua kolom sekaligus.
+
+    `waktu` int64 ns terurut (NaT hanya di akhir), `rentang` dalam ns. Sama seperti
+    pandas rolling(min_periods=1): NaN diabaikan, baris tanpa tanggal menghasilkan NaN.
+    """
+    lag = np.full_like(nilai, np.nan)
+    lag[1:] = nilai[:-1]
+
+    roll = np.full_like(nilai, np.nan)
+    valid = waktu != NAT
+    t, x = waktu[valid], nilai[valid]
+    kiri = np.searchsorted(t, t - rentang, side='right')
+    kanan = np.arange(1, len(t) + 1)
+
+    # Dipusatkan ke mean kolom agar galat pembulatan cumsum tidak tumbuh dengan panjang riwayat
+    ada = ~np.isnan(x)
+    pusat = np.where(ada, x, 0.0).sum(axis=0) / np.maximum(ada.sum(axis=0), 1)
+    jumlah = np.zeros((len(x) + 1, x.shape[1]))
+    np.cumsum(np.where(ada, x - pusat, 0.0), axis=0, out=jumlah[1:])
+    if ada.all():
+        n_window = (kanan - kiri)[:, None]
+    else:
+        cacah = np.zeros((len(x) + 1, x.shape[1]))
+        np.cumsum(ada, axis=0, out=cacah[1:])
+        n_window = cacah[kanan] - cacah[kiri]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        roll[valid] = np.where(n_window > 0, (jumlah[kanan] - jumlah[kiri]) / n_window + pusat, np.nan)
+    return lag, roll
+
+
+def _tugas_lag_roll(args):
+    return lag_roll_stasiun(*args)
+
+
+# --- C. ORKESTRASI ---
+def jumlah_worker(n_baris, n_stasiun, max_workers=None):
+    """Proses worker yang dipakai: serial untuk data kecil, maksimal satu per stasiun."""
+    if max_workers is None:
+        max_workers = 1 if n_baris < MIN_BARIS_PARALEL else (os.cpu_count() or 1)
+    return max(1, min(max_workers, n_stasiun))
+
+
+def hitung_lag_roll(waktu, nilai, batas, window, max_workers=None):
+    """Lag-1 & rolling mean semua stasiun; satu tugas per stasiun, dibagi ke process pool."""
+    rentang = pd.Timedelta(window).value
+    tugas = [(waktu[a:b], nilai[a:b], rentang) for a, b in zip(batas[:-1], batas[1:])]
+    workers = jumlah_worker(len(nilai), len(tugas), max_workers)
+    if workers == 1:
+        hasil = [_tugas_lag_roll(t) for t in tugas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hasil = list(pool.map(_tugas_lag_roll, tugas))
+
+    if not hasil:
+        return np.empty_like(nilai), np.empty_like(nilai)
+    return np.concatenate([h[0] for h in hasil]), np.concatenate([h[1] for h in hasil])
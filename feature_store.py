@@ -0,0 +1,106 @@
+# feature_store.py
+
+import os
+import shutil
+
+import pandas as pd
+
+from config import FEATURE_STORE_DIR, POLUTAN_COLS
+
+# Kolom partisi (tidak ikut dalam skema dataset ADVANCED, hanya untuk pruning)
+KOLOM_PARTISI = ['tahun', 'stasiun_partisi']
+KOLOM_INT_KECIL = ['id_stasiun', 'jam', 'hari_dalam_minggu', 'nomor_bulan', 'musim']
+
+
+def _is_kolom_polutan(col):
+    """True untuk kolom polutan mentah maupun turunannya (lag/roll)."""
+    return any(col == p or col.startswith(f'{p}_') for p in POLUTAN_COLS)
+
+
+def siapkan_tipe_kolom(df):
+    """Mengubah tipe kolom ke bentuk ringkas: float32, int8, bool, dan datetime64."""
+    df = df.copy()
+    df['tanggal_lengkap'] = pd.to_datetime(df['tanggal_lengkap'])
+    for col in df.columns:
+        if _is_kolom_polutan(col):
+            df[col] = df[col].astype('float32')
+        elif col in KOLOM_INT_KECIL:
+            df[col] = df[col].astype('int8')
+        elif col.startswith('stasiun_') or col.startswith('kategori_'):
+            df[col] = df[col].astype(bool)
+    return df
+
+
+def write_feature_store(df, root=FEATURE_STORE_DIR):
+    """Menulis dataset ADVANCED sebagai Parquet terpartisi (tahun/stasiun)."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    df_typed = siapkan_tipe_kolom(df)
+    df_typed['tahun'] = df_typed['tanggal_lengkap'].dt.year.astype('int16')
+    df_typed['stasiun_partisi'] = df_typed['stasiun'].astype(str)
+
+    # Tulis ke direktori sementara lalu ganti, agar pembaca tidak melihat store setengah jadi
+    tmp_root = f"{root}.tmp"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    table = pa.Table.from_pandas(df_typed, preserve_index=False)
+    ds.write_dataset(
+        table, tmp_root, format='parquet',
+        partitioning=KOLOM_PARTISI, partitioning_flavor='hive',
+        existing_data_behavior='overwrite_or_ignore'
+    )
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp_root, root)
+    return root
+
+
+def append_feature_store(df, root=FEATURE_STORE_DIR):
+    """Menambahkan baris baru sebagai file Parquet baru di partisi terkait (tanpa menulis ulang)."""
+    import uuid
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    df_typed = siapkan_tipe_kolom(df)
+    df_typed['tahun'] = df_typed['tanggal_lengkap'].dt.year.astype('int16')
+    df_typed['stasiun_partisi'] = df_typed['stasiun'].astype(str)
+
+    table = pa.Table.from_pandas(df_typed, preserve_index=False)
+    ds.write_dataset(
+        table, root, format='parquet',
+        partitioning=KOLOM_PARTISI, partitioning_flavor='hive',
+        basename_template=f"inkremental-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore'
+    )
+    return root
+
+
+def read_feature_store(columns=None, years=None, stations=None, root=FEATURE_STORE_DIR):
+    """Membaca hanya kolom dan partisi yang dibutuhkan dari feature store."""
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(root, format='parquet', partitioning='hive')
+
+    filter_expr = None
+    if years is not None:
+        filter_expr = ds.field('tahun').isin([int(y) for y in years])
+    if stations is not None:
+        station_expr = ds.field('stasiun_partisi').isin([str(s) for s in stations])
+        filter_expr = station_expr if filter_expr is None else (filter_expr & station_expr)
+
+    # Kolom partisi hanya dikembalikan jika diminta eksplisit
+    if columns is None:
+        columns = [c for c in dataset.schema.names if c not in KOLOM_PARTISI]
+
+    table = dataset.to_table(columns=list(columns), filter=filter_expr)
+    df = table.to_pandas()
+    # Urutan baris disamakan dengan CSV (stasiun, tanggal) karena partisi dibaca tanpa urutan
+    sort_cols = [c for c in ['stasiun', 'tanggal_lengkap'] if c in df.columns]
+    if sort_cols:
+        df = df.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+    return df
+
+
+def feature_store_available(root=FEATURE_STORE_DIR):
+    """Mengecek apakah feature store sudah dibangun."""
+    return os.path.isdir(root)
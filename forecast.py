@@ -0,0 +1,156 @@
+# forecast.py
+# Mesin prakiraan multi-horizon: target = kategori TIDAK SEHAT pada stasiun yang sama
+# 24/48/72 jam SETELAH baris fitur (digeser berdasarkan tanggal, bukan posisi baris,
+# sehingga hari yang hilang tidak membuat target bergeser). Satu model per stasiun x horizon
+# (+ satu model gabungan per horizon sebagai cadangan) dilatih paralel di process pool,
+# lalu dilipat ke ForecastRegistry yang menyajikan semua horizon dalam satu panggilan vektor.
+#
+# Jalankan:  python forecast.py [--workers W]
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from config import FILE_ADVANCED, FORECAST_MODEL_PATH, STATION_COL_NAME
+from evaluation import BETA, THRESHOLDS, metrik_per_threshold
+from forecast_registry import ForecastRegistry
+from linear_scorer import fold_scaler_into_model
+from preprocessing import pilih_fitur_input
+
+HORIZON_JAM = (24, 48, 72)
+TARGET_COL = 'kategori_TIDAK SEHAT'
+PORSI_UJI = 0.2 # Porsi tanggal TERAKHIR yang ditahan untuk memilih threshold & melaporkan metrik
+MIN_POSITIF = 5 # Minimal kasus TIDAK SEHAT di data latih agar stasiun mendapat model sendiri
+KUNCI_GLOBAL = ForecastRegistry.KUNCI_GLOBAL
+
+
+# --- A. FITUR & TARGET BERGESER ---
+def fitur_forecast(df):
+    """Fitur input model CBF tanpa OHE stasiun (model per stasiun; bobotnya pasti konstan)."""
+    return [c for c in pilih_fitur_input(df) if not c.startswith('stasiun_')]
+
+
+def target_horizon(df, horizon_jam):
+    """Label TIDAK SEHAT stasiun yang sama pada (tanggal + horizon); NaN jika tidak teramati."""
+    label = df.set_index([STATION_COL_NAME, 'tanggal_lengkap'])[TARGET_COL].astype(float)
+    kunci_target = pd.MultiIndex.from_arrays([
+        df[STATION_COL_NAME], df['tanggal_lengkap'] + pd.Timedelta(hours=horizon_jam)
+    ])
+    return label.reindex(kunci_target).to_numpy()
+
+
+# --- B. PELATIHAN SATU MODEL (dijalankan di proses worker) ---
+def latih_model(kunci, horizon_jam, X, y, tanggal, cutoff, fitur_list):
+    """Melatih satu (kunci, horizon); threshold dipilih pada tanggal >= cutoff, lalu refit pada semua data."""
+    latih = tanggal < cutoff
+    if y[latih].sum() < MIN_POSITIF or y.sum() == len(y):
+        return None
+
+    def _fit(mask):
+        scaler = StandardScaler().fit(X[mask])
+        model = LogisticRegression(solver='liblinear', random_state=42, class_weight='balanced')
+        model.fit(scaler.transform(X[mask]), y[mask])
+        return scaler, model
+
+    scaler, model = _fit(latih)
+    uji = ~latih
+    threshold, metrik_uji = 0.5, {}
+    if uji.any() and y[uji].any():
+        proba = model.predict_proba(scaler.transform(X[uji]))[:, 1]
+        metrik = metrik_per_threshold(y[uji], proba, THRESHOLDS, BETA)
+        i = int(np.argmax(metrik[f'f{BETA:g}']))
+        threshold = float(THRESHOLDS[i])
+        metrik_uji = {'presisi': float(metrik['presisi'][i]), 'recall': float(metrik['recall'][i])}
+
+    scaler, model = _fit(np.ones(len(y), dtype=bool))
+    scorer = fold_scaler_into_model(scaler, model, fitur_list, threshold)
+    return {
+        'kunci': kunci, 'horizon_jam': horizon_jam,
+        'weights': scorer.weights, 'bias': scorer.bias, 'threshold': threshold,
+        'n_latih': int(len(y)), 'n_uji': int(uji.sum()), **metrik_uji,
+    }
+
+
+# --- C. ORKESTRASI PARALEL ---
+def bangun_tugas(df, fitur_list, horizons=HORIZON_JAM):
+    """Satu tugas per (stasiun, horizon) + model gabungan per horizon; data dipotong di sini."""
+    X_semua = df[fitur_list].fillna(0).to_numpy(dtype=np.float64)
+    tanggal_semua = df['tanggal_lengkap'].to_numpy(dtype='datetime64[ns]')
+    stasiun = df[STATION_COL_NAME].to_numpy(dtype=str)
+
+    hari = np.unique(tanggal_semua)
+    cutoff = hari[int(len(hari) * (1 - PORSI_UJI))]
+
+    grup = {s: np.flatnonzero(stasiun == s) for s in sorted(np.unique(stasiun))}
+    grup[KUNCI_GLOBAL] = np.arange(len(df))
+
+    tugas = []
+    for h in horizons:
+        target = target_horizon(df, h)
+        ada = ~np.isnan(target)
+        for kunci, idx in grup.items():
+            idx = idx[ada[idx]]
+            tugas.append((kunci, h, X_semua[idx], target[idx].astype(bool), tanggal_semua[idx], cutoff, fitur_list))
+    return tugas, cutoff
+
+
+def rakit_registry(hasil, fitur_list, horizons=HORIZON_JAM):
+    """Hasil per (kunci, horizon) -> ForecastRegistry; slot tanpa model memakai model gabungan."""
+    kunci = sorted({h['kunci'] for h in hasil if h['kunci'] != KUNCI_GLOBAL}) + [KUNCI_GLOBAL]
+    K, H, F = len(kunci), len(horizons), len(fitur_list)
+    weights, bias = np.zeros((K, H, F)), np.zeros((K, H))
+    threshold, spesifik = np.full((K, H), 0.5), np.zeros((K, H), dtype=bool)
+    for h in hasil:
+        k, j = kunci.index(h['kunci']), horizons.index(h['horizon_jam'])
+        weights[k, j], bias[k, j], threshold[k, j], spesifik[k, j] = h['weights'], h['bias'], h['threshold'], True
+
+    g = kunci.index(KUNCI_GLOBAL)
+    if not spesifik[g].all():
+        raise ValueError("Model gabungan gagal dilatih untuk sebagian horizon (data positif terlalu sedikit).")
+    for k in range(K - 1):
+        kosong = ~spesifik[k]
+        weights[k, kosong], bias[k, kosong], threshold[k, kosong] = weights[g, kosong], bias[g, kosong], threshold[g, kosong]
+    return ForecastRegistry(weights, bias, threshold, kunci, horizons, fitur_list, spesifik)
+
+
+def _latih_tugas(args):
+    return latih_model(*args)
+
+
+def latih_forecast(max_workers=None, horizons=HORIZON_JAM, path=FORECAST_MODEL_PATH):
+    print("--- ⚙️ FORECAST MULTI-HORIZON: MODEL PER STASIUN x HORIZON ---")
+    try:
+        df = pd.read_csv(FILE_ADVANCED, parse_dates=['tanggal_lengkap'])
+    except FileNotFoundError:
+        print(f"❌ ERROR: File '{FILE_ADVANCED}' tidak ditemukan. Jalankan `python preprocessing.py` terlebih dahulu.")
+        return None
+
+    fitur_list = fitur_forecast(df)
+    tugas, cutoff = bangun_tugas(df, fitur_list, horizons)
+    print(f"   [Data]: {len(df)} baris, {len(fitur_list)} fitur, horizon {list(horizons)} jam.")
+    print(f"   [Split waktu]: threshold dipilih pada tanggal >= {str(cutoff)[:10]}, model akhir dilatih ulang pada semua data.")
+
+    mulai = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        hasil = [h for h in pool.map(_latih_tugas, tugas) if h is not None]
+    print(f"\n--- 🧠 {len(hasil)}/{len(tugas)} MODEL DILATIH DALAM {time.perf_counter() - mulai:.1f} DETIK ---")
+
+    ringkasan = pd.DataFrame([{k: v for k, v in h.items() if k not in ('weights', 'bias')} for h in hasil])
+    print(ringkasan.sort_values(['horizon_jam', 'kunci']).to_string(index=False))
+
+    registry = rakit_registry(hasil, fitur_list, list(horizons))
+    registry.save(path)
+    print(f"\n✅ Registry prakiraan ({len(registry.kunci)} kunci x {len(registry.horizon_jam)} horizon) tersimpan di: {path}")
+    return registry
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Latih model prakiraan ISPU multi-horizon.")
+    parser.add_argument('--workers', type=int, default=None, help="Jumlah proses worker")
+    args = parser.parse_args()
+    latih_forecast(max_workers=args.workers)
@@ -0,0 +1,65 @@
+# forecast_registry.py
+# Registry model prakiraan multi-horizon hasil forecast.py, dipisah dari forecast.py (yang
+# mengimpor sklearn) agar service.py bisa memuatnya hanya dengan numpy.
+
+import numpy as np
+
+from linear_scorer import LinearScorer, _ke_matriks
+
+
+class ForecastRegistry:
+    """Registry model prakiraan per (stasiun, horizon), disimpan sebagai tensor bobot K x H x F.
+
+    Baris K terakhir adalah model gabungan (KUNCI_GLOBAL) yang dipakai untuk stasiun
+    tanpa model sendiri. Semua horizon untuk banyak baris di-skor dengan satu einsum.
+    """
+
+    KUNCI_GLOBAL = '*'
+
+    def __init__(self, weights, bias, threshold, kunci, horizon_jam, fitur_list, spesifik=None):
+        self.weights = np.asarray(weights, dtype=np.float64)      # K x H x F
+        self.bias = np.asarray(bias, dtype=np.float64)            # K x H
+        self.threshold = np.asarray(threshold, dtype=np.float64)  # K x H
+        self.kunci = [str(k) for k in kunci]
+        self.horizon_jam = [int(h) for h in horizon_jam]
+        self.fitur_list = [str(f) for f in fitur_list]
+        # True jika bobot (kunci, horizon) dilatih khusus; False = salinan model gabungan
+        self.spesifik = np.ones(self.bias.shape, dtype=bool) if spesifik is None else np.asarray(spesifik, dtype=bool)
+        self._posisi = {k: i for i, k in enumerate(self.kunci)}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['weights'], data['bias'], data['threshold'], data['kunci'],
+                       data['horizon_jam'], data['fitur_list'], data['spesifik'])
+
+    def save(self, path):
+        np.savez(
+            path,
+            weights=self.weights, bias=self.bias, threshold=self.threshold,
+            kunci=np.array(self.kunci, dtype=str), horizon_jam=np.array(self.horizon_jam, dtype=np.int64),
+            fitur_list=np.array(self.fitur_list, dtype=str), spesifik=self.spesifik,
+        )
+        return path
+
+    def indeks_kunci(self, stations):
+        global_ = self._posisi[self.KUNCI_GLOBAL]
+        return np.array([self._posisi.get(s, global_) for s in stations], dtype=np.intp)
+
+    def model(self, stasiun, horizon_jam):
+        """LinearScorer untuk satu stasiun & horizon (jatuh ke model gabungan jika tidak ada)."""
+        k = self.indeks_kunci([stasiun])[0]
+        h = self.horizon_jam.index(int(horizon_jam))
+        return LinearScorer(self.weights[k, h], self.bias[k, h], self.fitur_list, self.threshold[k, h])
+
+    def predict_proba(self, X, stations):
+        """Probabilitas TIDAK SEHAT untuk semua horizon sekaligus: array n_baris x n_horizon."""
+        X = _ke_matriks(X, self.fitur_list)
+        k = self.indeks_kunci(stations)
+        z = np.einsum('nf,nhf->nh', X, self.weights[k]) + self.bias[k]
+        return np.exp(-np.logaddexp(0.0, -z))
+
+    def predict(self, X, stations):
+        """Prediksi biner n_baris x n_horizon memakai threshold masing-masing model."""
+        k = self.indeks_kunci(stations)
+        return (self.predict_proba(X, stations) >= self.threshold[k]).astype(int)
@@ -0,0 +1,202 @@
+# hybrid_core.py
+# Inti rekomendasi hybrid (CBF + CF + Fusion) tanpa Streamlit: dipakai aplikasi (recommender_core),
+# job batch (hybrid_recommender), dan layanan HTTP (service.py) agar aturannya satu sumber.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    FITUR_LIST_PATH, KONFIG_MODEL_DEFAULT, MODEL_CBF_PATH, REKOMENDASI_PEJABAT, REKOMENDASI_TINDAKAN, SCALER_PATH,
+    THRESHOLD_CBF_PATH, hitung_tier_kebijakan, normalize_station
+)
+from instrumentation import diukur, tahap
+from linear_scorer import LinearScorer
+
+
+def muat_threshold_pkl(path=THRESHOLD_CBF_PATH):
+    """Threshold yang disimpan bersama model .pkl lepas; 0.70 (threshold lama) jika file belum ada.
+
+    Bukan config.OPTIMAL_THRESHOLD: threshold hasil tuning hanya berlaku untuk model yang
+    dilatih dengan konfigurasi tuning tersebut, bukan untuk .pkl yang sudah ada.
+    """
+    import joblib
+
+    if not os.path.exists(path):
+        return KONFIG_MODEL_DEFAULT['threshold']
+    return float(joblib.load(path))
+
+
+def muat_aset_pkl(scaler_path=SCALER_PATH, model_path=MODEL_CBF_PATH, fitur_list_path=FITUR_LIST_PATH,
+                  threshold_path=THRESHOLD_CBF_PATH):
+    """(scaler, cbf_model, fitur_list) dari file .pkl lepas; threshold model ikut dipasang (threshold_cbf_)."""
+    import joblib
+
+    scaler = joblib.load(scaler_path)
+    cbf_model = joblib.load(model_path)
+    fitur_list = joblib.load(fitur_list_path)
+    cbf_model.threshold_cbf_ = muat_threshold_pkl(threshold_path)
+    return scaler, cbf_model, fitur_list
+
+
+def threshold_model(cbf_model):
+    """Threshold versi model: LinearScorer membawanya sendiri, model .pkl dari file pendampingnya."""
+    if isinstance(cbf_model, LinearScorer):
+        return cbf_model.threshold
+    return getattr(cbf_model, 'threshold_cbf_', KONFIG_MODEL_DEFAULT['threshold'])
+
+
+def _top_similar_station(target_stasiun, neighbour_index):
+    """Stasiun paling mirip dari indeks tetangga (lookup O(1)), atau (None, nan)."""
+    tetangga = neighbour_index.get(normalize_station(target_stasiun)) if neighbour_index else None
+    if not tetangga:
+        return None, np.nan
+    return tetangga[0]
+
+
+def _mean_kolom(scaler, cbf_model):
+    """Rata-rata kolom data latih versi model ini: mean_ scaler (.pkl) atau yang ikut diekspor di LinearScorer."""
+    if scaler is not None:
+        return getattr(scaler, 'mean_', None)
+    return getattr(cbf_model, 'mean_kolom', None)
+
+
+def _vektor_dan_skor_cbf(data_input_df, scaler, cbf_model, fitur_list):
+    """Vektor input model (urutan fitur_list, terskala jika ada scaler) dan probabilitas TIDAK SEHAT.
+
+    Fitur yang hilang diisi rata-rata kolom data latih versi model yang sama (0 untuk model
+    lama tanpa rata-rata), sebelum scaling dan scoring.
+    """
+    data_input_clean = data_input_df.reindex(columns=fitur_list)
+    mean_kolom = _mean_kolom(scaler, cbf_model)
+    if mean_kolom is not None:
+        data_input_clean = data_input_clean.fillna(pd.Series(mean_kolom, index=fitur_list))
+    data_input_clean = data_input_clean.fillna(0)
+    if data_input_clean.empty:
+        return np.zeros((len(data_input_df), len(fitur_list))), np.zeros(len(data_input_df))
+    if scaler is None:
+        # LinearScorer: scaler sudah dilipat ke bobot, vektor input = fitur mentah terurut
+        vektor = data_input_clean.to_numpy(dtype=np.float64)
+        with tahap('hybrid_core.predict'):
+            return vektor, cbf_model.predict_proba(vektor)
+    with tahap('hybrid_core.scaler_transform'):
+        vektor = scaler.transform(data_input_clean)
+    with tahap('hybrid_core.predict'):
+        return vektor, cbf_model.predict_proba(vektor)[:, 1]
+
+
+# --- FUNGSI BATCH REKOMENDASI HYBRID (N BARIS SEKALIGUS) ---
+@diukur()
+def get_hybrid_recommendation_batch(data_input_df, target_stasiun, neighbour_index, scaler, cbf_model, fitur_list,
+                                    cbf_proba=None):
+    """Menjalankan Hybrid (CBF + CF + Fusion) untuk N baris sekaligus, hasil berupa array.
+
+    `target_stasiun` berisi satu nama stasiun per baris; scaling dan scoring dilakukan
+    sebagai satu operasi matriks, CF berupa lookup ke `neighbour_index` per stasiun unik.
+    `cbf_proba` (opsional) adalah probabilitas yang sudah dihitung sebelumnya.
+    """
+    # Scaler boleh None jika model berupa LinearScorer (scaler sudah dilipat ke bobot)
+    if cbf_model is None or (scaler is None and not isinstance(cbf_model, LinearScorer)):
+        return {"Error": "Aset model belum dimuat. Periksa log error."}
+
+    target_stasiun = np.asarray(target_stasiun, dtype=object)
+
+    # --- A. Content-Based Filtering (CBF) - PREDIKSI ---
+    if cbf_proba is None:
+        _, cbf_proba = _vektor_dan_skor_cbf(data_input_df, scaler, cbf_model, fitur_list)
+    # Threshold ikut versi model (LinearScorer atau file pendamping .pkl), bukan config
+    cbf_prediction = (cbf_proba >= threshold_model(cbf_model)).astype(int)
+
+    # --- B. Collaborative Filtering (CF) ---
+    tetangga = {s: _top_similar_station(s, neighbour_index) for s in pd.unique(target_stasiun)}
+    cf_stasiun = np.array([tetangga[s][0] for s in target_stasiun], dtype=object)
+    cf_skor = np.array([tetangga[s][1] for s in target_stasiun], dtype=float)
+
+    # --- C. Fusion: Tingkat Kebijakan Pejabat ---
+    tier_kebijakan = hitung_tier_kebijakan(
+        data_input_df.get('pm25', pd.Series(0, index=data_input_df.index)),
+        data_input_df.get('hari_dalam_minggu', pd.Series(0, index=data_input_df.index))
+    )
+
+    return {
+        "stasiun": target_stasiun,
+        "proba": cbf_proba,
+        "prediksi": cbf_prediction,
+        "cf_stasiun": cf_stasiun,
+        "cf_skor": cf_skor,
+        "tier_kebijakan": tier_kebijakan,
+    }
+
+
+# --- FUNGSI UTAMA REKOMENDASI HYBRID (PREDIKSI) ---
+def get_hybrid_recommendation(data_input_df, target_stasiun, neighbour_index, scaler, cbf_model, fitur_list):
+    """Menjalankan sistem rekomendasi Hybrid (CBF + CF + Fusion) untuk PREDIKSI."""
+    hasil = get_hybrid_recommendation_batch(
+        data_input_df.iloc[[0]], [target_stasiun], neighbour_index, scaler, cbf_model, fitur_list
+    )
+    if "Error" in hasil:
+        return hasil
+    return _format_rekomendasi(hasil, 0, target_stasiun)
+
+
+def ringkasan_rekomendasi(hasil, i):
+    """Field rekomendasi baris ke-i hasil get_hybrid_recommendation_batch (bentuk JSON, dipakai service.py)."""
+    prediksi = int(hasil["prediksi"][i])
+    tier = str(hasil["tier_kebijakan"][i])
+    cf_skor = float(hasil["cf_skor"][i])
+    return {
+        "stasiun": hasil["stasiun"][i],
+        "status_prediksi": "TIDAK SEHAT" if prediksi == 1 else "AMAN/SEDANG",
+        "probabilitas_tidak_sehat": float(hasil["proba"][i]),
+        "prediksi": prediksi,
+        "rekomendasi_tindakan": REKOMENDASI_TINDAKAN.get(prediksi, "Error dalam prediksi kategori."),
+        "cf_stasiun": hasil["cf_stasiun"][i],
+        "cf_skor": None if np.isnan(cf_skor) else cf_skor,
+        "tier_kebijakan": tier,
+        "rekomendasi_kebijakan": REKOMENDASI_PEJABAT[tier],
+    }
+
+
+def _format_rekomendasi(hasil, i, target_stasiun):
+    """Dict rekomendasi untuk tampilan dari baris ke-i hasil get_hybrid_recommendation_batch."""
+    ringkas = ringkasan_rekomendasi(hasil, i)
+
+    cf_output = "Tidak ada peringatan korelasi."
+    if ringkas["cf_stasiun"] is not None:
+        cf_output = (f"Stasiun dengan pola polusi terdekat: **{ringkas['cf_stasiun']}** "
+                     f"(Korelasi: {ringkas['cf_skor']:.2f}). Kualitas udara cenderung mengikuti pola lokasi tersebut.")
+
+    return {
+        "Stasiun Target": target_stasiun,
+        "Status Prediksi (CBF)": ringkas["status_prediksi"],
+        "Probabilitas TIDAK SEHAT": ringkas["probabilitas_tidak_sehat"],
+        "Rekomendasi Tindakan Primer": ringkas["rekomendasi_tindakan"],
+        "Peringatan Situasional (CF)": cf_output,
+        "Rekomendasi Kebijakan (Pejabat)": ringkas["rekomendasi_kebijakan"],
+    }
+
+
+# --- STATE TERBARU PER STASIUN (VEKTOR & PREDIKSI SUDAH DIHITUNG) ---
+@diukur()
+def build_latest_state(df_terbaru, stasiun, neighbour_index, scaler, cbf_model, fitur_list):
+    """Satu entri per stasiun kanonik: baris terbaru, vektor input model, dan rekomendasi hybrid.
+
+    `df_terbaru` berisi satu baris (fitur lengkap) per stasiun, searah dengan `stasiun`.
+    Semua stasiun di-skor dalam satu operasi matriks; memilih stasiun cukup lookup dict.
+    """
+    vektor, proba = _vektor_dan_skor_cbf(df_terbaru, scaler, cbf_model, fitur_list)
+    hasil = get_hybrid_recommendation_batch(
+        df_terbaru, stasiun, neighbour_index, scaler, cbf_model, fitur_list, cbf_proba=proba
+    )
+    if "Error" in hasil:
+        return {}
+    return {
+        s: {
+            'baris': df_terbaru.iloc[[i]],
+            'vektor': vektor[i],
+            'proba': float(proba[i]),
+            'rekomendasi': _format_rekomendasi(hasil, i, s),
+        }
+        for i, s in enumerate(stasiun)
+    }
@@ -0,0 +1,211 @@
+# imputer.py
+# Imputasi polutan yang bebas kebocoran dan bisa dipakai online: mean pengisi dan batas outlier
+# (kuantil 0.99) per stasiun di-fit HANYA pada periode latih (tanggal < cutoff), disimpan sebagai
+# artefak, lalu diterapkan dengan cara yang sama di build penuh, streaming, dan mode inkremental.
+# Batas kuantil disimpan sebagai sketsa P² (5 penanda) sehingga setiap pembacaan baru
+# memperbarui mean & batas stasiunnya dalam O(1), tanpa memindai ulang riwayat.
+
+import bisect
+
+import numpy as np
+import pandas as pd
+
+KUANTIL_BATAS = 0.99
+PORSI_UJI = 0.2 # Porsi tanggal TERAKHIR yang tidak ikut fit (mencegah statistik dari masa depan)
+MIN_SAMPEL = 30 # Di bawah ini batas stasiun tidak stabil; batas global yang dipakai
+
+
+def cutoff_latih(tanggal, porsi_uji=PORSI_UJI):
+    """Tanggal pertama periode uji: fit imputasi hanya memakai tanggal < cutoff (None jika kosong)."""
+    hari = np.unique(pd.Series(tanggal).dropna().to_numpy(dtype='datetime64[ns]'))
+    if len(hari) == 0:
+        return None
+    return pd.Timestamp(hari[min(int(len(hari) * (1 - porsi_uji)), len(hari) - 1)])
+
+
+def mask_uji(tanggal, cutoff):
+    """Baris periode uji (tanggal >= cutoff) sebagai array bool; split model mengikuti cutoff imputer."""
+    tanggal = pd.to_datetime(pd.Series(tanggal)).to_numpy(dtype='datetime64[ns]')
+    if cutoff is None:
+        return np.zeros(len(tanggal), dtype=bool)
+    return tanggal >= np.datetime64(pd.Timestamp(cutoff), 'ns')
+
+
+class P2Quantile:
+    """Estimator kuantil P² (Jain & Chlamtac, 1985): lima penanda, memori & update O(1)."""
+    __slots__ = ('p', 'n', 'q', 'pos', 'target', 'langkah')
+
+    def __init__(self, p):
+        self.p = p
+        self.n = 0
+        self.q = [] # Tinggi penanda (selama n <= 5: semua nilai, terurut)
+        self.pos = [1, 2, 3, 4, 5]
+        self.langkah = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+        self.target = [1 + 4 * d for d in self.langkah]
+
+    @classmethod
+    def dari_data(cls, nilai, p):
+        """Sketsa yang setara dengan telah melihat `nilai`: penanda = kuantil eksak data."""
+        nilai = np.asarray(nilai, dtype=np.float64)
+        nilai = nilai[~np.isnan(nilai)]
+        sketsa = cls(p)
+        if len(nilai) <= 5:
+            for x in nilai:
+                sketsa.update(x)
+            return sketsa
+        return cls.dari_kuantil(np.quantile(nilai, sketsa.langkah), len(nilai), p)
+
+    @classmethod
+    def dari_kuantil(cls, tinggi, n, p):
+        """Sketsa dari tinggi penanda (kuantil 0, p/2, p, (1+p)/2, 1) atas n > 5 nilai."""
+        sketsa = cls(p)
+        sketsa.n = int(n)
+        sketsa.q = [float(v) for v in tinggi]
+        sketsa.target = [1 + (n - 1) * d for d in sketsa.langkah]
+        pos = [int(round(t)) for t in sketsa.target]
+        for i in range(1, 5): # Posisi penanda wajib naik tegas, dari 1 sampai n
+            pos[i] = max(pos[i], pos[i - 1] + 1)
+        pos[4] = sketsa.n
+        for i in range(3, -1, -1):
+            pos[i] = min(pos[i], pos[i + 1] - 1)
+        sketsa.pos = pos
+        return sketsa
+
+    def update(self, x):
+        if x != x: # NaN tidak dihitung
+            return
+        x = float(x)
+        self.n += 1
+        q, pos, target = self.q, self.pos, self.target
+        if self.n <= 5:
+            bisect.insort(q, x)
+            return
+
+        if x < q[0]:
+            q[0], k = x, 0
+        elif x >= q[4]:
+            q[4], k = x, 3
+        else:
+            k = bisect.bisect_right(q, x) - 1
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            target[i] += self.langkah[i]
+
+        # Geser penanda tengah yang menyimpang >= 1 posisi (parabolik, atau linear jika keluar urutan)
+        for i in (1, 2, 3):
+            d = target[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                baru = q[i] + d / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + d) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - d) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1])
+                )
+                if not q[i - 1] < baru < q[i + 1]:
+                    baru = q[i] + d * (q[i + d] - q[i]) / (pos[i + d] - pos[i])
+                q[i] = baru
+                pos[i] += d
+
+    def nilai(self):
+        if self.n == 0:
+            return np.nan
+        if self.n <= 5: # Masih menyimpan semua nilai: kuantil eksak
+            return float(np.quantile(self.q, self.p))
+        return self.q[2]
+
+
+class StationImputer:
+    """Mean pengisi & batas outlier per stasiun (cadangan: nilai global), di-fit pada periode latih.
+
+    Nilai masukan adalah polutan SETELAH forward fill per stasiun. NaN sisa diisi mean
+    stasiun, lalu nilai di atas batas kuantil stasiun dipotong ke batas tersebut.
+    """
+    KUNCI_GLOBAL = '*'
+
+    def __init__(self, kolom, q=KUANTIL_BATAS, cutoff=None):
+        self.kolom = list(kolom)
+        self.q = q
+        self.cutoff = cutoff
+        self.n = {} # kunci -> jumlah nilai teramati per kolom
+        self.mean = {}
+        self.sketsa = {} # kunci -> [P2Quantile per kolom]
+
+    # --- FIT ---
+    def fit_kunci(self, kunci, X):
+        """Fit satu kunci (stasiun atau global) dari matriks nilai n x kolom (NaN boleh)."""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.kolom))
+        ada = ~np.isnan(X)
+        n = ada.sum(axis=0)
+        with np.errstate(invalid='ignore'):
+            mean = np.where(ada, X, 0.0).sum(axis=0) / np.where(n > 0, n, np.nan)
+        terisi = np.where(ada, X, mean)
+        self.n[kunci] = n.astype(np.int64)
+        self.mean[kunci] = mean
+        self.sketsa[kunci] = [P2Quantile.dari_data(terisi[:, j], self.q) for j in range(len(self.kolom))]
+
+    @classmethod
+    def fit(cls, df, kolom, cutoff=None, q=KUANTIL_BATAS):
+        """Fit global + per stasiun hanya dari baris dengan tanggal < cutoff (semua baris jika None)."""
+        imputer = cls(kolom, q, cutoff)
+        latih = df if cutoff is None else df[df['tanggal_lengkap'] < cutoff]
+        X = latih[imputer.kolom].to_numpy(dtype=np.float64)
+        imputer.fit_kunci(cls.KUNCI_GLOBAL, X)
+        for stasiun, idx in latih.groupby('stasiun', sort=False).indices.items():
+            imputer.fit_kunci(stasiun, X[idx])
+        return imputer
+
+    # --- PARAMETER & TRANSFORMASI ---
+    def parameter_stasiun(self, stasiun):
+        """(mean, batas) satu stasiun; kolom tanpa data latih cukup memakai nilai global."""
+        g = self.KUNCI_GLOBAL
+        mean_g = self.mean[g]
+        batas_g = np.array([s.nilai() for s in self.sketsa[g]])
+        if stasiun not in self.mean:
+            return mean_g, batas_g
+        mean = np.where(np.isnan(self.mean[stasiun]), mean_g, self.mean[stasiun])
+        batas = np.array([s.nilai() if s.n >= MIN_SAMPEL else np.nan for s in self.sketsa[stasiun]])
+        return mean, np.where(np.isnan(batas), batas_g, batas)
+
+    def parameter(self, stasiun):
+        """(mean, batas) berukuran baris x kolom untuk deret stasiun (sekali per stasiun unik)."""
+        kode, unik = pd.factorize(stasiun)
+        mean = np.empty((len(unik), len(self.kolom)))
+        batas = np.empty((len(unik), len(self.kolom)))
+        for i, s in enumerate(unik):
+            mean[i], batas[i] = self.parameter_stasiun(s)
+        return mean[kode], batas[kode]
+
+    def transform(self, df):
+        """Mengisi NaN & memotong outlier kolom polutan (vektor, parameter beku)."""
+        mean, batas = self.parameter(df['stasiun'])
+        X = df[self.kolom].to_numpy(dtype=np.float64)
+        X = np.where(np.isnan(X), mean, X)
+        df[self.kolom] = np.where(X > batas, batas, X)
+        return df
+
+    def transform_baris(self, stasiun, nilai, perbarui=True):
+        """Satu pembacaan: isi & potong dengan parameter saat ini, lalu (opsional) perbarui O(1).
+
+        Pembaruan dilakukan SETELAH transformasi, jadi pembacaan tidak mempengaruhi dirinya sendiri.
+        """
+        mean, batas = self.parameter_stasiun(stasiun)
+        x = np.asarray(nilai, dtype=np.float64)
+        terisi = np.where(np.isnan(x), mean, x)
+        if perbarui:
+            self.update(stasiun, x, terisi)
+        return np.where(terisi > batas, batas, terisi)
+
+    def update(self, stasiun, x, terisi):
+        """Memasukkan satu pembacaan ke statistik stasiun dan global (mean berjalan & sketsa P²)."""
+        if stasiun not in self.mean:
+            k = len(self.kolom)
+            self.n[stasiun] = np.zeros(k, dtype=np.int64)
+            self.mean[stasiun] = np.full(k, np.nan)
+            self.sketsa[stasiun] = [P2Quantile(self.q) for _ in range(k)]
+        for kunci in (stasiun, self.KUNCI_GLOBAL):
+            n, mean, sketsa = self.n[kunci], self.mean[kunci], self.sketsa[kunci]
+            for j in range(len(self.kolom)):
+                if not np.isnan(x[j]):
+                    n[j] += 1
+                    mean[j] = x[j] if n[j] == 1 else mean[j] + (x[j] - mean[j]) / n[j]
+                sketsa[j].update(terisi[j])
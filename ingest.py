@@ -0,0 +1,253 @@
+# ingest.py
+# Pipeline data mentah -> gabungan: membaca workbook ISPU tahunan, menyeragamkan skema,
+# memperbaiki tanggal, lalu menulis data_kualitas_udara_gabungan_final.csv.
+# Setiap sumber di-cache berdasarkan hash file, jadi tahun yang tidak berubah tidak diparse ulang.
+
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from config import normalize_station
+
+# --- A. KONFIGURASI FILE INPUT & OUTPUT ---
+# (path, jenis tanggal): 'tanggal' = kolom tanggal lengkap, 'bulan_hari' = tahun dari periode_data + bulan + hari
+SUMBER_2020_2023 = [
+    ('ispu_jakarta_2020.xlsx', 'tanggal'),
+    ('ispu_jakarta_2021.xlsx', 'tanggal'),
+    ('ispu_jakarta_2022.xlsx', 'tanggal'),
+    ('ispu_jakarta_2023.xlsx', 'tanggal'),
+]
+SUMBER_2024_2025 = [
+    ('ispu_jakarta_2024_2025.xlsx', 'bulan_hari'),
+]
+FILE_2020_2023 = 'data_kualitas_udara_gabungan_2020_2021_2022_2023.csv'
+# File antara hasil turunan; TIDAK menimpa ispu_2024_2025_date_fixed.csv (data mentah yang di-commit)
+FILE_2024_2025 = 'data_kualitas_udara_gabungan_2024_2025.csv'
+FINAL_OUTPUT_FILE = 'data_kualitas_udara_gabungan_final.csv'
+INGEST_CACHE_DIR = 'cache_ingest_ispu'
+
+# Naikkan jika logika pemetaan berubah, agar cache lama otomatis tidak dipakai
+VERSI_SKEMA = 2
+
+KOLOM_STANDAR = [
+    'periode_data', 'tanggal_lengkap', 'tahun', 'bulan', 'hari', 'stasiun',
+    'pm10', 'pm25', 'so2', 'co', 'o3', 'no2',
+    'max_ispu', 'parameter_kritis', 'kategori'
+]
+KOLOM_ISPU = ['pm10', 'pm25', 'so2', 'co', 'o3', 'no2', 'max_ispu']
+
+# Pemetaan semua varian nama kolom tahunan ke skema standar
+PEMETAAN_KOLOM = {
+    'max': 'max_ispu',
+    'critical': 'parameter_kritis',
+    'parameter_pencemar_kritis': 'parameter_kritis',
+    'categori': 'kategori',
+    'lokasi_spku': 'stasiun',
+    'pm_10': 'pm10',
+    'pm_sepuluh': 'pm10',
+    'pm_duakomalima': 'pm25',
+    'sulfur_dioksida': 'so2',
+    'karbon_monoksida': 'co',
+    'ozon': 'o3',
+    'nitrogen_dioksida': 'no2',
+}
+
+# Teks sel yang berarti "tidak ada data" (sama dengan na_values bawaan pandas.read_excel)
+NILAI_KOSONG = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+# Rentang nomor seri tanggal Excel yang masuk akal (~1954 s.d. ~2119)
+SERIAL_EXCEL_MIN, SERIAL_EXCEL_MAX = 20000, 80000
+
+
+# --- B. PEMBACAAN WORKBOOK (streaming, tanpa memuat seluruh workbook sebagai objek sel) ---
+def baca_sheet_pertama(path):
+    """Membaca sheet pertama sebagai DataFrame (semua kolom object, baris pertama = header).
+
+    Memakai python-calamine jika terpasang (paling cepat); jika tidak, openpyxl mode read_only.
+    """
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        CalamineWorkbook = None
+
+    if CalamineWorkbook is not None:
+        rows = CalamineWorkbook.from_path(path).get_sheet_by_index(0).to_python()
+    else:
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = list(wb.worksheets[0].iter_rows(values_only=True))
+        finally:
+            wb.close()
+
+    if not rows:
+        return pd.DataFrame()
+    header = [str(h).strip().lower() for h in rows[0]]
+    df = pd.DataFrame(rows[1:], columns=header, dtype=object)
+    return df.mask(df.isin(NILAI_KOSONG))
+
+
+def _parse_tanggal(nilai):
+    """Tanggal campuran (teks 'YYYY-MM-DD [jam]' atau nomor seri Excel) -> datetime tanpa jam."""
+    teks = nilai.astype(str).str.split().str[0]
+    tanggal = pd.to_datetime(teks, format='%Y-%m-%d', errors='coerce')
+
+    # Beberapa sel tersimpan sebagai nomor seri Excel (mis. '44926.625' = 2022-12-31 15:00)
+    serial = pd.to_numeric(teks.where(tanggal.isna()), errors='coerce')
+    serial = serial.where((serial >= SERIAL_EXCEL_MIN) & (serial <= SERIAL_EXCEL_MAX))
+    dari_serial = pd.to_datetime('1899-12-30') + pd.to_timedelta(np.floor(serial), unit='D')
+    return tanggal.fillna(dari_serial)
+
+
+# --- C. STANDARDISASI PER JENIS SUMBER ---
+def standardisasi_tanggal_lengkap(df):
+    """Sumber 2020-2023: satu kolom 'tanggal' berisi tanggal lengkap."""
+    df = df.rename(columns=PEMETAAN_KOLOM)
+    if 'pm25' not in df.columns:
+        df['pm25'] = np.nan
+
+    if 'tanggal' in df.columns:
+        df['tanggal_lengkap'] = _parse_tanggal(df['tanggal'])
+    else:
+        df['tanggal_lengkap'] = pd.NaT
+    return df
+
+
+def standardisasi_bulan_hari(df):
+    """Sumber 2024-2025: tahun dari periode_data, kolom 'bulan' dan 'tanggal' (= nomor hari)."""
+    df = df.rename(columns=PEMETAAN_KOLOM)
+    tahun = pd.to_numeric(df['periode_data'].astype(str).str[:4], errors='coerce')
+    bulan = pd.to_numeric(df['bulan'], errors='coerce').fillna(1).astype(int)
+    hari = pd.to_numeric(df['tanggal'], errors='coerce').fillna(1).astype(int)
+
+    # Tahun 2024 dulu lalu 2025 (urutan sama dengan skrip perbaikan tanggal sebelumnya)
+    df = df.assign(_tahun=tahun, _bulan=bulan, _hari=hari)
+    df = df[df['_tahun'].isin([2024, 2025])].sort_values('_tahun', kind='stable')
+    df['tanggal_lengkap'] = pd.to_datetime(
+        pd.DataFrame({'year': df['_tahun'], 'month': df['_bulan'], 'day': df['_hari']}),
+        errors='coerce'
+    )
+    return df
+
+
+STANDARDISASI = {
+    'tanggal': standardisasi_tanggal_lengkap,
+    'bulan_hari': standardisasi_bulan_hari,
+}
+
+
+def finalisasi_skema(df):
+    """Komponen waktu dari tanggal_lengkap, nama stasiun kanonik, kolom ISPU numerik, dan urutan kolom standar.
+
+    tahun/bulan/hari tetap float (sama dengan CSV gabungan sebelumnya, NaN untuk tanggal tidak valid).
+    """
+    df['tahun'] = df['tanggal_lengkap'].dt.year.astype('float64')
+    df['bulan'] = df['tanggal_lengkap'].dt.month.astype('float64')
+    df['hari'] = df['tanggal_lengkap'].dt.day.astype('float64')
+    df = df.reindex(columns=KOLOM_STANDAR)
+    # Nama stasiun diseragamkan sekali per nama unik, untuk SEMUA jenis sumber
+    df['stasiun'] = df['stasiun'].map({s: normalize_station(s) for s in df['stasiun'].dropna().unique()})
+    df['periode_data'] = pd.to_numeric(df['periode_data'], errors='coerce')
+    for col in KOLOM_ISPU:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.reset_index(drop=True)
+
+
+def proses_sumber(path, jenis):
+    """Membaca dan menyeragamkan satu file sumber (dijalankan di proses worker)."""
+    df = baca_sheet_pertama(path)
+    return finalisasi_skema(STANDARDISASI[jenis](df))
+
+
+# --- D. CACHE PER SUMBER (berdasarkan hash isi file) ---
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 isi file, dibaca per potongan."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _path_cache(path, cache_dir):
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.pkl")
+
+
+def muat_sumber(sumber, cache_dir=INGEST_CACHE_DIR, paksa=False, max_workers=None):
+    """Mengembalikan DataFrame standar per sumber; hanya file yang berubah yang diparse ulang.
+
+    File yang perlu diparse diproses paralel (satu proses per workbook).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    hasil, perlu_parse = {}, {}
+    for path, jenis in sumber:
+        digest = hash_file(path)
+        cache_path = _path_cache(path, cache_dir)
+        if not paksa and os.path.exists(cache_path):
+            cache = joblib.load(cache_path)
+            if cache.get('hash') == digest and cache.get('versi') == VERSI_SKEMA:
+                hasil[path] = cache['data']
+                print(f"   [Cache]: {path} tidak berubah, parsing dilewati ({len(cache['data'])} baris).")
+                continue
+        perlu_parse[path] = (jenis, digest)
+
+    if perlu_parse:
+        workers = min(len(perlu_parse), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {path: pool.submit(proses_sumber, path, jenis) for path, (jenis, _) in perlu_parse.items()}
+            for path, future in futures.items():
+                df = future.result()
+                joblib.dump({'hash': perlu_parse[path][1], 'versi': VERSI_SKEMA, 'data': df},
+                            _path_cache(path, cache_dir))
+                hasil[path] = df
+                print(f"   [Parse]: {path} diseragamkan ({len(df)} baris).")
+
+    return [hasil[path] for path, _ in sumber]
+
+
+def _gabung(frames):
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=KOLOM_STANDAR)
+    return pd.concat(frames, ignore_index=True)
+
+
+# --- E. EKSEKUSI PIPELINE ---
+def jalankan_ingest(paksa=False):
+    """Workbook tahunan -> data gabungan final (plus dua file antara untuk penelusuran)."""
+    print("--- ⚙️ INGEST: MEMBACA & MENYERAGAMKAN WORKBOOK ISPU TAHUNAN ---")
+    sumber = [(p, j) for p, j in SUMBER_2020_2023 + SUMBER_2024_2025 if os.path.exists(p)]
+    hilang = [p for p, _ in SUMBER_2020_2023 + SUMBER_2024_2025 if not os.path.exists(p)]
+    for path in hilang:
+        print(f"❌ ERROR: File tidak ditemukan di {path}. Lewati.")
+    if not sumber:
+        print("\n❌ Gagal menggabungkan data karena tidak ada file yang berhasil dimuat.")
+        return None
+
+    frames = dict(zip([p for p, _ in sumber], muat_sumber(sumber, paksa=paksa)))
+    df_a = _gabung([frames[p] for p, _ in SUMBER_2020_2023 if p in frames])
+    df_b = _gabung([frames[p] for p, _ in SUMBER_2024_2025 if p in frames])
+
+    df_a.to_csv(FILE_2020_2023, index=False)
+    df_b.to_csv(FILE_2024_2025, index=False)
+
+    final_df = _gabung([df_a, df_b])
+    final_df.to_csv(FINAL_OUTPUT_FILE, index=False)
+
+    n_tanpa_tanggal = int(final_df['tanggal_lengkap'].isna().sum())
+    print(f"✅ 2020-2023: {len(df_a)} baris -> {FILE_2020_2023}")
+    print(f"✅ 2024-2025: {len(df_b)} baris -> {FILE_2024_2025}")
+    print(f"✅ Total {len(final_df)} baris ({n_tanpa_tanggal} tanpa tanggal valid) tersimpan di: {FINAL_OUTPUT_FILE}")
+    return final_df
+
+
+if __name__ == '__main__':
+    jalankan_ingest(paksa='--paksa' in sys.argv[1:])
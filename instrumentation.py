@@ -0,0 +1,333 @@
+# instrumentation.py
+# Instrumentasi ringan untuk pipeline & aplikasi: durasi tahap bernama (context manager / dekorator),
+# penghitung hit/miss cache Streamlit, ekspor teks Prometheus atau JSON, dan rekaman
+# cProfile + tracemalloc untuk satu request. NONAKTIF secara default; saat nonaktif setiap
+# titik ukur hanya berupa satu pengecekan flag (tanpa perf_counter, lock, atau alokasi).
+#
+# Aktifkan:  ISPU_INSTRUMENTASI=1 streamlit run app.py   (atau instrumentation.aktifkan())
+# Ekspor:    ISPU_INSTRUMENTASI_EKSPOR=metrik.prom|metrik.json -> ditulis saat proses selesai
+
+import atexit
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import nullcontext
+
+BUCKET_DURASI = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+N_BARIS_PROFIL = 25 # Fungsi / baris alokasi teratas yang disimpan dari satu rekaman profil
+
+_AKTIF = os.environ.get('ISPU_INSTRUMENTASI', '').lower() not in ('', '0', 'false', 'tidak')
+_KUNCI = threading.Lock()
+_LOKAL = threading.local() # Tumpukan tahap per thread (sesi Streamlit berjalan di thread terpisah)
+_NOL = nullcontext()
+
+_TAHAP = {} # nama -> StatistikTahap
+_CACHE = {} # nama fungsi -> [panggilan, miss]
+_PROFIL = {} # nama -> ringkasan rekaman profil terakhir
+
+
+# --- A. METRIK DASAR ---
+class Histogram:
+    """Histogram kumulatif sederhana (format Prometheus), tanpa dependensi tambahan."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # Slot terakhir = +Inf
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, nilai):
+        self.counts[bisect_left(self.buckets, nilai)] += 1
+        self.total += nilai
+        self.n += 1
+
+    def render(self, nama, labels=''):
+        baris, kumulatif = [], 0
+        for batas, jumlah in zip(self.buckets + ('+Inf',), self.counts):
+            kumulatif += jumlah
+            label = f'{labels},le="{batas}"' if labels else f'le="{batas}"'
+            baris.append(f'{nama}_bucket{{{label}}} {kumulatif}')
+        suffix = f'{{{labels}}}' if labels else ''
+        baris.append(f'{nama}_sum{suffix} {self.total}')
+        baris.append(f'{nama}_count{suffix} {self.n}')
+        return baris
+
+
+class StatistikTahap:
+    """Durasi satu tahap bernama: histogram total + waktu 'sendiri' (tanpa sub-tahap) dan maksimum."""
+    __slots__ = ('histogram', 'sendiri', 'maks')
+
+    def __init__(self):
+        self.histogram = Histogram(BUCKET_DURASI)
+        self.sendiri = 0.0
+        self.maks = 0.0
+
+    def catat(self, durasi, sendiri):
+        self.histogram.observe(durasi)
+        self.sendiri += sendiri
+        self.maks = max(self.maks, durasi)
+
+
+# --- B. SAKLAR ---
+def aktif():
+    return _AKTIF
+
+
+def aktifkan(nilai=True):
+    """Menghidupkan/mematikan instrumentasi saat runtime (metrik yang sudah ada tidak dihapus)."""
+    global _AKTIF
+    _AKTIF = bool(nilai)
+
+
+def reset():
+    """Menghapus semua metrik & rekaman profil (mis. di antara run benchmark)."""
+    with _KUNCI:
+        _TAHAP.clear()
+        _CACHE.clear()
+        _PROFIL.clear()
+
+
+# --- C. TAHAP BERNAMA ---
+def _label(fungsi):
+    """'modul.fungsi'; modul skrip yang dijalankan langsung (__main__) memakai nama filenya."""
+    modul = fungsi.__module__
+    if modul == '__main__':
+        path = getattr(sys.modules['__main__'], '__file__', None) or modul
+        modul = os.path.splitext(os.path.basename(path))[0]
+    return f"{modul}.{fungsi.__name__}"
+
+
+class _Tahap:
+    __slots__ = ('nama', 'mulai', 'anak')
+
+    def __init__(self, nama):
+        self.nama = nama
+
+    def __enter__(self):
+        tumpukan = getattr(_LOKAL, 'tumpukan', None)
+        if tumpukan is None:
+            tumpukan = _LOKAL.tumpukan = []
+        tumpukan.append(self)
+        self.anak = 0.0
+        self.mulai = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        durasi = time.perf_counter() - self.mulai
+        tumpukan = _LOKAL.tumpukan
+        tumpukan.pop()
+        if tumpukan:
+            tumpukan[-1].anak += durasi
+        with _KUNCI:
+            stat = _TAHAP.get(self.nama)
+            if stat is None:
+                stat = _TAHAP[self.nama] = StatistikTahap()
+            stat.catat(durasi, durasi - self.anak)
+        return False
+
+
+def tahap(nama):
+    """Context manager: `with tahap('baca_csv'): ...` mencatat durasi blok (no-op jika nonaktif)."""
+    if not _AKTIF:
+        return _NOL
+    return _Tahap(nama)
+
+
+def diukur(nama=None):
+    """Dekorator: setiap panggilan fungsi dicatat sebagai tahap `nama` (default: modul.fungsi)."""
+    def bungkus(fungsi):
+        label = nama or _label(fungsi)
+
+        @functools.wraps(fungsi)
+        def terukur(*args, **kwargs):
+            if not _AKTIF:
+                return fungsi(*args, **kwargs)
+            with _Tahap(label):
+                return fungsi(*args, **kwargs)
+        return terukur
+    return bungkus
+
+
+# --- D. PENGHITUNG HIT/MISS CACHE STREAMLIT ---
+def cache_terhitung(cache, nama=None, **opsi):
+    """Pengganti `@st.cache_data` / `@st.cache_resource` yang juga menghitung hit & miss.
+
+    Penghitung miss dipasang DI DALAM cache (badan fungsi hanya jalan saat miss), penghitung
+    panggilan DI LUAR cache; hit = panggilan - miss. Kunci cache Streamlit tetap dihitung dari
+    fungsi asli (functools.wraps), dan `.clear()` tetap tersedia.
+    """
+    def bungkus(fungsi):
+        label = nama or _label(fungsi)
+
+        @functools.wraps(fungsi)
+        def saat_miss(*args, **kwargs):
+            if _AKTIF:
+                _hitung_cache(label, 1)
+            return fungsi(*args, **kwargs)
+
+        tercache = cache(**opsi)(saat_miss) if opsi else cache(saat_miss)
+
+        @functools.wraps(fungsi)
+        def terhitung(*args, **kwargs):
+            if not _AKTIF:
+                return tercache(*args, **kwargs)
+            _hitung_cache(label, 0)
+            with _Tahap(label):
+                return tercache(*args, **kwargs)
+
+        terhitung.clear = tercache.clear
+        return terhitung
+    return bungkus
+
+
+def _hitung_cache(label, slot):
+    with _KUNCI:
+        _CACHE.setdefault(label, [0, 0])[slot] += 1
+
+
+# --- E. PROFIL SATU REQUEST (cProfile + tracemalloc) ---
+class ProfilRequest:
+    """Merekam cProfile dan puncak/alokasi memori (tracemalloc) untuk satu request atau render.
+
+    Dipakai sebagai context manager, atau mulai()/selesai() jika blok tidak bisa dibungkus
+    (mis. skrip Streamlit). Hasilnya tersimpan di profil_terakhir(nama). Tidak bergantung
+    pada saklar aktif(): rekaman hanya terjadi jika dipanggil secara eksplisit.
+    """
+    _berjalan = None # Satu rekaman per proses (cProfile tidak bisa bertumpuk)
+
+    def __init__(self, nama, cprofile=True, memori=True):
+        self.nama = nama
+        self.profiler = cProfile.Profile() if cprofile else None
+        self.memori = memori and not tracemalloc.is_tracing()
+
+    def mulai(self):
+        if ProfilRequest._berjalan is not None:
+            # Rekaman sebelumnya terputus (mis. st.stop()): dihentikan tanpa disimpan
+            ProfilRequest._berjalan._hentikan()
+        ProfilRequest._berjalan = self
+        if self.memori:
+            tracemalloc.start()
+        self.waktu_mulai = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def _hentikan(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+        snapshot = puncak = None
+        if self.memori and tracemalloc.is_tracing():
+            puncak = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        if ProfilRequest._berjalan is self:
+            ProfilRequest._berjalan = None
+        return snapshot, puncak
+
+    def selesai(self):
+        durasi = time.perf_counter() - self.waktu_mulai
+        snapshot, puncak = self._hentikan()
+        hasil = {'nama': self.nama, 'detik': durasi}
+        if self.profiler is not None:
+            teks = io.StringIO()
+            pstats.Stats(self.profiler, stream=teks).sort_stats('cumulative').print_stats(N_BARIS_PROFIL)
+            hasil['cprofile'] = teks.getvalue()
+        if snapshot is not None:
+            hasil['puncak_mb'] = puncak / 2**20
+            hasil['alokasi_teratas'] = [
+                str(stat) for stat in snapshot.statistics('lineno')[:N_BARIS_PROFIL]
+            ]
+        with _KUNCI:
+            _PROFIL[self.nama] = hasil
+        return hasil
+
+    def __enter__(self):
+        return self.mulai()
+
+    def __exit__(self, *exc):
+        self.selesai()
+        return False
+
+
+def profil_terakhir(nama=None):
+    """Ringkasan rekaman profil terakhir untuk `nama` (atau semua, dict nama -> ringkasan)."""
+    with _KUNCI:
+        return dict(_PROFIL) if nama is None else _PROFIL.get(nama)
+
+
+# --- F. EKSPOR ---
+def metrik_json():
+    """Snapshot semua metrik sebagai dict (siap json.dump)."""
+    with _KUNCI:
+        tahap_ = {
+            nama: {
+                'n': s.histogram.n,
+                'total_detik': s.histogram.total,
+                'sendiri_detik': s.sendiri,
+                'rata_detik': s.histogram.total / s.histogram.n if s.histogram.n else 0.0,
+                'maks_detik': s.maks,
+            }
+            for nama, s in _TAHAP.items()
+        }
+        cache = {nama: {'hit': n - miss, 'miss': miss} for nama, (n, miss) in _CACHE.items()}
+        profil = {nama: {k: v for k, v in p.items() if k != 'cprofile'} for nama, p in _PROFIL.items()}
+    return {'aktif': _AKTIF, 'tahap': tahap_, 'cache': cache, 'profil': profil}
+
+
+def metrik_prometheus(prefix='ispu'):
+    """Semua metrik dalam format teks Prometheus (histogram durasi tahap, counter cache)."""
+    with _KUNCI:
+        baris = [f'# TYPE {prefix}_stage_duration_seconds histogram']
+        for nama, s in _TAHAP.items():
+            baris += s.histogram.render(f'{prefix}_stage_duration_seconds', f'stage="{nama}"')
+        baris.append(f'# TYPE {prefix}_stage_self_seconds_total counter')
+        baris += [f'{prefix}_stage_self_seconds_total{{stage="{nama}"}} {s.sendiri}' for nama, s in _TAHAP.items()]
+        baris.append(f'# TYPE {prefix}_cache_requests_total counter')
+        for nama, (n, miss) in _CACHE.items():
+            baris.append(f'{prefix}_cache_requests_total{{function="{nama}",result="hit"}} {n - miss}')
+            baris.append(f'{prefix}_cache_requests_total{{function="{nama}",result="miss"}} {miss}')
+    return '\n'.join(baris) + '\n'
+
+
+def simpan_metrik(path):
+    """Menulis metrik ke `path`: teks Prometheus jika berakhiran .prom/.txt, selain itu JSON."""
+    if path.endswith(('.prom', '.txt')):
+        isi = metrik_prometheus()
+    else:
+        isi = json.dumps(metrik_json(), indent=2)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(isi)
+
+
+def ringkasan_tahap(n=None):
+    """Baris (nama, n, total, sendiri, rata, maks) diurutkan dari waktu 'sendiri' terbesar."""
+    tahap_ = metrik_json()['tahap']
+    baris = sorted(
+        ((nama, m['n'], m['total_detik'], m['sendiri_detik'], m['rata_detik'], m['maks_detik'])
+         for nama, m in tahap_.items()),
+        key=lambda b: b[3], reverse=True
+    )
+    return baris[:n] if n else baris
+
+
+def cetak_ringkasan_tahap(n=None):
+    """Mencetak ringkasan_tahap() sebagai tabel teks di akhir skrip CLI (tidak mencetak apa pun jika kosong)."""
+    baris = ringkasan_tahap(n)
+    if not baris:
+        return
+    lebar = max(len(b[0]) for b in baris)
+    print(f"\n{'tahap':<{lebar}}  {'n':>4}  {'total_s':>8}  {'sendiri_s':>9}")
+    for nama, jumlah, total, sendiri, _, _ in baris:
+        print(f"{nama:<{lebar}}  {jumlah:>4}  {total:>8.2f}  {sendiri:>9.2f}")
+
+
+if _AKTIF and os.environ.get('ISPU_INSTRUMENTASI_EKSPOR'):
+    atexit.register(simpan_metrik, os.environ['ISPU_INSTRUMENTASI_EKSPOR'])
@@ -0,0 +1,133 @@
+# kpi_cube.py
+# Kubus KPI bulanan: agregat per stasiun x bulan x polutan untuk dashboard historis.
+
+import numpy as np
+import pandas as pd
+
+from config import KPI_CUBE_PATH, POLUTAN_COLS, STATION_COL_NAME, normalize_station
+
+KOLOM_KUNCI = ['stasiun_normal', 'tahun', 'bulan', 'polutan']
+KOLOM_AGREGAT = ['jumlah', 'n', 'minimum', 'maksimum', 'hari_tidak_sehat', 'mask_hari_tidak_sehat']
+
+
+def _hitung_bit(mask):
+    """Jumlah bit aktif (= hari unik) per elemen array mask int64."""
+    mask = np.ascontiguousarray(mask, dtype=np.int64)
+    return np.unpackbits(mask.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1).astype(np.int64)
+
+
+def build_kpi_cube(df):
+    """Membangun kubus (sum, count, min, max, hari TIDAK SEHAT) per stasiun x bulan x polutan.
+
+    Data harian maupun per jam langsung di-downsample ke bulan dengan satu groupby. Hari TIDAK SEHAT
+    juga disimpan sebagai bitmask tanggal (bit d-1 = tanggal d) agar merge_kpi_cube tetap menghitung
+    hari unik walau satu hari terbagi di beberapa batch.
+    """
+    polutan_ada = [p for p in POLUTAN_COLS if p in df.columns]
+    tanggal = pd.to_datetime(df['tanggal_lengkap'])
+    base = df[polutan_ada].copy()
+    # Normalisasi per nama unik, bukan per baris
+    base['stasiun_normal'] = df[STATION_COL_NAME].map({s: normalize_station(s) for s in df[STATION_COL_NAME].unique()})
+    base['tahun'] = tanggal.dt.year
+    base['bulan'] = tanggal.dt.month
+    base['hari'] = tanggal.dt.normalize()
+    base['tidak_sehat'] = (df['kategori'] == 'TIDAK SEHAT').to_numpy()
+    base = base.dropna(subset=['tahun'])
+
+    grouped = base.groupby(['stasiun_normal', 'tahun', 'bulan'])
+    # Hitung HARI unik, bukan baris: data per jam tidak menghitung satu hari 24 kali
+    hari_unik = base.loc[base['tidak_sehat'], ['stasiun_normal', 'tahun', 'bulan', 'hari']].drop_duplicates()
+    hari_unik['bit'] = np.left_shift(np.int64(1), hari_unik['hari'].dt.day.to_numpy(dtype=np.int64) - 1)
+    mask_hari = hari_unik.groupby(['stasiun_normal', 'tahun', 'bulan'])['bit'].sum()
+
+    bagian = []
+    for polutan in polutan_ada:
+        agg = grouped[polutan].agg(jumlah='sum', n='count', minimum='min', maksimum='max')
+        agg['mask_hari_tidak_sehat'] = mask_hari.reindex(agg.index, fill_value=0).astype(np.int64)
+        agg['hari_tidak_sehat'] = _hitung_bit(agg['mask_hari_tidak_sehat'].to_numpy())
+        agg['polutan'] = polutan
+        bagian.append(agg.reset_index())
+    if not bagian:
+        return pd.DataFrame(columns=KOLOM_KUNCI + KOLOM_AGREGAT)
+
+    cube = pd.concat(bagian, ignore_index=True)
+    cube[['tahun', 'bulan']] = cube[['tahun', 'bulan']].astype(int)
+    return cube[KOLOM_KUNCI + KOLOM_AGREGAT]
+
+
+def merge_kpi_cube(*cubes):
+    """Menggabungkan beberapa kubus (mis. kubus lama + kubus baris baru) tanpa memindai data mentah.
+
+    Bitmask hari digabung dengan OR, jadi hari yang terbagi di beberapa batch per jam dihitung sekali.
+    Kubus lama tanpa kolom mask (dibangun sebelum kolom ini ada) dijumlahkan seperti dulu;
+    jalankan ulang preprocessing penuh untuk hitungan yang tepat.
+    """
+    bagian = []
+    for c in cubes:
+        if c is None or c.empty:
+            continue
+        c = c.copy()
+        if 'mask_hari_tidak_sehat' in c.columns:
+            c['hari_lama'] = 0
+        else:
+            c['hari_lama'] = c['hari_tidak_sehat']
+            c['mask_hari_tidak_sehat'] = 0
+        bagian.append(c)
+    if not bagian:
+        return pd.DataFrame(columns=KOLOM_KUNCI + KOLOM_AGREGAT)
+    gabungan = pd.concat(bagian, ignore_index=True)
+    gabungan['mask_hari_tidak_sehat'] = gabungan['mask_hari_tidak_sehat'].astype(np.int64)
+    cube = gabungan.groupby(KOLOM_KUNCI, as_index=False).agg(
+        jumlah=('jumlah', 'sum'), n=('n', 'sum'),
+        minimum=('minimum', 'min'), maksimum=('maksimum', 'max'),
+        hari_lama=('hari_lama', 'sum'),
+        mask_hari_tidak_sehat=('mask_hari_tidak_sehat', lambda m: np.bitwise_or.reduce(m.to_numpy())),
+    )
+    cube['mask_hari_tidak_sehat'] = cube['mask_hari_tidak_sehat'].astype(np.int64)
+    cube['hari_tidak_sehat'] = _hitung_bit(cube['mask_hari_tidak_sehat'].to_numpy()) + cube['hari_lama']
+    return cube[KOLOM_KUNCI + KOLOM_AGREGAT]
+
+
+def update_kpi_cube(df_baru, path=KPI_CUBE_PATH):
+    """Memperbarui kubus di disk dengan baris baru saja (mode inkremental)."""
+    try:
+        cube_lama = load_kpi_cube(path)
+    except FileNotFoundError:
+        cube_lama = None
+    cube = merge_kpi_cube(cube_lama, build_kpi_cube(df_baru))
+    save_kpi_cube(cube, path)
+    return cube
+
+
+def save_kpi_cube(cube, path=KPI_CUBE_PATH):
+    """Menyimpan kubus KPI (ukurannya kecil: stasiun x bulan x polutan)."""
+    cube.to_csv(path, index=False)
+    return path
+
+
+def load_kpi_cube(path=KPI_CUBE_PATH):
+    """Memuat kubus KPI dari disk."""
+    return pd.read_csv(path)
+
+
+def ringkasan_kpi(cube, years, polutan='pm25'):
+    """Menjawab filter tahun dari kubus: tren bulanan, rata-rata global, dan stasiun paling kritis."""
+    sel = cube[(cube['polutan'] == polutan) & (cube['tahun'].isin(list(years)))]
+    if sel.empty:
+        return pd.DataFrame(columns=['Bulan_Tahun', polutan]), np.nan, "N/A"
+
+    bulanan = sel.groupby(['tahun', 'bulan'])[['jumlah', 'n']].sum().reset_index()
+    kpi_monthly = pd.DataFrame({
+        'Bulan_Tahun': [f"{t:04d}-{b:02d}" for t, b in zip(bulanan['tahun'], bulanan['bulan'])],
+        polutan: bulanan['jumlah'] / bulanan['n'].where(bulanan['n'] > 0),
+    })
+
+    total_n = sel['n'].sum()
+    rata_rata = sel['jumlah'].sum() / total_n if total_n > 0 else np.nan
+
+    # Setara dengan mode() stasiun pada baris TIDAK SEHAT (seri -> nama terurut pertama)
+    hari = sel.groupby('stasiun_normal')['hari_tidak_sehat'].sum()
+    hari = hari[hari > 0]
+    worst_station = hari[hari == hari.max()].sort_index().index[0] if not hari.empty else "N/A"
+
+    return kpi_monthly, rata_rata, worst_station
@@ -0,0 +1,85 @@
+# linear_scorer.py
+# Scorer ringan untuk model CBF: satu dot product + sigmoid.
+# Sengaja TIDAK mengimpor sklearn/joblib agar worker API cepat start dan hemat memori.
+
+import numpy as np
+
+from config import LINEAR_SCORER_PATH
+
+
+def _ke_matriks(X, fitur_list, mean_kolom=None):
+    # DataFrame diselaraskan ke urutan fitur. Nilai/kolom hilang diisi rata-rata kolom data latih
+    # (model lama tanpa rata-rata: 0, seperti sebelumnya)
+    if hasattr(X, 'reindex'):
+        X = X.reindex(columns=fitur_list).to_numpy(dtype=np.float64)
+    X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+    hilang = np.isnan(X)
+    if hilang.any():
+        isi = np.zeros(X.shape[1]) if mean_kolom is None else mean_kolom
+        X = np.where(hilang, isi, X)
+    return X
+
+
+class LinearScorer:
+    """Model CBF (StandardScaler + LogisticRegression) yang sudah dilipat menjadi w·x + b."""
+
+    def __init__(self, weights, bias, fitur_list, threshold, mean_kolom=None):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.fitur_list = [str(f) for f in fitur_list]
+        self.threshold = float(threshold)
+        # Rata-rata kolom data latih (mean_ scaler) untuk imputasi input yang hilang
+        self.mean_kolom = None if mean_kolom is None else np.asarray(mean_kolom, dtype=np.float64)
+
+    @classmethod
+    def load(cls, path=LINEAR_SCORER_PATH):
+        """Memuat artefak .npz hasil ekspor (tanpa pickle)."""
+        with np.load(path, allow_pickle=False) as data:
+            mean_kolom = data['mean_kolom'] if 'mean_kolom' in data.files else None # Artefak lama: tidak ada
+            return cls(data['weights'], data['bias'], data['fitur_list'], data['threshold'], mean_kolom)
+
+    def save(self, path=LINEAR_SCORER_PATH):
+        """Menyimpan bobot, bias, urutan fitur, threshold, dan rata-rata kolom latih ke satu file .npz."""
+        tambahan = {} if self.mean_kolom is None else {'mean_kolom': self.mean_kolom}
+        np.savez(
+            path,
+            weights=self.weights,
+            bias=np.float64(self.bias),
+            fitur_list=np.array(self.fitur_list, dtype=str),
+            threshold=np.float64(self.threshold),
+            **tambahan,
+        )
+        return path
+
+    def _to_matrix(self, X):
+        return _ke_matriks(X, self.fitur_list, self.mean_kolom)
+
+    def decision_function(self, X):
+        """Logit w·x + b untuk setiap baris."""
+        return self._to_matrix(X) @ self.weights + self.bias
+
+    def predict_proba(self, X):
+        """Probabilitas kelas TIDAK SEHAT (1) untuk setiap baris."""
+        z = self.decision_function(X)
+        return np.exp(-np.logaddexp(0.0, -z)) # sigmoid yang stabil secara numerik
+
+    def predict(self, X):
+        """Prediksi biner memakai threshold yang ikut diekspor."""
+        return (self.predict_proba(X) >= self.threshold).astype(int)
+
+
+def fold_scaler_into_model(scaler, cbf_model, fitur_list, threshold):
+    """Melipat mean/scale StandardScaler ke koefisien LogisticRegression.
+
+    w·((x - mean) / scale) + b  ==  (w / scale)·x + (b - Σ w·mean / scale)
+
+    mean_ scaler (di-fit pada baris latih) ikut disimpan sebagai rata-rata kolom untuk
+    imputasi input yang hilang.
+    """
+    coef = np.asarray(cbf_model.coef_, dtype=np.float64).ravel()
+    mean_kolom = getattr(scaler, 'mean_', None)
+    mean = mean_kolom if mean_kolom is not None else np.zeros_like(coef)
+    scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else np.ones_like(coef)
+    weights = coef / scale
+    bias = float(np.asarray(cbf_model.intercept_).ravel()[0]) - float(np.dot(weights, mean))
+    return LinearScorer(weights, bias, fitur_list, threshold, mean_kolom)
@@ -0,0 +1,371 @@
+# model_registry.py
+# Registry artefak model CBF yang berversi. Setiap run pelatihan ditulis ke direktori
+# sendiri yang namanya hash isi artefak, lengkap dengan manifest (model, scaler, daftar
+# fitur, threshold, snapshot data). Versi yang dilayani ditentukan satu file pointer
+# yang diganti secara atomik, sehingga pembaca tidak pernah melihat file setengah jadi.
+#
+# Tata letak:
+#   registry_model_ispu/
+#     AKTIF                      <- pointer {"versi": ..., "diaktifkan": ...} (os.replace)
+#     riwayat_aktivasi.jsonl     <- satu baris per aktivasi (append), acuan urutan rollback
+#     versi/<hash16>/            <- tidak pernah diubah setelah dipublikasikan
+#       manifest.json, model_cbf_rekomendasi.pkl, scaler_rekomendasi.pkl,
+#       fitur_list.pkl, model_cbf_linear.npz
+#
+# Jalankan:  python model_registry.py --daftar | --rollback [VERSI] | --pangkas [N]
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from config import (
+    FITUR_LIST_PATH, LINEAR_SCORER_PATH, MODEL_CBF_PATH, MODEL_REGISTRY_DIR, N_VERSI_DISIMPAN, SCALER_PATH
+)
+from linear_scorer import LinearScorer, fold_scaler_into_model
+
+FILE_POINTER = 'AKTIF'
+FILE_MANIFEST = 'manifest.json'
+FILE_RIWAYAT = 'riwayat_aktivasi.jsonl'
+SUBDIR_VERSI = 'versi'
+PANJANG_VERSI = 16 # Karakter hash SHA-256 yang dipakai sebagai nama versi
+INTERVAL_CEK_S = float(os.environ.get('ISPU_INTERVAL_CEK_MODEL_S', 5.0)) # Jarak minimal antar baca pointer
+NAMA_THREAD_MUAT = 'ispu-muat-model'
+
+# Nama artefak di dalam direktori versi (sama dengan nama file lepas di direktori utama)
+ARTEFAK = {
+    'model': os.path.basename(MODEL_CBF_PATH),
+    'scaler': os.path.basename(SCALER_PATH),
+    'fitur_list': os.path.basename(FITUR_LIST_PATH),
+    'scorer_linear': os.path.basename(LINEAR_SCORER_PATH),
+}
+
+
+def _sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def tulis_atomik(path, tulis):
+    """Memanggil tulis(path_sementara) lalu os.replace: pembaca melihat file lama atau baru, tidak pernah setengah."""
+    root, ext = os.path.splitext(path)
+    tmp = f"{root}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}{ext}" # ekstensi dipertahankan (np.savez)
+    try:
+        tulis(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def simpan_atomik(obj, path):
+    """joblib.dump yang atomik untuk artefak lepas (kompatibilitas skrip lama)."""
+    return tulis_atomik(path, lambda tmp: joblib.dump(obj, tmp))
+
+
+def _tulis_json(path, data):
+    def tulis(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+    return tulis_atomik(path, tulis)
+
+
+def _dir_versi(versi, root=MODEL_REGISTRY_DIR):
+    return os.path.join(root, SUBDIR_VERSI, versi)
+
+
+# --- SNAPSHOT DATA LATIH ---
+def snapshot_data(df, path=None, n_baris=None):
+    """Ringkasan data latih untuk manifest: hash file, jumlah baris/stasiun, dan rentang tanggal.
+
+    `n_baris` mengganti len(df) jika `df` hanya ringkasan data (mis. rata-rata harian di build streaming);
+    tanpa `df` hanya hash file yang dicatat.
+    """
+    ada = df is not None and len(df) > 0
+    tanggal = df['tanggal_lengkap'] if ada and 'tanggal_lengkap' in df else None
+    return {
+        'file': path,
+        'sha256': _sha256(path) if path is not None and os.path.exists(path) else None,
+        'n_baris': int(len(df)) if n_baris is None and df is not None else n_baris,
+        'n_stasiun': int(df['stasiun'].nunique()) if ada and 'stasiun' in df else None,
+        'tanggal_awal': str(tanggal.min())[:19] if tanggal is not None else None,
+        'tanggal_akhir': str(tanggal.max())[:19] if tanggal is not None else None,
+    }
+
+
+# --- PUBLIKASI ---
+def publish_model(scaler, cbf_model, fitur_list, threshold, data, info_latih=None, root=MODEL_REGISTRY_DIR,
+                  aktifkan=True, simpan=N_VERSI_DISIMPAN):
+    """Menulis satu versi model ke registry lalu (opsional) mengaktifkannya; mengembalikan nama versi.
+
+    Artefak ditulis ke direktori sementara, nama versi = hash isi artefak + threshold +
+    snapshot data, lalu direktori di-rename ke `versi/<hash>` (atomik di filesystem yang sama).
+    Run dengan isi identik menghasilkan versi yang sama dan tidak menulis ulang apa pun.
+    """
+    os.makedirs(os.path.join(root, SUBDIR_VERSI), exist_ok=True)
+    tmp = os.path.join(root, f".tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(tmp)
+    try:
+        joblib.dump(cbf_model, os.path.join(tmp, ARTEFAK['model']))
+        joblib.dump(scaler, os.path.join(tmp, ARTEFAK['scaler']))
+        joblib.dump(list(fitur_list), os.path.join(tmp, ARTEFAK['fitur_list']))
+        fold_scaler_into_model(scaler, cbf_model, fitur_list, threshold).save(os.path.join(tmp, ARTEFAK['scorer_linear']))
+
+        artefak = {nama: {'file': file, 'sha256': _sha256(os.path.join(tmp, file))} for nama, file in ARTEFAK.items()}
+        isi = {'artefak': artefak, 'threshold': float(threshold), 'fitur_list': list(fitur_list), 'data': data}
+        versi = hashlib.sha256(json.dumps(isi, sort_keys=True, default=str).encode()).hexdigest()[:PANJANG_VERSI]
+
+        manifest = {
+            'versi': versi,
+            'dibuat': datetime.now().isoformat(timespec='seconds'),
+            'threshold': float(threshold),
+            'n_fitur': len(fitur_list),
+            'fitur_list': list(fitur_list),
+            'artefak': artefak,
+            'data': data,
+            'pelatihan': {
+                'model': type(cbf_model).__name__,
+                'parameter': {k: repr(v) for k, v in cbf_model.get_params().items()},
+                **(info_latih or {}),
+            },
+            'lingkungan': {'python': platform.python_version(), 'numpy': np.__version__,
+                           'sklearn': getattr(sys.modules.get('sklearn'), '__version__', None)},
+        }
+        _tulis_json(os.path.join(tmp, FILE_MANIFEST), manifest)
+
+        tujuan = _dir_versi(versi, root)
+        if os.path.isdir(tujuan):
+            print(f"ℹ️ Versi model {versi} sudah ada di registry (isi identik), tidak ditulis ulang.")
+        else:
+            try:
+                os.rename(tmp, tujuan)
+            except OSError:
+                if not os.path.isdir(tujuan): # Proses lain baru saja mempublikasikan isi yang sama
+                    raise
+            print(f"✅ Versi model {versi} dipublikasikan di: {tujuan}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if aktifkan:
+        activate_version(versi, root)
+    if simpan:
+        prune_versions(simpan, root)
+    return versi
+
+
+def activate_version(versi, root=MODEL_REGISTRY_DIR, rollback=False):
+    """Mengganti pointer versi aktif secara atomik (worker yang berjalan menukar model sendiri).
+
+    Setiap aktivasi juga ditambahkan ke riwayat_aktivasi.jsonl (`rollback` menandai langkah mundur).
+    """
+    if not os.path.exists(os.path.join(_dir_versi(versi, root), FILE_MANIFEST)):
+        raise FileNotFoundError(f"Versi model '{versi}' tidak ada di registry {root}.")
+    entri = {'versi': versi, 'diaktifkan': datetime.now().isoformat(timespec='seconds')}
+    _tulis_json(os.path.join(root, FILE_POINTER), entri)
+    with open(os.path.join(root, FILE_RIWAYAT), 'a', encoding='utf-8') as f:
+        f.write(json.dumps({**entri, 'rollback': rollback}) + '\n')
+    print(f"🔀 Pointer model aktif -> {versi}")
+    return versi
+
+
+def active_version(root=MODEL_REGISTRY_DIR):
+    """Nama versi aktif (satu baca file kecil), atau None jika registry belum berisi model."""
+    try:
+        with open(os.path.join(root, FILE_POINTER), encoding='utf-8') as f:
+            return json.load(f)['versi']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def read_manifest(versi, root=MODEL_REGISTRY_DIR):
+    with open(os.path.join(_dir_versi(versi, root), FILE_MANIFEST), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def list_versions(root=MODEL_REGISTRY_DIR):
+    """Manifest semua versi yang utuh, urut dari yang paling lama dibuat."""
+    try:
+        nama = os.listdir(os.path.join(root, SUBDIR_VERSI))
+    except OSError:
+        return []
+    daftar = []
+    for versi in nama:
+        try:
+            daftar.append(read_manifest(versi, root))
+        except (OSError, ValueError):
+            continue
+    return sorted(daftar, key=lambda m: (m.get('dibuat', ''), m['versi']))
+
+
+def riwayat_aktivasi(root=MODEL_REGISTRY_DIR):
+    """Urutan versi yang masih bisa dituju rollback, dari yang paling lama diaktifkan.
+
+    Riwayat diputar ulang seperti tumpukan: aktivasi biasa menambah versi di atas, rollback
+    memotong tumpukan kembali ke versi tujuannya. Urutan ini mengikuti aktivasi, bukan
+    waktu `dibuat` (publikasi ulang isi identik tidak mengubah `dibuat` versi lama).
+    """
+    tumpukan = []
+    try:
+        with open(os.path.join(root, FILE_RIWAYAT), encoding='utf-8') as f:
+            baris = f.readlines()
+    except OSError:
+        return tumpukan
+    for teks in baris:
+        try:
+            entri = json.loads(teks)
+            versi = entri['versi']
+        except (ValueError, KeyError, TypeError):
+            continue # Baris terakhir bisa terpotong jika proses mati saat menulis
+        if entri.get('rollback') and versi in tumpukan:
+            del tumpukan[len(tumpukan) - tumpukan[::-1].index(versi):]
+        elif not tumpukan or tumpukan[-1] != versi:
+            tumpukan.append(versi)
+    return tumpukan
+
+
+def rollback(versi=None, root=MODEL_REGISTRY_DIR):
+    """Mengaktifkan `versi`, atau versi yang aktif sebelum versi aktif saat ini jika tidak disebut."""
+    if versi is not None:
+        return activate_version(versi, root)
+    aktif = active_version(root)
+    ada = {m['versi'] for m in list_versions(root)}
+    tumpukan = riwayat_aktivasi(root)
+    if tumpukan and tumpukan[-1] == aktif:
+        tumpukan.pop()
+    kandidat = [v for v in tumpukan if v in ada and v != aktif] # Versi yang sudah dipangkas dilewati
+    if not kandidat:
+        raise ValueError("Tidak ada versi sebelumnya di riwayat aktivasi untuk rollback; sebutkan VERSI.")
+    return activate_version(kandidat[-1], root, rollback=True)
+
+
+def prune_versions(simpan=N_VERSI_DISIMPAN, root=MODEL_REGISTRY_DIR):
+    """Menghapus versi terlama di luar `simpan` versi terbaru; versi aktif tidak pernah dihapus."""
+    aktif = active_version(root)
+    daftar = [m['versi'] for m in list_versions(root)]
+    hapus = [v for v in daftar[:max(len(daftar) - simpan, 0)] if v != aktif]
+    for versi in hapus:
+        shutil.rmtree(_dir_versi(versi, root), ignore_errors=True)
+    if hapus:
+        print(f"🧹 {len(hapus)} versi model lama dihapus dari registry ({simpan} versi terbaru dipertahankan).")
+    return hapus
+
+
+# --- MEMUAT VERSI ---
+class ModelVersion:
+    """Satu versi model siap layan: scorer linear (tanpa sklearn), daftar fitur, threshold, manifest."""
+
+    def __init__(self, versi, root=MODEL_REGISTRY_DIR):
+        self.versi = versi
+        self.root = root
+        self.manifest = read_manifest(versi, root)
+        self.scorer = LinearScorer.load(self.path('scorer_linear'))
+        self.fitur_list = self.scorer.fitur_list
+        self.threshold = self.scorer.threshold
+
+    def path(self, artefak):
+        return os.path.join(_dir_versi(self.versi, self.root), ARTEFAK[artefak])
+
+    def load_sklearn(self):
+        """(scaler, cbf_model, fitur_list) asli versi ini, untuk evaluasi/audit."""
+        return joblib.load(self.path('scaler')), joblib.load(self.path('model')), joblib.load(self.path('fitur_list'))
+
+
+class RegistryWatcher:
+    """Versi model aktif untuk satu proses, ditukar tanpa restart saat pointer berganti.
+
+    Pointer dibaca paling sering sekali per `interval` detik. Versi baru dimuat di thread
+    latar; sampai selesai, request tetap dilayani versi lama, lalu referensinya ditukar
+    dalam satu assignment (request yang sedang berjalan tetap memegang objek lamanya).
+    """
+
+    def __init__(self, root=MODEL_REGISTRY_DIR, interval=INTERVAL_CEK_S):
+        self.root = root
+        self.interval = interval
+        self._aktif = None
+        self._cek_berikut = 0.0
+        self._kunci_muat = threading.Lock()
+
+    def model(self):
+        """ModelVersion yang sedang dilayani, atau None jika registry kosong (pakai aset lama)."""
+        sekarang = time.monotonic()
+        if sekarang >= self._cek_berikut:
+            self._cek_berikut = sekarang + self.interval
+            # Belum ada versi: dimuat langsung agar request ini sudah memakai registry;
+            # registry kosong pun hanya dicek sekali per interval
+            self.periksa(latar=self._aktif is not None)
+        return self._aktif
+
+    def periksa(self, latar=False):
+        """Membaca pointer; jika versinya berbeda, memuat versi itu (di thread latar jika `latar`)."""
+        versi = active_version(self.root)
+        if versi is None or (self._aktif is not None and versi == self._aktif.versi):
+            return self._aktif
+        if not latar:
+            self._tukar(versi)
+        elif not self._kunci_muat.locked(): # Versi baru sedang dimuat thread lain
+            threading.Thread(target=self._tukar, args=(versi,), name=NAMA_THREAD_MUAT, daemon=True).start()
+        return self._aktif
+
+    def _tukar(self, versi):
+        with self._kunci_muat:
+            if self._aktif is not None and self._aktif.versi == versi:
+                return
+            try:
+                baru = ModelVersion(versi, self.root)
+            except Exception as e:
+                print(f"⚠️ Versi model {versi} tidak dapat dimuat ({e}); tetap memakai versi sebelumnya.")
+                return
+            lama, self._aktif = self._aktif, baru
+            if lama is not None:
+                print(f"🔁 Model ditukar tanpa restart: {lama.versi} -> {versi}")
+
+
+def _cetak_daftar(root):
+    aktif = active_version(root)
+    daftar = list_versions(root)
+    if not daftar:
+        print(f"Registry {root} masih kosong. Jalankan `python preprocessing.py` terlebih dahulu.")
+        return
+    print(f"{'':2}{'versi':<18}{'dibuat':<21}{'threshold':>10}{'fitur':>7}{'baris data':>12}  rentang data")
+    for m in daftar:
+        data = m.get('data') or {}
+        rentang = f"{data['tanggal_awal'][:10]} s.d. {data['tanggal_akhir'][:10]}" if data.get('tanggal_awal') else '-'
+        print(f"{'*' if m['versi'] == aktif else '':2}{m['versi']:<18}{m.get('dibuat', ''):<21}{m['threshold']:>10.2f}"
+              f"{m['n_fitur']:>7}{data.get('n_baris') if data.get('n_baris') is not None else '-':>12}  {rentang}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Registry versi model CBF ISPU.")
+    parser.add_argument('--daftar', action='store_true', help="Tampilkan semua versi (* = aktif)")
+    parser.add_argument('--rollback', nargs='?', const='', default=None, metavar='VERSI',
+                        help="Aktifkan VERSI, atau versi yang aktif sebelumnya (riwayat aktivasi) jika kosong")
+    parser.add_argument('--pangkas', nargs='?', type=int, const=N_VERSI_DISIMPAN, default=None, metavar='N',
+                        help=f"Hapus versi lama di luar N terbaru (default {N_VERSI_DISIMPAN})")
+    parser.add_argument('--root', default=MODEL_REGISTRY_DIR, help="Direktori registry")
+    args = parser.parse_args()
+
+    try:
+        if args.rollback is not None:
+            rollback(args.rollback or None, args.root)
+        if args.pangkas is not None:
+            prune_versions(args.pangkas, args.root)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"❌ ERROR: {e}")
+        sys.exit(1)
+    _cetak_daftar(args.root)
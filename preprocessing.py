@@ -1,131 +1,490 @@
 import pandas as pd
 import numpy as np
 import os
-from sklearn.model_selection import train_test_split
+import sys
+from collections import deque
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
-import joblib 
+import joblib
+from feature_engine import batas_stasiun, ffill_per_stasiun, hitung_lag_roll
+from feature_store import write_feature_store, append_feature_store
+from hybrid_core import muat_aset_pkl, threshold_model
+from imputer import StationImputer, cutoff_latih, mask_uji
+from instrumentation import aktifkan, cetak_ringkasan_tahap, diukur, tahap
+from linear_scorer import LinearScorer, fold_scaler_into_model
+from model_registry import publish_model, simpan_atomik, snapshot_data, tulis_atomik
+from kpi_cube import build_kpi_cube, save_kpi_cube, update_kpi_cube
+from similarity import StationSimilarityEngine
+from shared_assets import write_shared_assets
+from config import BOBOT_KELAS, KONFIG_MODEL, OPTIMAL_THRESHOLD, STATION_IDS, normalize_station
 
 # --- A. KONFIGURASI DAN DEFINISI ---
-FILE_DATA = 'data_kualitas_udara_gabungan_final.csv' 
+FILE_DATA = 'data_kualitas_udara_gabungan_final.csv'
 OUTPUT_FILE_ADVANCED = 'data_ispu_preprocess_final_ADVANCED.csv'
 MODEL_CBF_PATH = 'model_cbf_rekomendasi.pkl'
 SCALER_PATH = 'scaler_rekomendasi.pkl'
 FITUR_LIST_PATH = 'fitur_list.pkl'
+THRESHOLD_CBF_PATH = 'threshold_cbf_rekomendasi.pkl'
+OUTPUT_FEATURE_STORE = 'feature_store_ispu'
+FEATURE_STATE_PATH = 'feature_state_ispu.pkl'
+IMPUTER_PATH = 'imputer_ispu.pkl'
+LINEAR_SCORER_PATH = 'model_cbf_linear.npz'
+KPI_CUBE_PATH = 'kpi_cube_bulanan.csv'
+SIMILARITY_STATE_PATH = 'similarity_state.pkl'
+NEIGHBOUR_INDEX_PATH = 'neighbour_index.pkl'
+SHARED_ASSET_PATH = 'aset_bersama_ispu.bin'
+MODEL_REGISTRY_DIR = 'registry_model_ispu'
 
 POLUTAN_COLS = ['pm10', 'pm25', 'so2', 'co', 'o3', 'no2']
-WINDOW_SIZE = 7
+# Window rolling berbasis WAKTU, bukan jumlah baris: '7D' untuk data harian, mis. '24h' untuk data per jam.
+# Window (t - window, t] per stasiun, jadi hari/jam yang hilang tidak memperlebar window.
+# Default '7D' (config.KONFIG_MODEL_DEFAULT); ditimpa window terbaik di best_config.json hasil tuning.py.
+WINDOW_ROLL = KONFIG_MODEL['window']
+PRIMARY_KEY = ['stasiun', 'tanggal_lengkap', 'jam']
+KOLOM_YANG_DIHAPUS = ['periode_data', 'max_ispu', 'tahun', 'bulan', 'hari', 'parameter_kritis']
 
-# --- B. FUNGSI UTAMA: BUILD ASSET & TRAIN MODEL ---
-def build_assets_and_train():
-    print("--- ⚙️ TAHAP 1: MEMUAT DAN MEMBERSIHKAN DATA GABUNGAN ---")
-    
-    try:
-        df = pd.read_csv(FILE_DATA)
-    except FileNotFoundError:
-        print(f"❌ ERROR: File '{FILE_DATA}' tidak ditemukan. Mohon pastikan script merging sudah berjalan.")
-        return
 
-    # 1. Pembersihan & Imputasi Dasar
+# --- B. TAHAPAN PREPROCESSING (dipakai mode penuh & inkremental) ---
+@diukur()
+def bersihkan_data_mentah(df):
+    """Parsing tanggal, filter stasiun valid, kolom jam, dan hapus duplikat Kunci Primer."""
     df['tanggal_lengkap'] = pd.to_datetime(df['tanggal_lengkap'], errors='coerce')
-    
+
     # Filter Data Leakage (Hanya stasiun valid)
     df = df[df['stasiun'].astype(str).str.startswith('DKI')].copy()
-    
+
+    # Nama mentah -> nama & ID kanonik (sekali per nama unik, bukan per baris)
+    nama_unik = df['stasiun'].unique()
+    df['stasiun'] = df['stasiun'].map({s: normalize_station(s) for s in nama_unik})
+    df['id_stasiun'] = df['stasiun'].map(STATION_IDS).fillna(0).astype('int8')
+    tidak_dikenal = sorted(df.loc[df['id_stasiun'] == 0, 'stasiun'].unique())
+    if tidak_dikenal:
+        print(f"⚠️ Stasiun tidak dikenal di config.STATION_MAP (id 0): {tidak_dikenal}")
+
     # --- PERBAIKAN KRITIS #1: Tentukan dan Hapus Duplikat pada Kunci Primer ---
-    
+
     # 1. Pastikan kolom 'jam' dihitung untuk Kunci Primer (Asumsi data Anda harian, jam = 0)
-    df['jam'] = df['tanggal_lengkap'].dt.hour.fillna(0).astype(int) 
-    
-    # 2. Definisikan Kunci Primer (yang harus unik)
-    PRIMARY_KEY = ['stasiun', 'tanggal_lengkap', 'jam']
-    
+    df['jam'] = df['tanggal_lengkap'].dt.hour.fillna(0).astype(int)
+
     initial_rows = len(df)
-    
-    # 3. Menghapus duplikat. Jika ada baris tumpang tindih pada Kunci Primer, hanya ambil yang pertama.
+
+    # 2. Menghapus duplikat. Jika ada baris tumpang tindih pada Kunci Primer, hanya ambil yang pertama.
     df.drop_duplicates(subset=PRIMARY_KEY, keep='first', inplace=True)
     print(f"   [Pembersihan Duplikat Kunci]: {initial_rows - len(df)} baris duplikat (dengan Kunci Primer yang sama) dihapus.")
-    
+
     # --- PERBAIKAN KRITIS #2: Urutkan Data SECARA KETAT sebelum Lag/Roll ---
     # Wajib diurutkan berdasarkan Stasiun, Tanggal, dan Jam secara kronologis.
-    df = df.sort_values(by=PRIMARY_KEY).reset_index(drop=True)
+    return df.sort_values(by=PRIMARY_KEY).reset_index(drop=True)
 
-    # Imputasi & Outlier
-    for col in POLUTAN_COLS:
-        # Imputasi dilakukan per stasiun untuk mengisi gap (Forward Fill)
-        df[col] = df.groupby('stasiun')[col].ffill() 
-        df[col] = df[col].fillna(df[col].mean()) # Isi sisa NaN dengan mean global
-        batas_atas = df[col].quantile(0.99)
-        df[col] = np.where(df[col] > batas_atas, batas_atas, df[col]) # Batasi outlier
-    
-    print("✅ Pembersihan dan Imputasi Dasar Selesai.")
-    
-    # --- 2. Feature Engineering Siklus Waktu ---
-    # Kolom jam sudah dibuat
+
+@diukur()
+def tambah_fitur_waktu(df):
+    """Feature engineering siklus waktu (jam sudah dibuat saat pembersihan)."""
     df['hari_dalam_minggu'] = df['tanggal_lengkap'].dt.dayofweek.fillna(0).astype(int) # Senin=0, Minggu=6
     df['nomor_bulan'] = df['tanggal_lengkap'].dt.month.fillna(0).astype(int)
     df['musim'] = (df['nomor_bulan'] % 12 + 3) // 3
+    return df
 
-    # --- 3. ADVANCED FEATURE ENGINEERING (Lagged & Rolling) ---
-    print("\n--- 🧠 TAHAP 2: ADVANCED FEATURE ENGINEERING (Lag/Roll) ---")
 
-    for col in POLUTAN_COLS:
-        # Lagged Features (t-1): Menggunakan GROUPBY untuk mencegah data leak antar stasiun.
-        df[f'{col}_lag1'] = df.groupby('stasiun')[col].shift(1)
-        
-        # Rolling Average (7 hari): Menggunakan GROUPBY dan ROLLING pada data yang sudah diurutkan
-        df[f'{col}_roll{WINDOW_SIZE}'] = df.groupby('stasiun')[col].rolling(
-            window=WINDOW_SIZE, min_periods=1
-        ).mean().reset_index(level=0, drop=True)
-
-    # Isi NaN pada kolom fitur yang baru dibuat (Lag/Roll)
-    lag_roll_cols = [c for c in df.columns if '_lag1' in c or f'_roll{WINDOW_SIZE}' in c]
-    for col in lag_roll_cols:
-        # Mengisi nilai NaN pada data awal dengan mean kolom tersebut.
-        df[col] = df[col].fillna(df[col].mean())
+@diukur()
+def imputasi_polutan(df, imputer=None, cutoff=None):
+    """Forward fill per stasiun, sisa NaN diisi mean stasiun, lalu outlier dibatasi kuantil 0.99 stasiun.
+
+    Jika `imputer` belum ada, di-fit HANYA pada baris dengan tanggal < `cutoff` (tanpa
+    kebocoran dari masa depan). Mengembalikan (df, imputer).
+    """
+    # Imputasi dilakukan per stasiun untuk mengisi gap (Forward Fill), semua polutan sekaligus
+    batas = batas_stasiun(df['stasiun'])
+    df[POLUTAN_COLS] = ffill_per_stasiun(df[POLUTAN_COLS].to_numpy(dtype=np.float64), batas)
+    if imputer is None:
+        imputer = StationImputer.fit(df, POLUTAN_COLS, cutoff)
+    return imputer.transform(df), imputer
+
+
+@diukur()
+def tambah_fitur_lag_roll(df, imputer, window=WINDOW_ROLL, max_workers=None):
+    """Fitur lag (observasi sebelumnya) dan rolling mean berbasis waktu per stasiun.
+
+    `window` berupa offset waktu ('7D', '24h', ...). Data harus sudah terurut per stasiun
+    dan waktu (lihat bersihkan_data_mentah); NaN awal diisi mean polutan stasiun dari
+    `imputer` (statistik periode latih, sama seperti di mode inkremental).
+    Dihitung per stasiun oleh feature_engine (cumsum NumPy, paralel untuk data besar).
+    """
+    # Data dipecah sekali per stasiun: lag tidak bocor antar stasiun, tanpa groupby per polutan
+    batas = batas_stasiun(df['stasiun'])
+    waktu = df['tanggal_lengkap'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    lag, roll = hitung_lag_roll(waktu, df[POLUTAN_COLS].to_numpy(dtype=np.float64), batas, window, max_workers)
+    for j, col in enumerate(POLUTAN_COLS):
+        df[f'{col}_lag1'] = lag[:, j]
+        df[f'{col}_roll{window}'] = roll[:, j]
+
+    # Isi NaN pada kolom fitur yang baru dibuat (Lag/Roll) dengan mean latih stasiunnya
+    mean, _ = imputer.parameter(df['stasiun'])
+    for j, col in enumerate(POLUTAN_COLS):
+        for kolom in (f'{col}_lag1', f'{col}_roll{window}'):
+            nilai = df[kolom].to_numpy(dtype=np.float64)
+            df[kolom] = np.where(np.isnan(nilai), mean[:, j], nilai)
+    return df
 
+
+@diukur()
+def finalisasi_dataset(df, kolom_output=None):
+    """Dropna final, One-Hot Encoding, dan hapus kolom non-model.
+
+    Jika `kolom_output` diberikan (mode inkremental), skema disamakan dengan dataset ADVANCED yang ada.
+    """
     # Hapus semua baris yang mungkin masih memiliki NaN pada kolom krusial (biasanya baris pertama)
     df_clean = df.dropna().reset_index(drop=True)
     print(f"   [Pembersihan NaN Final]: {len(df) - len(df_clean)} baris dengan NaN di Lag/Roll (akibat data sangat awal) dihapus.")
     df = df_clean
-    
-    # --- 4. One-Hot Encoding (OHE) ---
-    df_ohe_stasiun = pd.get_dummies(df['stasiun'], prefix='stasiun', dtype=bool)
+
+    # --- One-Hot Encoding (OHE) ---
+    # OHE dari stasiun kanonik saja: kolom selalu sama (satu per ID) meski stasiun absen
+    df_ohe_stasiun = pd.get_dummies(
+        pd.Categorical(df['stasiun'], categories=list(STATION_IDS)), prefix='stasiun', dtype=bool
+    ).set_axis(df.index)
     df_ohe_kategori = pd.get_dummies(df['kategori'], prefix='kategori', dtype=bool)
     df = pd.concat([df, df_ohe_stasiun, df_ohe_kategori], axis=1)
 
     # Hapus kolom yang tidak relevan untuk input model
-    KOLOM_YANG_DIHAPUS = ['periode_data', 'max_ispu', 'tahun', 'bulan', 'hari', 'parameter_kritis']
     df_clean = df.drop(columns=KOLOM_YANG_DIHAPUS, errors='ignore')
-    
+    if kolom_output is not None:
+        kolom_baru = [c for c in df_clean.columns if c not in kolom_output]
+        if kolom_baru:
+            print(f"⚠️ Kolom baru diabaikan (perlu rebuild penuh): {kolom_baru}")
+        df_clean = df_clean.reindex(columns=kolom_output)
+        ohe_cols = [c for c in kolom_output if c.startswith('stasiun_') or c.startswith('kategori_')]
+        df_clean[ohe_cols] = df_clean[ohe_cols].fillna(False).astype(bool)
+    return df_clean
+
+
+def pilih_fitur_input(df_clean):
+    """Kolom input model: semua kolom kecuali kunci/identitas dan OHE kategori (target)."""
+    fitur_input = [col for col in df_clean.columns if col not in ['tanggal_lengkap', 'stasiun', 'id_stasiun', 'kategori']]
+    return [col for col in fitur_input if not col.startswith('kategori_')] # Hapus kolom OHE kategori dari X
+
+
+# --- C. STATE PER STASIUN UNTUK MODE INKREMENTAL ---
+def bangun_feature_state(df_imputasi, last_observed, kolom_output):
+    """Menyimpan state per stasiun: kunci terakhir, nilai terakhir (ffill), dan buffer window waktu.
+
+    Buffer berisi (waktu, nilai) yang masih berada di dalam WINDOW_ROLL dari baris terakhir.
+    """
+    rentang = pd.Timedelta(WINDOW_ROLL)
+    stations = {}
+    for stasiun, grp in df_imputasi.groupby('stasiun', sort=False):
+        grp_valid = grp[grp['tanggal_lengkap'].notna()]
+        if grp_valid.empty:
+            continue
+        last = grp_valid.iloc[-1]
+        dalam_window = grp_valid[grp_valid['tanggal_lengkap'] > last['tanggal_lengkap'] - rentang]
+        stations[stasiun] = {
+            'last_key': (last['tanggal_lengkap'], int(last['jam'])),
+            'last_observed': {col: last_observed.at[stasiun, col] for col in POLUTAN_COLS},
+            'waktu': deque(dalam_window['tanggal_lengkap'].tolist()),
+            'buffer': {col: deque(dalam_window[col].tolist()) for col in POLUTAN_COLS},
+            'lag': {col: last[col] for col in POLUTAN_COLS},
+        }
+    return {'stations': stations, 'kolom_output': kolom_output, 'window': WINDOW_ROLL}
+
+
+@diukur()
+def hitung_fitur_inkremental(df_baru, state, imputer, perbarui=False):
+    """Menghitung fitur turunan baris baru dalam O(baris baru) memakai state per stasiun.
+
+    Imputasi memakai artefak `imputer` beku yang sama dengan build penuh, jadi nilainya identik
+    dengan rebuild penuh. `perbarui=True` memasukkan setiap pembacaan ke mean & sketsa batas
+    stasiun (O(1)); hasilnya lalu MENYIMPANG dari rebuild penuh, yang hanya fit pada tanggal < cutoff.
+    """
+    rentang = pd.Timedelta(WINDOW_ROLL)
+    rows = []
+    dilewati = 0
+    for rec in df_baru.to_dict('records'):
+        if pd.isna(rec['tanggal_lengkap']):
+            dilewati += 1 # Di rebuild penuh, tanggal NaT diurutkan terakhir dan tidak mempengaruhi baris lain
+            continue
+        st_state = state['stations'].setdefault(rec['stasiun'], {
+            'last_key': None,
+            'last_observed': {col: np.nan for col in POLUTAN_COLS},
+            'waktu': deque(),
+            'buffer': {col: deque() for col in POLUTAN_COLS},
+            'lag': {col: np.nan for col in POLUTAN_COLS},
+        })
+        key = (rec['tanggal_lengkap'], int(rec['jam']))
+        if st_state['last_key'] is not None and key <= st_state['last_key']:
+            dilewati += 1 # Duplikat atau data terlambat: butuh rebuild penuh
+            continue
+        st_state['last_key'] = key
+
+        # Buang nilai yang keluar dari window (t - WINDOW_ROLL, t]
+        waktu = st_state['waktu']
+        waktu.append(rec['tanggal_lengkap'])
+        n_keluar = 0
+        while waktu[0] <= rec['tanggal_lengkap'] - rentang:
+            waktu.popleft()
+            n_keluar += 1
+
+        # Forward fill per stasiun, lalu mean & batas outlier stasiun dari imputer
+        mentah = []
+        for col in POLUTAN_COLS:
+            val = rec[col]
+            if pd.isna(val):
+                val = st_state['last_observed'][col]
+            else:
+                st_state['last_observed'][col] = val
+            mentah.append(val)
+        mean_latih, _ = imputer.parameter_stasiun(rec['stasiun'])
+        nilai = imputer.transform_baris(rec['stasiun'], mentah, perbarui=perbarui)
+
+        for j, col in enumerate(POLUTAN_COLS):
+            val = float(nilai[j])
+            lag = st_state['lag'][col]
+            rec[f'{col}_lag1'] = mean_latih[j] if pd.isna(lag) else lag
+            st_state['lag'][col] = val
+
+            buf = st_state['buffer'][col]
+            buf.append(val)
+            for _ in range(n_keluar):
+                buf.popleft()
+            rec[f'{col}_roll{WINDOW_ROLL}'] = float(np.mean(buf))
+            rec[col] = val
+        rows.append(rec)
+
+    if dilewati:
+        print(f"   [Inkremental]: {dilewati} baris dilewati (duplikat/terlambat/tanpa tanggal).")
+    return pd.DataFrame(rows, columns=list(df_baru.columns) + [
+        f'{col}_{suffix}' for col in POLUTAN_COLS for suffix in ('lag1', f'roll{WINDOW_ROLL}')
+    ])
+
+
+# --- D. FUNGSI UTAMA: BUILD ASSET & TRAIN MODEL ---
+@diukur()
+def build_assets_and_train():
+    print("--- ⚙️ TAHAP 1: MEMUAT DAN MEMBERSIHKAN DATA GABUNGAN ---")
+    try:
+        with tahap('preprocessing.baca_csv'):
+            df = pd.read_csv(FILE_DATA)
+    except FileNotFoundError:
+        print(f"❌ ERROR: File '{FILE_DATA}' tidak ditemukan. Jalankan `python ingest.py` terlebih dahulu.")
+        return
+
+    # 1. Pembersihan & Imputasi Dasar
+    df = bersihkan_data_mentah(df)
+
+    # Nilai terakhir yang teramati per stasiun (state forward fill untuk mode inkremental)
+    last_observed = df[df['tanggal_lengkap'].notna()].groupby('stasiun')[POLUTAN_COLS].last()
+
+    # Imputasi & Outlier
+    cutoff = cutoff_latih(df['tanggal_lengkap'])
+    df, imputer = imputasi_polutan(df, cutoff=cutoff)
+    joblib.dump(imputer, IMPUTER_PATH)
+
+    print(f"✅ Pembersihan dan Imputasi Dasar Selesai (imputer di-fit pada tanggal < {str(cutoff)[:10]}, "
+          f"{len(imputer.mean) - 1} stasiun, tersimpan di: {IMPUTER_PATH}).")
+
+    # --- 2. Feature Engineering Siklus Waktu ---
+    df = tambah_fitur_waktu(df)
+
+    # --- 3. ADVANCED FEATURE ENGINEERING (Lagged & Rolling) ---
+    print("\n--- 🧠 TAHAP 2: ADVANCED FEATURE ENGINEERING (Lag/Roll) ---")
+
+    df = tambah_fitur_lag_roll(df, imputer)
+
+    df_imputasi = df[PRIMARY_KEY + POLUTAN_COLS]
+
+    # --- 4. Dropna Final & One-Hot Encoding (OHE) ---
+    df_clean = finalisasi_dataset(df)
+
     # Simpan Data Advanced FE
-    df_clean.to_csv(OUTPUT_FILE_ADVANCED, index=False)
+    with tahap('preprocessing.tulis_csv'):
+        df_clean.to_csv(OUTPUT_FILE_ADVANCED, index=False)
     print(f"✅ Dataset Advanced FE ({len(df_clean)} baris) tersimpan di: {OUTPUT_FILE_ADVANCED}")
 
+    # Simpan juga sebagai feature store kolumnar (Parquet bertipe, terpartisi tahun/stasiun)
+    try:
+        with tahap('preprocessing.feature_store'):
+            write_feature_store(df_clean, OUTPUT_FEATURE_STORE)
+        print(f"✅ Feature store Parquet tersimpan di: {OUTPUT_FEATURE_STORE}/")
+    except ImportError:
+        print("⚠️ pyarrow tidak terpasang, feature store dilewati (aplikasi memakai CSV).")
+
+    # Kubus KPI bulanan untuk dashboard (filter tahun dijawab dari agregat, bukan baris mentah)
+    with tahap('preprocessing.kpi_cube'):
+        save_kpi_cube(build_kpi_cube(df_clean), KPI_CUBE_PATH)
+    print(f"✅ Kubus KPI bulanan tersimpan di: {KPI_CUBE_PATH}")
+
+    # Statistik cukup kesamaan stasiun (dot product & norma per pasangan, semua polutan)
+    with tahap('preprocessing.similarity'):
+        sim_engine = StationSimilarityEngine.from_dataframe(df_clean)
+    joblib.dump(sim_engine, SIMILARITY_STATE_PATH)
+    joblib.dump(sim_engine.neighbour_index(), NEIGHBOUR_INDEX_PATH)
+    print(f"✅ State kesamaan stasiun & indeks tetangga tersimpan di: {SIMILARITY_STATE_PATH}, {NEIGHBOUR_INDEX_PATH}")
+
+    # Simpan state per stasiun agar data harian baru bisa diproses secara inkremental
+    with tahap('preprocessing.feature_state'):
+        joblib.dump(bangun_feature_state(df_imputasi, last_observed, list(df_clean.columns)), FEATURE_STATE_PATH)
+    print(f"✅ State fitur inkremental tersimpan di: {FEATURE_STATE_PATH}")
+
     # --- 5. PELATIHAN MODEL CBF & PENYIMPANAN ASET ---
     print("\n--- 🤖 TAHAP 3: PELATIHAN MODEL CBF & PENYIMPANAN ASET ---")
-    
+
     # Definisikan Fitur (X) dan Target (Y)
-    fitur_input = [col for col in df_clean.columns if col not in ['tanggal_lengkap', 'stasiun', 'kategori']]
-    fitur_input = [col for col in fitur_input if not col.startswith('kategori_')] # Hapus kolom OHE kategori dari X
+    fitur_input = pilih_fitur_input(df_clean)
 
     X = df_clean[fitur_input].fillna(0) # Sudah diisi di atas, tapi jaga-jaga
     Y = df_clean['kategori_TIDAK SEHAT'] # Target: Klasifikasi TIDAK SEHAT (1) atau tidak (0)
 
+    # Split berdasarkan tanggal dengan cutoff imputer: latih = masa lalu, uji = periode terakhir
+    # (evaluation.py memakai cutoff yang sama, jadi baris uji tidak pernah ikut pelatihan)
+    uji = mask_uji(df_clean['tanggal_lengkap'], cutoff)
     scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    with tahap('preprocessing.scaler_fit'):
+        X_train = scaler.fit_transform(X[~uji])
+    Y_train = Y[~uji]
+    # C, bobot kelas, dan window sama dengan yang dipakai tuning.py saat memilih OPTIMAL_THRESHOLD
+    cbf_model = LogisticRegression(solver='liblinear', random_state=42, C=KONFIG_MODEL['C'],
+                                   class_weight=BOBOT_KELAS[KONFIG_MODEL['class_weight']])
+    with tahap('preprocessing.latih_model'):
+        cbf_model.fit(X_train, Y_train)
+
+    # Simpan Aset Model: satu versi baru di registry (pointer aktif diganti atomik),
+    # salinan .pkl lepas tetap ditulis (atomik) untuk skrip lama & jalur tanpa registry
+    with tahap('preprocessing.publish_model'):
+        publish_model(
+            scaler, cbf_model, fitur_input, OPTIMAL_THRESHOLD, snapshot_data(df_clean, OUTPUT_FILE_ADVANCED),
+            info_latih={'cutoff_imputasi': str(cutoff)[:10], 'cutoff_uji': str(cutoff)[:10],
+                        'n_latih': len(X_train), 'n_uji': int(uji.sum()),
+                        'konfig_model': KONFIG_MODEL},
+            root=MODEL_REGISTRY_DIR,
+        )
+    simpan_atomik(cbf_model, MODEL_CBF_PATH)
+    simpan_atomik(scaler, SCALER_PATH)
+    simpan_atomik(fitur_input, FITUR_LIST_PATH)
+    simpan_atomik(OPTIMAL_THRESHOLD, THRESHOLD_CBF_PATH) # Threshold milik model .pkl ini (bukan config saat dimuat)
+
+    print(f"--- ✅ ASET SIAP! Model, Scaler, Fitur List, dan Threshold (.pkl) tersimpan.")
+
+    scorer = export_linear_scorer(scaler, cbf_model, fitur_input)
+    ekspor_aset_bersama(df_clean, scorer, sim_engine)
+
+
+# --- E. EKSPOR SCORER LINEAR (TANPA SKLEARN SAAT INFERENSI) ---
+def _model_sesuai_konfig(cbf_model, fitur_list):
+    """True jika window fitur (dan C/bobot kelas untuk LogisticRegression) sama dengan config.KONFIG_MODEL."""
+    if f"pm25_roll{KONFIG_MODEL['window']}" not in fitur_list:
+        return False
+    if isinstance(cbf_model, LogisticRegression):
+        return (cbf_model.C == KONFIG_MODEL['C']
+                and cbf_model.class_weight == BOBOT_KELAS[KONFIG_MODEL['class_weight']])
+    return True
+
+
+@diukur()
+def export_linear_scorer(scaler=None, cbf_model=None, fitur_list=None):
+    """Melipat scaler ke koefisien model dan menyimpan satu artefak .npz.
+
+    Dipanggil tanpa argumen (`--ekspor-linear`), model .pkl yang ada juga dipublikasikan ke
+    registry sebagai versi baru, asalkan dilatih dengan C, bobot kelas, dan window yang sama
+    dengan config.KONFIG_MODEL (threshold hasil tuning tidak berlaku untuk model lain).
+    """
+    threshold = OPTIMAL_THRESHOLD
+    if scaler is None or cbf_model is None or fitur_list is None:
+        scaler, cbf_model, fitur_list = muat_aset_pkl(SCALER_PATH, MODEL_CBF_PATH, FITUR_LIST_PATH, THRESHOLD_CBF_PATH)
+        threshold = threshold_model(cbf_model) # Threshold yang disimpan bersama .pkl (0.70 jika belum ada)
+        if not _model_sesuai_konfig(cbf_model, fitur_list):
+            print(f"❌ ERROR: Model .pkl tidak dilatih dengan konfigurasi {KONFIG_MODEL}. "
+                  "Jalankan `python preprocessing.py` untuk melatih ulang.")
+            return None
+        info_latih = {'sumber': 'ekspor-linear'}
+        if os.path.exists(IMPUTER_PATH): # Split tanggal model .pkl = cutoff imputer build yang sama
+            info_latih['cutoff_uji'] = str(joblib.load(IMPUTER_PATH).cutoff)[:10]
+        publish_model(scaler, cbf_model, fitur_list, threshold, snapshot_data(None, OUTPUT_FILE_ADVANCED),
+                      info_latih=info_latih, root=MODEL_REGISTRY_DIR)
+
+    scorer = fold_scaler_into_model(scaler, cbf_model, fitur_list, threshold)
+    tulis_atomik(LINEAR_SCORER_PATH, scorer.save)
+    print(f"✅ Scorer linear ({len(scorer.fitur_list)} fitur, threshold {scorer.threshold}) tersimpan di: {LINEAR_SCORER_PATH}")
+    return scorer
+
+
+@diukur()
+def ekspor_aset_bersama(df_clean=None, scorer=None, sim_engine=None):
+    """Menulis file aset bersama (memory-mapped) untuk dibagi semua worker aplikasi."""
+    if df_clean is None:
+        df_clean = pd.read_csv(OUTPUT_FILE_ADVANCED)
+    if scorer is None:
+        scorer = LinearScorer.load(LINEAR_SCORER_PATH)
+    if sim_engine is None:
+        sim_engine = joblib.load(SIMILARITY_STATE_PATH)
+    write_shared_assets(df_clean, scorer, sim_engine, SHARED_ASSET_PATH)
+    print(f"✅ Aset bersama ({len(df_clean)} baris, {len(scorer.fitur_list)} fitur) tersimpan di: {SHARED_ASSET_PATH}")
+
+
+# --- F. MODE INKREMENTAL: HANYA BARIS BARU ---
+@diukur()
+def update_assets_incremental(file_data_baru):
+    """Menambahkan baris ISPU baru tanpa rebuild penuh dan tanpa melatih ulang model."""
+    print("--- ⚙️ MODE INKREMENTAL: MEMPROSES DATA BARU ---")
+
+    try:
+        df_baru_mentah = pd.read_csv(file_data_baru)
+        state = joblib.load(FEATURE_STATE_PATH)
+        imputer = joblib.load(IMPUTER_PATH)
+    except FileNotFoundError as e:
+        print(f"❌ ERROR: {e}. Jalankan build penuh (python preprocessing.py) terlebih dahulu.")
+        return
+
+    if state.get('window') != WINDOW_ROLL:
+        print(f"❌ ERROR: State fitur dibuat dengan window {state.get('window')}, bukan {WINDOW_ROLL}. Jalankan build penuh terlebih dahulu.")
+        return
+
+    df_baru = hitung_fitur_inkremental(bersihkan_data_mentah(df_baru_mentah.copy()), state, imputer)
+    if df_baru.empty:
+        print("ℹ️ Tidak ada baris baru yang valid untuk ditambahkan.")
+        return
+
+    df_clean = finalisasi_dataset(tambah_fitur_waktu(df_baru), kolom_output=state['kolom_output'])
+
+    # Tambahkan (append) ke output yang ada, bukan menulis ulang seluruh riwayat
+    df_clean.to_csv(OUTPUT_FILE_ADVANCED, mode='a', header=False, index=False)
+    if os.path.isdir(OUTPUT_FEATURE_STORE):
+        append_feature_store(df_clean, OUTPUT_FEATURE_STORE)
+    update_kpi_cube(df_clean, KPI_CUBE_PATH)
+    if os.path.exists(SIMILARITY_STATE_PATH):
+        # O(stasiun²) per hari baru, tanpa pivot ulang seluruh riwayat
+        sim_engine = joblib.load(SIMILARITY_STATE_PATH)
+        for hari, df_hari in df_clean.groupby(sim_engine.bucket(df_clean['tanggal_lengkap'])):
+            if sim_engine.last_day is None or hari > sim_engine.last_day:
+                sim_engine.update_day(hari, df_hari)
+        joblib.dump(sim_engine, SIMILARITY_STATE_PATH)
+        joblib.dump(sim_engine.neighbour_index(), NEIGHBOUR_INDEX_PATH)
+    print(f"✅ {len(df_clean)} baris baru ditambahkan ke {OUTPUT_FILE_ADVANCED}")
+
+    # Data mentah ikut disimpan agar rebuild penuh berikutnya mencakup baris ini
+    kolom_mentah = pd.read_csv(FILE_DATA, nrows=0).columns
+    df_baru_mentah.reindex(columns=kolom_mentah).to_csv(FILE_DATA, mode='a', header=False, index=False)
+    joblib.dump(state, FEATURE_STATE_PATH)
+    print(f"✅ State fitur inkremental diperbarui: {FEATURE_STATE_PATH}")
 
-    X_train, X_test, Y_train, Y_test = train_test_split(X_scaled, Y, test_size=0.2, random_state=42)
-    cbf_model = LogisticRegression(solver='liblinear', random_state=42, class_weight='balanced')
-    cbf_model.fit(X_train, Y_train)
+    # File aset bersama adalah snapshot read-only; ditulis ulang (atomik) jika sudah dipakai
+    if os.path.exists(SHARED_ASSET_PATH):
+        ekspor_aset_bersama()
 
-    # Simpan Aset Model
-    joblib.dump(cbf_model, MODEL_CBF_PATH)
-    joblib.dump(scaler, SCALER_PATH)
-    joblib.dump(fitur_input, FITUR_LIST_PATH)
-    
-    print(f"--- ✅ ASET SIAP! Model, Scaler, dan Fitur List (.pkl) tersimpan.")
 
 # --- EKSEKUSI UTAMA ---
 if __name__ == '__main__':
-    build_assets_and_train()
\ No newline at end of file
+    # CLI sekali jalan: durasi tahap selalu dicatat (overhead tak berarti) dan diringkas di akhir
+    aktifkan()
+    if len(sys.argv) == 3 and sys.argv[1] == '--inkremental':
+        update_assets_incremental(sys.argv[2])
+    elif len(sys.argv) == 2 and sys.argv[1] == '--ekspor-linear':
+        export_linear_scorer()
+    elif len(sys.argv) == 2 and sys.argv[1] == '--aset-bersama':
+        ekspor_aset_bersama()
+    elif len(sys.argv) == 2 and sys.argv[1] == '--streaming':
+        # Build out-of-core per partisi stasiun (memori dibatasi stasiun terbesar)
+        from preprocessing_streaming import build_assets_streaming
+        build_assets_streaming()
+    else:
+        build_assets_and_train()
+    cetak_ringkasan_tahap()
@@ -0,0 +1,285 @@
+# preprocessing_streaming.py
+# Build penuh out-of-core: arsip mentah dipecah per STASIUN, lalu setiap partisi diproses
+# sendiri-sendiri (fitur lag/roll memang dihitung per stasiun). Puncak memori dibatasi oleh
+# partisi stasiun terbesar, bukan seluruh arsip. Scaler di-fit dengan partial_fit dan model
+# dilatih inkremental (SGDClassifier, log loss) beberapa epoch atas partisi.
+#
+# Jalankan:  python preprocessing.py --streaming
+
+import os
+import re
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from config import BOBOT_KELAS, KONFIG_MODEL, OPTIMAL_THRESHOLD, normalize_station
+from evaluation import konfusi_per_threshold
+from feature_engine import batas_stasiun, ffill_per_stasiun
+from feature_store import append_feature_store
+from imputer import StationImputer, cutoff_latih, mask_uji
+from instrumentation import aktifkan, cetak_ringkasan_tahap, diukur, tahap
+from kpi_cube import build_kpi_cube, merge_kpi_cube, save_kpi_cube
+from model_registry import publish_model, simpan_atomik, snapshot_data
+from similarity import RESOLUSI_DEFAULT, StationSimilarityEngine
+from preprocessing import (
+    FEATURE_STATE_PATH, FILE_DATA, FITUR_LIST_PATH, IMPUTER_PATH, KPI_CUBE_PATH, MODEL_CBF_PATH, MODEL_REGISTRY_DIR,
+    NEIGHBOUR_INDEX_PATH, OUTPUT_FEATURE_STORE, OUTPUT_FILE_ADVANCED, POLUTAN_COLS, PRIMARY_KEY, SCALER_PATH,
+    SHARED_ASSET_PATH, SIMILARITY_STATE_PATH, THRESHOLD_CBF_PATH, WINDOW_ROLL,
+    bangun_feature_state, bersihkan_data_mentah, export_linear_scorer, finalisasi_dataset, pilih_fitur_input,
+    tambah_fitur_lag_roll, tambah_fitur_waktu
+)
+
+PARTISI_DIR = 'partisi_stasiun_ispu' # Direktori kerja sementara (dihapus setelah build selesai)
+CHUNK_BARIS = 200_000 # Baris arsip mentah yang dibaca per potongan
+N_SAMPEL_GLOBAL = 200_000 # Baris latih (sampel acak) untuk mean & batas cadangan global
+N_EPOCH = 5
+SEED = 42
+
+
+def _nama_file(stasiun):
+    return re.sub(r'[^0-9A-Za-z]+', '_', str(stasiun)).strip('_') or 'tanpa_nama'
+
+
+# --- TAHAP 0: ARSIP MENTAH -> SATU CSV PER STASIUN ---
+@diukur()
+def partisi_per_stasiun(file_data=FILE_DATA, root=PARTISI_DIR, chunksize=CHUNK_BARIS):
+    """Membaca arsip per potongan dan menambahkan baris ke file partisi stasiun kanoniknya."""
+    shutil.rmtree(root, ignore_errors=True)
+    os.makedirs(os.path.join(root, 'mentah'))
+    os.makedirs(os.path.join(root, 'fitur'))
+    paths, n_baris, hari = {}, 0, set()
+    for chunk in pd.read_csv(file_data, chunksize=chunksize):
+        chunk = chunk[chunk['stasiun'].astype(str).str.startswith('DKI')]
+        hari.update(pd.to_datetime(chunk['tanggal_lengkap'], errors='coerce').dropna().unique())
+        kanonik = chunk['stasiun'].map({s: normalize_station(s) for s in chunk['stasiun'].unique()})
+        for stasiun, bagian in chunk.groupby(kanonik, sort=False):
+            path = paths.setdefault(stasiun, os.path.join(root, 'mentah', f"{_nama_file(stasiun)}.csv"))
+            bagian.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+        n_baris += len(chunk)
+    # Urutan stasiun terurut = urutan baris pada build penuh (sort per stasiun)
+    return list(dict.fromkeys(paths[s] for s in sorted(paths))), n_baris, cutoff_latih(list(hari))
+
+
+def _muat_partisi(path):
+    df = bersihkan_data_mentah(pd.read_csv(path))
+    df[POLUTAN_COLS] = ffill_per_stasiun(df[POLUTAN_COLS].to_numpy(dtype=np.float64), batas_stasiun(df['stasiun']))
+    return df
+
+
+# --- TAHAP 1: IMPUTER PER STASIUN (fit pada periode latih, satu pass) ---
+@diukur()
+def hitung_imputer(partisi, cutoff, n_baris, rng):
+    """Imputer per stasiun dari partisinya sendiri (eksak) + cadangan global dari sampel acak.
+
+    Setiap partisi berisi satu stasiun, jadi mean & kuantil stasiun dihitung eksak dari baris
+    latihnya (tanggal < cutoff). Cadangan global (stasiun tanpa data latih) di-fit pada sekitar
+    N_SAMPEL_GLOBAL baris latih yang diambil acak secara proporsional dari semua partisi.
+    """
+    imputer = StationImputer(POLUTAN_COLS, cutoff=cutoff)
+    porsi_sampel = min(1.0, N_SAMPEL_GLOBAL / max(n_baris, 1))
+    last_observed, kategori, sampel = [], set(), []
+    for path in partisi:
+        df = _muat_partisi(path)
+        last_observed.append(df[df['tanggal_lengkap'].notna()].groupby('stasiun')[POLUTAN_COLS].last())
+        # Hanya baris yang lolos dropna final (polutan & lag/roll selalu terisi) yang membentuk OHE
+        kategori.update(df.drop(columns=POLUTAN_COLS).dropna()['kategori'].astype(str).unique())
+        latih = df[df['tanggal_lengkap'] < cutoff] if cutoff is not None else df
+        X = latih[POLUTAN_COLS].to_numpy(dtype=np.float64)
+        for stasiun, idx in latih.groupby('stasiun', sort=False).indices.items():
+            imputer.fit_kunci(stasiun, X[idx])
+        sampel.append(X[rng.random(len(X)) < porsi_sampel])
+
+    imputer.fit_kunci(StationImputer.KUNCI_GLOBAL, np.concatenate(sampel) if sampel else np.empty((0, len(POLUTAN_COLS))))
+    last_observed = pd.concat(last_observed) if last_observed else pd.DataFrame(columns=POLUTAN_COLS)
+    return imputer, last_observed, sorted(kategori)
+
+
+def _kolom_output(df_contoh, kategori):
+    """Skema ADVANCED global: kolom partisi pertama dengan OHE kategori dari SEMUA partisi."""
+    kolom = [c for c in finalisasi_dataset(df_contoh.copy()).columns if not c.startswith('kategori_')]
+    return kolom + [f'kategori_{k}' for k in kategori]
+
+
+# --- TAHAP 3: FITUR PER PARTISI + OUTPUT + PARTIAL_FIT SCALER ---
+@diukur()
+def proses_partisi(path, imputer, kolom_output, fitur_input, scaler, root=PARTISI_DIR):
+    """Imputasi, fitur waktu & lag/roll, dan OHE untuk satu partisi; mengembalikan hasil ringkas.
+
+    Holdout = baris dengan tanggal >= cutoff imputer, sama seperti split build penuh.
+    """
+    df = imputer.transform(_muat_partisi(path))
+    df = tambah_fitur_waktu(df)
+    df = tambah_fitur_lag_roll(df, imputer)
+    df_imputasi = df[PRIMARY_KEY + POLUTAN_COLS]
+    df_clean = finalisasi_dataset(df, kolom_output=kolom_output)
+
+    X = df_clean[fitur_input].fillna(0).to_numpy(dtype=np.float64)
+    y = df_clean['kategori_TIDAK SEHAT'].to_numpy(dtype=bool)
+    uji = mask_uji(df_clean['tanggal_lengkap'], imputer.cutoff)
+    if len(y):
+        if not uji.all():
+            scaler.partial_fit(X[~uji]) # Sama seperti build penuh: scaler di-fit pada baris latih saja
+        path_fitur = os.path.join(root, 'fitur', f"{os.path.splitext(os.path.basename(path))[0]}.npz")
+        np.savez(path_fitur, X=X, y=y, uji=uji)
+    else:
+        path_fitur = None
+    return df_clean, df_imputasi, path_fitur, np.bincount(y[~uji], minlength=2)
+
+
+# --- TAHAP 4: PELATIHAN SGD BEBERAPA EPOCH ATAS PARTISI ---
+@diukur()
+def latih_sgd(path_fitur, scaler, jumlah_kelas, rng):
+    """SGDClassifier(log_loss) dengan C dan bobot kelas dari config.KONFIG_MODEL (hasil tuning.py).
+
+    alpha = 1 / (C * n) menyamakan regularisasi dengan LogisticRegression(C) build penuh;
+    bobot 'balanced' dihitung dari jumlah kelas data latih.
+    """
+    n = jumlah_kelas.sum()
+    bobot = BOBOT_KELAS[KONFIG_MODEL['class_weight']]
+    if bobot == 'balanced':
+        class_weight = {False: n / (2 * max(jumlah_kelas[0], 1)), True: n / (2 * max(jumlah_kelas[1], 1))}
+    elif bobot is None:
+        class_weight = None
+    else:
+        class_weight = {False: bobot[0], True: bobot[1]}
+    model = SGDClassifier(loss='log_loss', alpha=1.0 / (KONFIG_MODEL['C'] * max(n, 1)),
+                          class_weight=class_weight, random_state=SEED)
+    for epoch in range(N_EPOCH):
+        for i in rng.permutation(len(path_fitur)):
+            with np.load(path_fitur[i]) as data:
+                latih = ~data['uji']
+                urutan = rng.permutation(np.flatnonzero(latih))
+                if len(urutan):
+                    model.partial_fit(scaler.transform(data['X'][urutan]), data['y'][urutan], classes=[False, True])
+    return model
+
+
+@diukur()
+def evaluasi_holdout(path_fitur, scaler, model):
+    """Confusion matrix data uji dijumlahkan per partisi (tanpa memuat semua prediksi sekaligus)."""
+    total = np.zeros(4, dtype=np.int64)
+    for path in path_fitur:
+        with np.load(path) as data:
+            if data['uji'].any():
+                proba = model.predict_proba(scaler.transform(data['X'][data['uji']]))[:, 1]
+                total += np.array([k[0] for k in konfusi_per_threshold(data['y'][data['uji']], proba, [OPTIMAL_THRESHOLD])])
+    return total # tp, fp, fn, tn
+
+
+@diukur()
+def build_assets_streaming(root=PARTISI_DIR):
+    print("--- ⚙️ BUILD STREAMING: MEMPARTISI ARSIP PER STASIUN ---")
+    try:
+        partisi, n_baris, cutoff = partisi_per_stasiun(FILE_DATA, root)
+    except FileNotFoundError:
+        print(f"❌ ERROR: File '{FILE_DATA}' tidak ditemukan. Jalankan `python ingest.py` terlebih dahulu.")
+        return
+    if not partisi:
+        print("❌ ERROR: Tidak ada baris stasiun valid di arsip.")
+        return
+    print(f"✅ {n_baris} baris dipecah menjadi {len(partisi)} partisi stasiun.")
+
+    print("\n--- 🧮 TAHAP 1: IMPUTER PER STASIUN (PERIODE LATIH) ---")
+    rng = np.random.default_rng(SEED)
+    imputer, last_observed, kategori = hitung_imputer(partisi, cutoff, n_baris, rng)
+    joblib.dump(imputer, IMPUTER_PATH)
+    print(f"✅ Imputer di-fit pada tanggal < {str(cutoff)[:10]} ({len(imputer.mean) - 1} stasiun), tersimpan di: {IMPUTER_PATH}")
+
+    print("\n--- 🧠 TAHAP 2: FITUR PER PARTISI & OUTPUT ---")
+    df_contoh = tambah_fitur_waktu(imputer.transform(_muat_partisi(partisi[0])))
+    kolom_output = _kolom_output(tambah_fitur_lag_roll(df_contoh, imputer), kategori)
+    fitur_input = pilih_fitur_input(pd.DataFrame(columns=kolom_output))
+    scaler = StandardScaler()
+
+    tmp_csv, tmp_store = f"{OUTPUT_FILE_ADVANCED}.tmp", f"{OUTPUT_FEATURE_STORE}.tmp"
+    shutil.rmtree(tmp_store, ignore_errors=True)
+    if os.path.exists(tmp_csv):
+        os.remove(tmp_csv)
+    cubes, harian, stations_state, path_fitur = [], [], {}, []
+    jumlah_kelas, n_clean, ada_store = np.zeros(2, dtype=np.int64), 0, True
+    for path in partisi:
+        df_clean, df_imputasi, pf, kelas = proses_partisi(path, imputer, kolom_output, fitur_input, scaler, root)
+        if df_clean.empty:
+            continue
+        with tahap('preprocessing_streaming.tulis_csv'):
+            df_clean.to_csv(tmp_csv, mode='a', header=n_clean == 0, index=False)
+        if ada_store:
+            try:
+                with tahap('preprocessing_streaming.feature_store'):
+                    append_feature_store(df_clean, tmp_store)
+            except ImportError:
+                ada_store = False
+        cubes.append(build_kpi_cube(df_clean))
+        # Similarity cukup butuh rata-rata per bucket waktu per stasiun, bukan baris mentah
+        harian.append(df_clean.groupby(['stasiun', df_clean['tanggal_lengkap'].dt.floor(RESOLUSI_DEFAULT)])[POLUTAN_COLS]
+                      .mean().reset_index())
+        lo = last_observed.loc[last_observed.index.intersection(df_imputasi['stasiun'].unique())]
+        stations_state.update(bangun_feature_state(df_imputasi, lo, kolom_output)['stations'])
+        path_fitur.append(pf)
+        jumlah_kelas += kelas
+        n_clean += len(df_clean)
+        del df_clean, df_imputasi
+
+    # Aset bersama build sebelumnya akan didahulukan aplikasi atas dataset baru ini: dihapus
+    # (unlink atomik; worker yang masih me-mmap file lama tetap membaca isinya sampai memuat ulang)
+    if os.path.exists(SHARED_ASSET_PATH):
+        os.remove(SHARED_ASSET_PATH)
+        print(f"🗑️ Aset bersama lama dihapus: {SHARED_ASSET_PATH}")
+    os.replace(tmp_csv, OUTPUT_FILE_ADVANCED)
+    print(f"✅ Dataset Advanced FE ({n_clean} baris) tersimpan di: {OUTPUT_FILE_ADVANCED}")
+    if ada_store:
+        shutil.rmtree(OUTPUT_FEATURE_STORE, ignore_errors=True)
+        os.replace(tmp_store, OUTPUT_FEATURE_STORE)
+        print(f"✅ Feature store Parquet tersimpan di: {OUTPUT_FEATURE_STORE}/")
+    else:
+        print("⚠️ pyarrow tidak terpasang, feature store dilewati (aplikasi memakai CSV).")
+
+    with tahap('preprocessing_streaming.kpi_cube'):
+        save_kpi_cube(merge_kpi_cube(*cubes), KPI_CUBE_PATH)
+    print(f"✅ Kubus KPI bulanan tersimpan di: {KPI_CUBE_PATH}")
+
+    harian = pd.concat(harian, ignore_index=True)
+    with tahap('preprocessing_streaming.similarity'):
+        sim_engine = StationSimilarityEngine.from_dataframe(harian)
+    joblib.dump(sim_engine, SIMILARITY_STATE_PATH)
+    joblib.dump(sim_engine.neighbour_index(), NEIGHBOUR_INDEX_PATH)
+    print(f"✅ State kesamaan stasiun & indeks tetangga tersimpan di: {SIMILARITY_STATE_PATH}, {NEIGHBOUR_INDEX_PATH}")
+
+    joblib.dump({'stations': stations_state, 'kolom_output': kolom_output, 'window': WINDOW_ROLL},
+                FEATURE_STATE_PATH)
+    print(f"✅ State fitur inkremental tersimpan di: {FEATURE_STATE_PATH}")
+
+    print("\n--- 🤖 TAHAP 3: PELATIHAN INKREMENTAL (SGD, LOG LOSS) ---")
+    cbf_model = latih_sgd(path_fitur, scaler, jumlah_kelas, rng)
+    tp, fp, fn, tn = evaluasi_holdout(path_fitur, scaler, cbf_model)
+    print(f"   [Holdout tanggal >= {str(cutoff)[:10]}, threshold {OPTIMAL_THRESHOLD}]: presisi {tp / max(tp + fp, 1):.2f}, "
+          f"recall {tp / max(tp + fn, 1):.2f}, akurasi {(tp + tn) / max(tp + fp + fn + tn, 1):.2f}")
+
+    with tahap('preprocessing_streaming.publish_model'):
+        publish_model(
+            scaler, cbf_model, fitur_input, OPTIMAL_THRESHOLD,
+            snapshot_data(harian, OUTPUT_FILE_ADVANCED, n_baris=n_clean),
+            info_latih={'cutoff_imputasi': str(cutoff)[:10], 'cutoff_uji': str(cutoff)[:10], 'mode': 'streaming',
+                        'n_epoch': N_EPOCH, 'konfig_model': KONFIG_MODEL},
+            root=MODEL_REGISTRY_DIR,
+        )
+    simpan_atomik(cbf_model, MODEL_CBF_PATH)
+    simpan_atomik(scaler, SCALER_PATH)
+    simpan_atomik(fitur_input, FITUR_LIST_PATH)
+    simpan_atomik(OPTIMAL_THRESHOLD, THRESHOLD_CBF_PATH)
+    print(f"--- ✅ ASET SIAP! Model, Scaler, Fitur List, dan Threshold (.pkl) tersimpan.")
+    export_linear_scorer(scaler, cbf_model, fitur_input)
+    print("ℹ️ Aset bersama (memory-mapped) tidak ditulis di mode streaming; jalankan "
+          "`python preprocessing.py --aset-bersama` jika memori cukup untuk seluruh dataset.")
+
+    shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    aktifkan() # Durasi tahap selalu diringkas di akhir build CLI
+    build_assets_streaming()
+    cetak_ringkasan_tahap()
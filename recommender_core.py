@@ -1,58 +1,218 @@
 # recommender_core.py
 
+import logging
+import os
+import threading
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
-import joblib
+import numpy as np
 import streamlit as st 
 
 # Import konfigurasi dari file config.py
 from config import (
-    FILE_ADVANCED, MODEL_CBF_PATH, SCALER_PATH, FITUR_LIST_PATH,
-    OPTIMAL_THRESHOLD, REKOMENDASI_TINDAKAN, STATION_COL_NAME
+    FILE_ADVANCED, KPI_CUBE_PATH, SIMILARITY_STATE_PATH,
+    NEIGHBOUR_INDEX_PATH, SHARED_ASSET_PATH, MODEL_REGISTRY_DIR, STATION_COL_NAME, POLUTAN_COLS,
+    hitung_tier_kebijakan, normalize_station
 )
+# Fusion CBF + CF tanpa Streamlit (juga dipakai hybrid_recommender & service.py)
+from hybrid_core import build_latest_state, get_hybrid_recommendation, get_hybrid_recommendation_batch, muat_aset_pkl # noqa: F401
+from instrumentation import cache_terhitung, diukur, tahap
+# joblib, feature store, registry, kubus KPI, aset bersama & similarity diimpor di dalam loader
+# masing-masing, agar halaman yang tidak memakainya (mis. "Cara Penggunaan") tidak memuatnya
+
+
+# Kolom yang dipakai dashboard & CF; fitur lengkap dimuat per stasiun di halaman prediksi
+KOLOM_INTI = ['tanggal_lengkap', STATION_COL_NAME, 'kategori', 'pm25', 'hari_dalam_minggu']
+NAMA_THREAD_PEMANASAN = 'ispu-pemanasan-aset'
+# Entri per loader ber-versi yang ditahan cache: versi baru + versi lama selama sesi yang sedang
+# berjalan berpindah. Tanpa batas, setiap versi data/model harian menumpuk di memori worker.
+ENTRI_CACHE_VERSI = 2
 
 
 # --- FUNGSI MUAT ASET DENGAN CACHING ---
 
-@st.cache_data
-def load_data():
-    """Memuat data ISPU dari CSV dan melakukan preprocessing dasar."""
+# Tiga bentuk panggilan per versi data: kolom inti, kolom similarity, dan baris terbaru per stasiun
+@cache_terhitung(st.cache_data, max_entries=3 * ENTRI_CACHE_VERSI)
+def load_data(columns=None, years=None, stations=None, data_version=None):
+    """Memuat data ISPU dari feature store Parquet (fallback ke CSV).
+
+    Halaman cukup meminta kolom/tahun/stasiun yang dibutuhkan; partisi lain tidak dibaca.
+    `data_version` hanya dipakai sebagai kunci cache (lihat get_data_version).
+    """
+    from feature_store import feature_store_available, read_feature_store
+
+    if feature_store_available():
+        try:
+            with tahap('recommender_core.baca_feature_store'):
+                return read_feature_store(columns=columns, years=years, stations=stations)
+        except Exception as e:
+            st.warning(f"Feature store tidak dapat dibaca ({e}). Memakai CSV.")
     try:
-        # Gunakan data yang sudah dipreprocess
-        df = pd.read_csv(FILE_ADVANCED)
-        df['tanggal_lengkap'] = pd.to_datetime(df['tanggal_lengkap']) 
-        return df
+        # Gunakan data yang sudah dipreprocess (kolom filter tetap dibaca agar bisa menyaring)
+        usecols = None if columns is None else list(dict.fromkeys([*columns, 'tanggal_lengkap', STATION_COL_NAME]))
+        with tahap('recommender_core.baca_csv'):
+            df = pd.read_csv(FILE_ADVANCED, usecols=usecols)
+            df['tanggal_lengkap'] = pd.to_datetime(df['tanggal_lengkap']) 
+        if years is not None:
+            df = df[df['tanggal_lengkap'].dt.year.isin(years)]
+        if stations is not None:
+            df = df[df[STATION_COL_NAME].isin(stations)]
+        if columns is not None:
+            df = df[list(columns)]
+        return df.reset_index(drop=True)
     except Exception as e:
         st.error(f"Gagal memuat data: {e}. Pastikan '{FILE_ADVANCED}' ada.")
         return pd.DataFrame()
 
-@st.cache_resource
+@cache_terhitung(st.cache_resource, max_entries=1)
 def load_ml_assets():
-    """Memuat model, scaler, dan daftar fitur dari file .pkl."""
+    """Memuat model, scaler, daftar fitur, dan threshold dari file .pkl lepas (jalur lama, tanpa registry)."""
     try:
-        scaler = joblib.load(SCALER_PATH)
-        cbf_model = joblib.load(MODEL_CBF_PATH)
-        fitur_list = joblib.load(FITUR_LIST_PATH)
-        return scaler, cbf_model, fitur_list
+        return muat_aset_pkl()
     except Exception as e:
         st.error(f"Gagal memuat aset ML: {e}. Pastikan file .pkl sudah tersedia.")
         return None, None, None
 
-@st.cache_data
-def calculate_station_similarity(df, polutan='pm25'):
-    """Menghitung matriks kesamaan antar stasiun menggunakan Cosine Similarity."""
-    df_pivot = df.pivot_table(
-        index='tanggal_lengkap', 
-        columns=STATION_COL_NAME, 
-        values=polutan
-    ).fillna(0)
-    item_similarity_matrix = cosine_similarity(df_pivot.T)
-    item_similarity_df = pd.DataFrame(
-        item_similarity_matrix,
-        index=df_pivot.columns,
-        columns=df_pivot.columns
+@cache_terhitung(st.cache_resource, max_entries=1)
+def load_model_registry():
+    """Satu pemantau registry per proses: versi model baru ditukar tanpa restart (lihat model_registry.py)."""
+    from model_registry import RegistryWatcher
+
+    return RegistryWatcher(MODEL_REGISTRY_DIR)
+
+
+def get_model_version():
+    """Versi model aktif di registry (baca pointer kecil) untuk kunci cache; None jika registry kosong."""
+    from model_registry import active_version
+
+    return active_version(MODEL_REGISTRY_DIR)
+
+
+@cache_terhitung(st.cache_resource, max_entries=ENTRI_CACHE_VERSI)
+def load_similarity_engine(data_version):
+    """Memuat engine kesamaan stasiun hasil preprocessing, atau membangunnya sekali per versi dataset."""
+    import joblib
+    from similarity import StationSimilarityEngine
+
+    if os.path.exists(SIMILARITY_STATE_PATH):
+        try:
+            return joblib.load(SIMILARITY_STATE_PATH)
+        except Exception as e:
+            st.warning(f"State similarity tidak dapat dimuat ({e}). Dibangun ulang dari data.")
+    df = load_data(columns=['tanggal_lengkap', STATION_COL_NAME, *POLUTAN_COLS], data_version=data_version)
+    return StationSimilarityEngine.from_dataframe(df)
+
+
+@cache_terhitung(st.cache_resource, max_entries=ENTRI_CACHE_VERSI)
+def load_neighbour_index(data_version):
+    """Memuat indeks tetangga CF (top-k per stasiun kanonik), atau membangunnya dari engine kesamaan."""
+    import joblib
+
+    if os.path.exists(NEIGHBOUR_INDEX_PATH):
+        try:
+            return joblib.load(NEIGHBOUR_INDEX_PATH)
+        except Exception as e:
+            st.warning(f"Indeks tetangga tidak dapat dimuat ({e}). Dibangun ulang.")
+    return load_similarity_engine(data_version).neighbour_index()
+
+
+def get_shared_asset_version():
+    """Versi file aset bersama (mtime + ukuran); None jika belum dibangun."""
+    try:
+        stat = os.stat(SHARED_ASSET_PATH)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    except OSError:
+        return None
+
+
+@cache_terhitung(st.cache_resource, max_entries=ENTRI_CACHE_VERSI)
+def load_shared_asset_store(asset_version):
+    """Satu mapping read-only per proses, dibagi semua sesi (cache_resource tidak menyalin)."""
+    from shared_assets import SharedAssetStore, shared_assets_available
+
+    if asset_version is None or not shared_assets_available():
+        return None
+    try:
+        return SharedAssetStore(SHARED_ASSET_PATH)
+    except Exception as e:
+        st.warning(f"Aset bersama tidak dapat dipetakan ({e}). Memakai CSV/feature store.")
+        return None
+
+
+# --- ASET PER HALAMAN (dimuat saat halaman pertama kali membutuhkannya) ---
+def load_core_frame(data_version, asset_version):
+    """DataFrame kolom inti: dari aset bersama (memory-mapped) jika ada, selain itu load_data."""
+    asset_store = load_shared_asset_store(asset_version)
+    if asset_store is not None:
+        # File aset bersama: semua worker & sesi memakai halaman memori yang sama
+        return asset_store.frame()
+    return load_data(columns=KOLOM_INTI, data_version=data_version)
+
+
+def load_model_bundle(data_version, asset_version):
+    """(scaler, cbf_model, fitur_list, neighbour_index, model_version) untuk halaman rekomendasi.
+
+    Model diambil dari versi aktif registry; selama versi baru dimuat di latar, versi lama
+    tetap dipakai. Tanpa registry: scorer aset bersama, lalu file .pkl (model_version None).
+    """
+    asset_store = load_shared_asset_store(asset_version)
+    if asset_store is not None:
+        neighbour_index = asset_store.neighbour_index()
+    else:
+        neighbour_index = load_neighbour_index(data_version)
+    model = load_model_registry().model()
+    if model is not None:
+        return None, model.scorer, model.fitur_list, neighbour_index, model.versi
+    if asset_store is not None:
+        return None, asset_store.scorer(), asset_store.fitur_list, neighbour_index, None
+    scaler, cbf_model, fitur_list = load_ml_assets()
+    return scaler, cbf_model, fitur_list, neighbour_index, None
+
+
+def warm_page_assets(data_version, asset_version):
+    """Mengisi cache semua halaman berat dengan argumen yang sama persis seperti app.py."""
+    try:
+        df = load_core_frame(data_version, asset_version)
+        if df.empty:
+            return
+        load_kpi_cube_cached(data_version, df)
+        load_historical_log(data_version, df, n_rows=100)
+        load_model_registry().periksa() # Versi di pointer dimuat di thread ini, bukan di request berikutnya
+        scaler, cbf_model, fitur_list, neighbour_index, versi = load_model_bundle(data_version, asset_version)
+        load_latest_state(data_version, asset_version, versi, df, scaler, cbf_model, fitur_list, neighbour_index)
+        import altair # noqa: F401 -- modul grafik halaman Dashboard, diimpor lebih awal di latar
+    except Exception as e:
+        print(f"⚠️ Pemanasan aset di latar belakang gagal ({e}); aset dimuat saat halaman dibuka.")
+
+
+class _TanpaPeringatanKonteks(logging.Filter):
+    """Thread pemanasan sengaja berjalan tanpa ScriptRunContext (tidak boleh menggambar ke sesi)."""
+
+    def filter(self, record):
+        return record.threadName != NAMA_THREAD_PEMANASAN
+
+
+logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').addFilter(_TanpaPeringatanKonteks())
+
+
+@cache_terhitung(st.cache_resource, max_entries=ENTRI_CACHE_VERSI)
+def start_background_warmup(data_version, asset_version, model_version=None):
+    """Satu thread latar per proses & versi data/aset/model, dipanggil setelah halaman pertama tergambar.
+
+    `model_version` (pointer registry) hanya kunci cache: versi model baru ikut dipanaskan.
+    """
+    thread = threading.Thread(
+        target=warm_page_assets, args=(data_version, asset_version), name=NAMA_THREAD_PEMANASAN, daemon=True
     )
-    return item_similarity_df
+    thread.start()
+    return thread
+
+
+@diukur()
+def calculate_station_similarity(df, polutan='pm25', window=None):
+    """Menghitung matriks kesamaan antar stasiun menggunakan Cosine Similarity (hanya hari yang sama-sama terisi)."""
+    from similarity import StationSimilarityEngine
+
+    return StationSimilarityEngine.from_dataframe(df, polutan=[polutan]).similarity(polutan, window)
 
 
 # --- FUNGSI REKOMENDASI KONDISI AKTUAL SAAT INI (Masyarakat) ---
@@ -74,19 +234,82 @@ def get_actual_recommendation(kategori):
 
 
 # --- FUNGSI REKOMENDASI KEBIJAKAN UNTUK DATA HISTORIS (Pejabat) ---
+REKOMENDASI_PEJABAT_HISTORIS = {
+    'DARURAT': "DARURAT: WFH/Pembatasan Kendaraan & Prioritas RTH.",
+    'MITIGASI': "MITIGASI: Uji Emisi Ketat & Tinjauan Operasional Industri.",
+    'RUTIN': "RUTIN: Monitoring & Investasi Jangka Panjang (LEZ/RTH).",
+}
+
 def get_historical_pejabat_recommendation(row):
     """Menentukan rekomendasi kebijakan berdasarkan data historis aktual."""
-    pm25_val = row.get('pm25', 0)
-    is_weekday = row.get('hari_dalam_minggu', 0) < 5 
-    is_pm_critical = pm25_val > 100 
-    is_pm_high = pm25_val > 70 
-
-    if is_pm_critical:
-        return "DARURAT: WFH/Pembatasan Kendaraan & Prioritas RTH."
-    elif is_pm_high and is_weekday:
-        return "MITIGASI: Uji Emisi Ketat & Tinjauan Operasional Industri."
-    else:
-        return "RUTIN: Monitoring & Investasi Jangka Panjang (LEZ/RTH)."
+    tier = hitung_tier_kebijakan(row.get('pm25', 0), row.get('hari_dalam_minggu', 0))
+    return REKOMENDASI_PEJABAT_HISTORIS[str(tier)]
+
+
+# --- VERSI VEKTOR UNTUK LOG HISTORIS ---
+def get_actual_recommendation_vectorized(kategori):
+    """Versi vektor dari get_actual_recommendation (urutan pengecekan sama)."""
+    kategori_upper = pd.Series(kategori).astype(str).str.upper()
+    return np.select(
+        [
+            kategori_upper.str.contains('BAIK', regex=False),
+            kategori_upper.str.contains('SEDANG', regex=False),
+            kategori_upper.str.contains('TIDAK SEHAT', regex=False),
+            kategori_upper.str.contains('TIDAK ADA DATA', regex=False),
+        ],
+        [
+            '✅ Aktivitas Normal, Udara Aman',
+            '🟡 Batasi Aktivitas Berat di Luar',
+            '🔴 Hindari Aktivitas Luar, Wajib Masker',
+            '❓ Data Tidak Tersedia',
+        ],
+        default='ℹ️ Cek Ulang Status'
+    )
+
+
+def get_historical_pejabat_recommendation_vectorized(df):
+    """Versi vektor dari get_historical_pejabat_recommendation untuk seluruh DataFrame."""
+    tier = hitung_tier_kebijakan(
+        df['pm25'] if 'pm25' in df else 0,
+        df['hari_dalam_minggu'] if 'hari_dalam_minggu' in df else 0
+    )
+    return pd.Series(tier, index=df.index).map(REKOMENDASI_PEJABAT_HISTORIS).to_numpy()
+
+
+def get_data_version():
+    """Versi dataset (mtime + ukuran file ADVANCED) untuk kunci cache; berubah setiap build/append."""
+    try:
+        stat = os.stat(FILE_ADVANCED)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    except OSError:
+        return "tidak-ada"
+
+
+@cache_terhitung(st.cache_data, max_entries=ENTRI_CACHE_VERSI)
+def load_historical_log(data_version, _df, n_rows=100):
+    """Log rekomendasi historis untuk n baris terakhir, di-cache per versi dataset.
+
+    Hanya baris yang ditampilkan yang diproses; `_df` tidak di-hash dan tidak diubah.
+    """
+    df_log = _df[['tanggal_lengkap', STATION_COL_NAME, 'kategori', 'pm25', 'hari_dalam_minggu']].tail(n_rows).copy()
+    df_log['stasiun_normal'] = df_log[STATION_COL_NAME].map(
+        {s: normalize_station(s) for s in df_log[STATION_COL_NAME].unique()}
+    )
+    df_log['Rekomendasi_Aktual_Masyarakat'] = get_actual_recommendation_vectorized(df_log['kategori'])
+    df_log['Rekomendasi_Kebijakan_Pejabat'] = get_historical_pejabat_recommendation_vectorized(df_log)
+    return df_log[[
+        'tanggal_lengkap', 'stasiun_normal', 'kategori', 'pm25', 'Rekomendasi_Aktual_Masyarakat', 'Rekomendasi_Kebijakan_Pejabat'
+    ]].sort_values('tanggal_lengkap', ascending=False).reset_index(drop=True)
+
+
+@cache_terhitung(st.cache_data, max_entries=ENTRI_CACHE_VERSI)
+def load_kpi_cube_cached(data_version, _df):
+    """Memuat kubus KPI bulanan hasil preprocessing; dibangun dari `_df` jika file belum ada."""
+    from kpi_cube import build_kpi_cube, load_kpi_cube
+
+    if os.path.exists(KPI_CUBE_PATH):
+        return load_kpi_cube(KPI_CUBE_PATH)
+    return build_kpi_cube(_df)
 
 
 # --- FUNGSI STYLING UNTUK HISTORICAL TRACKING ---
@@ -103,66 +326,36 @@ def highlight_historical_recommendation(val):
         return ''
 
 
-# --- FUNGSI UTAMA REKOMENDASI HYBRID (PREDIKSI) ---
-def get_hybrid_recommendation(data_input_df, target_stasiun, sim_df, scaler, cbf_model, fitur_list):
-    """Menjalankan sistem rekomendasi Hybrid (CBF + CF + Fusion) untuk PREDIKSI."""
-    if scaler is None or cbf_model is None:
-        return {"Error": "Aset model belum dimuat. Periksa log error."}
-        
-    input_row = data_input_df.iloc[0]
-    
-    # --- A. Content-Based Filtering (CBF) - PREDIKSI ---
-    data_input_clean = pd.DataFrame([input_row]).reindex(columns=fitur_list).fillna(0)
-    if not data_input_clean.empty and not data_input_clean.isnull().all().all():
-        data_input_scaled = scaler.transform(data_input_clean)
-        cbf_proba = cbf_model.predict_proba(data_input_scaled)[0][1] 
-        cbf_prediction = 1 if cbf_proba >= OPTIMAL_THRESHOLD else 0 
-    else:
-        cbf_proba = 0.0
-        cbf_prediction = 0
-
-    rekomendasi_utama = REKOMENDASI_TINDAKAN.get(cbf_prediction, "Error dalam prediksi kategori.")
-    
-    # --- B. Collaborative Filtering (CF) ---
-    cf_output = "Tidak ada peringatan korelasi."
-    if target_stasiun in sim_df.columns:
-        similar_stations = sim_df[target_stasiun].sort_values(ascending=False).index.tolist()
-        if target_stasiun in similar_stations: similar_stations.remove(target_stasiun)
-        
-        if similar_stations:
-            top_similar_stasiun = similar_stations[0] 
-            korelasi_score = sim_df.loc[target_stasiun, top_similar_stasiun]
-            cf_output = (f"Stasiun dengan pola polusi terdekat: **{top_similar_stasiun}** (Korelasi: {korelasi_score:.2f}). "
-                         f"Kualitas udara cenderung mengikuti pola lokasi tersebut.")
-            
-    # --- C. Fusion Output dan Rekomendasi Pejabat ---
-    pm25_val = input_row.get('pm25', 0)
-    is_weekday = input_row.get('hari_dalam_minggu', 0) < 5 
-    is_pm_critical = pm25_val > 100 
-    is_pm_high = pm25_val > 70 
-
-    if is_pm_critical:
-        rekomendasi_pejabat = (
-            "TINDAKAN DARURAT: Terapkan kebijakan WFH atau pembatasan kendaraan berat (genap-ganjil) di zona ini selama 24 jam ke depan. "
-            "PERENCANAAN JANGKA MENENGAH: Segera finalisasi insentif bagi pengguna kendaraan listrik dan percepat konversi transportasi publik ke energi bersih."
-        )
-    elif is_pm_high and is_weekday:
-        rekomendasi_pejabat = (
-            "PERKETAT UJI EMISI: Lakukan uji emisi mendadak di jalanan dan di titik keluar/masuk kawasan industri terdekat. "
-            "TATA RUANG: Kaji ulang izin operasional industri yang berdekatan. Tingkatkan efisiensi jalur Transjakarta dan KRL untuk mengurangi penggunaan mobil pribadi."
-        )
+def _baris_terbaru(df):
+    """Indeks baris dengan tanggal terbaru per stasiun kanonik (O(N), tanpa sort)."""
+    df = df[df['tanggal_lengkap'].notna()]
+    kanonik = df[STATION_COL_NAME].astype(str).map(
+        {s: normalize_station(s) for s in df[STATION_COL_NAME].astype(str).unique()}
+    )
+    return df['tanggal_lengkap'].groupby(kanonik.to_numpy()).idxmax()
+
+
+@cache_terhitung(st.cache_resource, max_entries=ENTRI_CACHE_VERSI)
+def load_latest_state(data_version, asset_version, model_version, _df, _scaler, _cbf_model, _fitur_list,
+                      _neighbour_index):
+    """State terbaru per stasiun, dibangun sekali per versi data/aset/model dan dibagi semua sesi.
+
+    Jika `_df` hanya berisi kolom inti, fitur lengkap dibaca hanya untuk tahun & stasiun
+    yang memuat baris terbaru.
+    """
+    idx = _baris_terbaru(_df)
+    if idx.empty:
+        return {}
+    if set(_fitur_list) <= set(_df.columns):
+        df_terbaru = _df.loc[idx.to_numpy()].reset_index(drop=True)
     else:
-        rekomendasi_pejabat = (
-            "PEMBANGUNAN BERKELANJUTAN: Lanjutkan pemantauan rutin dan investasikan dana untuk proyek "
-            "hijau seperti pengembangan kawasan bebas kendaraan bermotor (Low Emission Zone) dan penambahan 20% Ruang Terbuka Hijau (RTH) di lokasi korelasi tinggi."
+        kunci = _df.loc[idx.to_numpy(), ['tanggal_lengkap', STATION_COL_NAME]].reset_index(drop=True)
+        df_lengkap = load_data(
+            years=sorted(kunci['tanggal_lengkap'].dt.year.unique().tolist()),
+            stations=sorted(kunci[STATION_COL_NAME].astype(str).unique().tolist()),
+            data_version=data_version,
         )
-    
-    
-    return {
-        "Stasiun Target": target_stasiun,
-        "Status Prediksi (CBF)": "TIDAK SEHAT" if cbf_prediction == 1 else "AMAN/SEDANG",
-        "Probabilitas TIDAK SEHAT": cbf_proba,
-        "Rekomendasi Tindakan Primer": rekomendasi_utama, 
-        "Peringatan Situasional (CF)": cf_output,
-        "Rekomendasi Kebijakan (Pejabat)": rekomendasi_pejabat
-    }
\ No newline at end of file
+        df_lengkap[STATION_COL_NAME] = df_lengkap[STATION_COL_NAME].astype(str)
+        kunci[STATION_COL_NAME] = kunci[STATION_COL_NAME].astype(str)
+        df_terbaru = kunci.merge(df_lengkap, on=['tanggal_lengkap', STATION_COL_NAME], how='left')
+    return build_latest_state(df_terbaru, list(idx.index), _neighbour_index, _scaler, _cbf_model, _fitur_list)
@@ -0,0 +1,302 @@
+# service.py
+# Layanan HTTP (ASGI) tanpa Streamlit untuk skor rekomendasi hybrid dan lookup CF.
+# Aset dimuat sekali per proses; request yang datang bersamaan digabung menjadi micro-batch
+# sehingga satu predict_proba vektor melayani banyak pemanggil. Versi model baru di registry
+# (model_registry.py) dimuat di thread latar lalu ditukar tanpa restart worker.
+#
+# Jalankan:  python service.py [port]   atau   uvicorn service:app --workers 4
+
+import asyncio
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import joblib
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from config import FORECAST_MODEL_PATH, LINEAR_SCORER_PATH, MODEL_REGISTRY_DIR, NEIGHBOUR_INDEX_PATH, normalize_station
+import hybrid_core
+import instrumentation
+from instrumentation import Histogram
+from forecast_registry import ForecastRegistry
+from linear_scorer import LinearScorer
+from model_registry import RegistryWatcher
+
+# --- KONFIGURASI MICRO-BATCH ---
+MAX_BATCH = int(os.environ.get('ISPU_MAX_BATCH', 256))
+FLUSH_MS = float(os.environ.get('ISPU_FLUSH_MS', 2.0)) # Batas tunggu sejak request pertama di batch
+
+BUCKET_LATENSI = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BUCKET_BATCH = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+# --- METRIK ---
+LATENSI = {} # endpoint -> Histogram
+UKURAN_BATCH = Histogram(BUCKET_BATCH)
+
+
+def _diukur(endpoint):
+    """Dekorator: mencatat latensi handler ke histogram per endpoint."""
+    hist = LATENSI.setdefault(endpoint, Histogram(BUCKET_LATENSI))
+
+    def bungkus(handler):
+        async def handler_terukur(request):
+            mulai = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                hist.observe(time.perf_counter() - mulai)
+        return handler_terukur
+    return bungkus
+
+
+# --- MICRO-BATCHER ---
+class MicroBatcher:
+    """Mengumpulkan baris fitur dari banyak request lalu men-skor-nya sekaligus.
+
+    Batch dikirim saat berisi MAX_BATCH baris atau saat FLUSH_MS berlalu sejak
+    request pertama masuk, mana yang lebih dulu. Setiap baris di-skor dengan scorer
+    yang dipakai request-nya menyusun fitur, jadi batch yang melintasi pertukaran
+    versi model tetap konsisten.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, flush_ms=FLUSH_MS):
+        self.max_batch = max_batch
+        self.flush_s = flush_ms / 1000.0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, X, scorer):
+        """Mengantre matriks fitur (n x fitur, urutan scorer.fitur_list) dan menunggu probabilitasnya."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((X, scorer, future))
+        return await future
+
+    async def _kumpulkan(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        n = len(batch[0][0])
+        deadline = loop.time() + self.flush_s
+        while n < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                sisa = deadline - loop.time()
+                if sisa <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), sisa)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            n += len(item[0])
+        return batch, n
+
+    async def _loop(self):
+        while True:
+            batch, n = await self._kumpulkan()
+            UKURAN_BATCH.observe(n)
+            # Biasanya satu scorer; dua hanya sesaat ketika versi model baru sedang ditukar
+            per_scorer = {}
+            for item in batch:
+                per_scorer.setdefault(id(item[1]), []).append(item)
+            for kelompok in per_scorer.values():
+                self._skor(kelompok)
+
+    @staticmethod
+    def _skor(kelompok):
+        try:
+            with instrumentation.tahap('service.predict_batch'):
+                proba = kelompok[0][1].predict_proba(np.vstack([X for X, _, _ in kelompok]))
+        except Exception as e:
+            for _, _, future in kelompok:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        awal = 0
+        for X, _, future in kelompok:
+            if not future.done():
+                future.set_result(proba[awal:awal + len(X)])
+            awal += len(X)
+
+
+# --- ASET (dimuat sekali per proses) ---
+class Aset:
+    scorer = None # Cadangan jika registry model kosong (model_cbf_linear.npz)
+    registry = None # RegistryWatcher: versi model aktif, ditukar tanpa restart
+    neighbour_index = {}
+    batcher = None
+    forecast = None # ForecastRegistry (opsional, dari forecast.py)
+
+
+def muat_aset():
+    """Pemantau registry model, scorer linear cadangan (scaler + model dilipat), dan indeks tetangga CF."""
+    registry = RegistryWatcher(MODEL_REGISTRY_DIR)
+    scorer = None
+    if registry.model() is None: # Registry belum berisi model: file .npz lepas seperti sebelumnya
+        if not os.path.exists(LINEAR_SCORER_PATH):
+            raise FileNotFoundError(
+                f"Tidak ada model untuk dilayani: registry '{MODEL_REGISTRY_DIR}' kosong dan '{LINEAR_SCORER_PATH}' "
+                "tidak ditemukan. Jalankan `python preprocessing.py` terlebih dahulu."
+            )
+        scorer = LinearScorer.load(LINEAR_SCORER_PATH)
+    neighbour_index = joblib.load(NEIGHBOUR_INDEX_PATH) if os.path.exists(NEIGHBOUR_INDEX_PATH) else {}
+    return registry, scorer, neighbour_index
+
+
+def model_aktif():
+    """(versi, scorer) yang melayani request ini; pointer registry dicek paling sering per interval."""
+    model = Aset.registry.model() if Aset.registry is not None else None
+    if model is None:
+        return None, Aset.scorer
+    return model.versi, model.scorer
+
+
+def muat_forecast():
+    """Registry prakiraan multi-horizon, atau None jika forecast.py belum dijalankan."""
+    return ForecastRegistry.load(FORECAST_MODEL_PATH) if os.path.exists(FORECAST_MODEL_PATH) else None
+
+
+def _baris_fitur(fitur, fitur_list, kosong=0.0):
+    # Fitur yang tidak dikirim = `kosong`; rekomendasi memakai NaN agar scorer mengisinya dengan
+    # rata-rata kolom latih, sama seperti jalur batch di hybrid_core
+    return [kosong if fitur.get(f) is None else float(fitur[f]) for f in fitur_list]
+
+
+# --- ENDPOINT ---
+@_diukur('rekomendasi')
+async def rekomendasi(request):
+    """POST {"stasiun": ..., "fitur": {...}} atau {"items": [ ... ]}."""
+    # Satu scorer untuk seluruh request: fitur, skor, dan threshold dari versi model yang sama
+    versi, scorer = model_aktif()
+    try:
+        body = await request.json()
+        items = body['items'] if 'items' in body else [body]
+        fitur = [it.get('fitur') or {} for it in items]
+        X = np.array([_baris_fitur(f, scorer.fitur_list, np.nan) for f in fitur],
+                     dtype=np.float64).reshape(len(items), len(scorer.fitur_list))
+    except Exception as e:
+        return JSONResponse({"error": f"Body request tidak valid: {e}"}, status_code=400)
+    if not items:
+        return JSONResponse({"hasil": []})
+
+    proba = await Aset.batcher.submit(X, scorer)
+    # Threshold, CF, tier, dan teks rekomendasi dari fusion yang sama dengan aplikasi (hybrid_core)
+    hasil = hybrid_core.get_hybrid_recommendation_batch(
+        pd.DataFrame(fitur, index=range(len(fitur))).fillna(0), [it.get('stasiun') for it in items],
+        Aset.neighbour_index, None, scorer, scorer.fitur_list, cbf_proba=proba
+    )
+    hasil = [hybrid_core.ringkasan_rekomendasi(hasil, i) for i in range(len(items))]
+    if 'items' in body:
+        return JSONResponse({"hasil": hasil, "versi_model": versi})
+    return JSONResponse({**hasil[0], "versi_model": versi})
+
+
+@_diukur('prakiraan')
+async def prakiraan(request):
+    """POST {"stasiun": ..., "fitur": {...}} atau {"items": [...]} -> probabilitas TIDAK SEHAT per horizon."""
+    registry = Aset.forecast
+    if registry is None:
+        return JSONResponse({"error": "Model prakiraan belum dilatih (python forecast.py)."}, status_code=503)
+    try:
+        body = await request.json()
+        items = body['items'] if 'items' in body else [body]
+        X = np.array([_baris_fitur(it.get('fitur') or {}, registry.fitur_list) for it in items],
+                     dtype=np.float64).reshape(len(items), len(registry.fitur_list))
+        stations = [normalize_station(it.get('stasiun')) for it in items]
+    except Exception as e:
+        return JSONResponse({"error": f"Body request tidak valid: {e}"}, status_code=400)
+    if not items:
+        return JSONResponse({"hasil": []})
+
+    # Satu panggilan vektor: semua baris x semua horizon
+    proba = registry.predict_proba(X, stations)
+    threshold = registry.threshold[registry.indeks_kunci(stations)]
+    hasil = [{
+        "stasiun": it.get('stasiun'),
+        "prakiraan": [{
+            "horizon_jam": h,
+            "probabilitas_tidak_sehat": float(p),
+            "prediksi": int(p >= t),
+            "status_prediksi": "TIDAK SEHAT" if p >= t else "AMAN/SEDANG",
+        } for h, p, t in zip(registry.horizon_jam, baris_p, baris_t)],
+    } for it, baris_p, baris_t in zip(items, proba, threshold)]
+    return JSONResponse({"hasil": hasil} if 'items' in body else hasil[0])
+
+
+@_diukur('tetangga')
+async def tetangga(request):
+    """GET /tetangga/{stasiun}?k=5 -> stasiun dengan pola polusi paling mirip (lookup indeks)."""
+    stasiun = normalize_station(request.path_params['stasiun'])
+    try:
+        k = int(request.query_params.get('k', 1))
+    except ValueError:
+        return JSONResponse({"error": "Parameter k harus bilangan bulat."}, status_code=400)
+    if stasiun not in Aset.neighbour_index:
+        return JSONResponse({"error": f"Stasiun '{stasiun}' tidak ada di indeks tetangga."}, status_code=404)
+    daftar = Aset.neighbour_index[stasiun][:max(k, 0)]
+    return JSONResponse({"stasiun": stasiun, "tetangga": [{"stasiun": s, "skor": skor} for s, skor in daftar]})
+
+
+async def kesehatan(request):
+    versi, scorer = model_aktif()
+    return JSONResponse({"status": "ok", "versi_model": versi, "fitur": len(scorer.fitur_list),
+                         "stasiun": len(Aset.neighbour_index)})
+
+
+async def metrics(request):
+    """Histogram latensi per endpoint dan ukuran micro-batch (format teks Prometheus)."""
+    baris = ['# TYPE ispu_request_latency_seconds histogram']
+    for endpoint, hist in LATENSI.items():
+        baris += hist.render('ispu_request_latency_seconds', f'endpoint="{endpoint}"')
+    baris += ['# TYPE ispu_batch_size histogram'] + UKURAN_BATCH.render('ispu_batch_size')
+    teks = '\n'.join(baris) + '\n'
+    if instrumentation.aktif(): # Tahap & cache dari instrumentation.py (ISPU_INSTRUMENTASI=1)
+        teks += instrumentation.metrik_prometheus()
+    return PlainTextResponse(teks)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    Aset.registry, Aset.scorer, Aset.neighbour_index = muat_aset()
+    Aset.forecast = muat_forecast()
+    Aset.batcher = MicroBatcher()
+    Aset.batcher.start()
+    yield
+    await Aset.batcher.stop()
+
+
+app = Starlette(
+    routes=[
+        Route('/rekomendasi', rekomendasi, methods=['POST']),
+        Route('/prakiraan', prakiraan, methods=['POST']),
+        Route('/tetangga/{stasiun}', tetangga, methods=['GET']),
+        Route('/kesehatan', kesehatan, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    uvicorn.run('service:app', host='0.0.0.0', port=port, workers=int(os.environ.get('ISPU_WORKERS', 1)))
@@ -0,0 +1,181 @@
+# shared_assets.py
+# Penyimpanan aset bersama read-only: matriks fitur, matriks kesamaan, dan bobot model
+# dalam SATU file yang di-memory-map. Semua worker/sesi memetakan file yang sama, jadi
+# halaman memorinya dibagi lewat page cache OS (tidak ada salinan per proses/sesi).
+#
+# Tata letak file:
+#   [8 byte magic][8 byte panjang header (uint64 LE)][header JSON][array-array, masing-masing rata 64 byte]
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import POLUTAN_COLS, SHARED_ASSET_PATH, STATION_COL_NAME
+from linear_scorer import LinearScorer
+from similarity import K_TETANGGA_DEFAULT, neighbour_index_from_matrix
+
+MAGIC = b'ISPUMMAP'
+VERSI_FORMAT = 1
+ALIGN = 64
+
+
+def _rata(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_shared_assets(df, scorer, sim_engine, path=SHARED_ASSET_PATH):
+    """Menulis dataset ADVANCED, matriks kesamaan, dan scorer linear ke satu file.
+
+    Baris diurutkan per (stasiun, tanggal) sehingga data satu stasiun berupa rentang
+    baris yang bersebelahan (irisan = view, tanpa salinan). File ditulis ke path
+    sementara lalu os.replace, jadi worker yang masih memetakan versi lama tidak terganggu.
+    """
+    df = df.sort_values([STATION_COL_NAME, 'tanggal_lengkap'], kind='stable').reset_index(drop=True)
+    fitur_list = list(scorer.fitur_list)
+    stations = sorted(df[STATION_COL_NAME].astype(str).unique().tolist())
+    kode_stasiun = pd.Categorical(df[STATION_COL_NAME].astype(str), categories=stations).codes
+    kategori = sorted(df['kategori'].dropna().astype(str).unique().tolist())
+
+    awal = np.searchsorted(kode_stasiun, np.arange(len(stations)), side='left')
+    akhir = np.searchsorted(kode_stasiun, np.arange(len(stations)), side='right')
+
+    polutan_sim = [p for p in POLUTAN_COLS if p in sim_engine.polutan]
+    sim = np.stack([
+        sim_engine.similarity(p).reindex(index=stations, columns=stations).to_numpy(dtype=np.float64)
+        for p in polutan_sim
+    ]) if polutan_sim else np.zeros((0, len(stations), len(stations)))
+
+    arrays = {
+        'fitur': df.reindex(columns=fitur_list).fillna(0).to_numpy(dtype=np.float32),
+        'tanggal': pd.to_datetime(df['tanggal_lengkap']).to_numpy(dtype='datetime64[ns]').view(np.int64),
+        'kode_stasiun': kode_stasiun.astype(np.int16),
+        'kode_kategori': pd.Categorical(df['kategori'], categories=kategori).codes.astype(np.int8),
+        'similarity': sim,
+        'weights': np.asarray(scorer.weights, dtype=np.float64),
+    }
+    if scorer.mean_kolom is not None:
+        arrays['mean_kolom'] = np.asarray(scorer.mean_kolom, dtype=np.float64)
+
+    meta = {
+        'versi_format': VERSI_FORMAT,
+        'fitur_list': fitur_list,
+        'stations': stations,
+        'rentang_stasiun': {s: [int(a), int(b)] for s, a, b in zip(stations, awal, akhir)},
+        'kategori': kategori,
+        'polutan_similarity': polutan_sim,
+        'bias': float(scorer.bias),
+        'threshold': float(scorer.threshold),
+        'arrays': {},
+    }
+
+    # Offset dihitung relatif terhadap awal area data (setelah header)
+    offset = 0
+    for name, arr in arrays.items():
+        meta['arrays'][name] = {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': offset}
+        offset = _rata(offset + arr.nbytes)
+
+    header = json.dumps(meta).encode('utf-8')
+    data_start = _rata(16 + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(data_start + meta['arrays'][name]['offset'])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return path
+
+
+class SharedAssetStore:
+    """View read-only (zero-copy) atas file aset bersama.
+
+    Array dikembalikan sebagai view np.memmap; mencoba menulis ke array/DataFrame
+    hasil store akan gagal (read-only), sehingga cache bersama tidak bisa termutasi.
+    """
+
+    def __init__(self, path=SHARED_ASSET_PATH):
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(self._mm[:8]) != MAGIC:
+            raise ValueError(f"{path} bukan file aset bersama ISPU.")
+        panjang = int(np.frombuffer(self._mm, dtype='<u8', count=1, offset=8)[0])
+        self.meta = json.loads(bytes(self._mm[16:16 + panjang]).decode('utf-8'))
+        if self.meta.get('versi_format') != VERSI_FORMAT:
+            raise ValueError(f"Versi format {self.meta.get('versi_format')} tidak didukung.")
+        self._data_start = _rata(16 + panjang)
+        self.fitur_list = self.meta['fitur_list']
+        self.stations = self.meta['stations']
+        self._frame_cache = {}
+        self._neighbour_cache = {}
+
+    def array(self, name):
+        """View zero-copy ke satu array di file."""
+        info = self.meta['arrays'][name]
+        shape = tuple(info['shape'])
+        count = int(np.prod(shape)) if shape else 1
+        arr = np.frombuffer(self._mm, dtype=np.dtype(info['dtype']), count=count,
+                            offset=self._data_start + info['offset'])
+        return arr.reshape(shape)
+
+    def _rentang(self, stations):
+        if stations is None:
+            return [(0, self.array('tanggal').shape[0])]
+        return [tuple(self.meta['rentang_stasiun'][s]) for s in stations if s in self.meta['rentang_stasiun']]
+
+    def frame(self, stations=None):
+        """DataFrame (tanggal_lengkap, stasiun, kategori, fitur...) di atas view memmap.
+
+        Hasil di-memo per daftar stasiun sehingga semua sesi memakai objek yang sama.
+        """
+        kunci = None if stations is None else tuple(stations)
+        if kunci in self._frame_cache:
+            return self._frame_cache[kunci]
+
+        potongan = []
+        for a, b in self._rentang(stations):
+            fitur = self.array('fitur')[a:b]
+            df = pd.DataFrame(fitur, columns=self.fitur_list, copy=False)
+            df.insert(0, 'tanggal_lengkap', self.array('tanggal')[a:b].view('datetime64[ns]'))
+            df.insert(1, STATION_COL_NAME, pd.Categorical.from_codes(self.array('kode_stasiun')[a:b], self.stations))
+            df.insert(2, 'kategori', pd.Categorical.from_codes(self.array('kode_kategori')[a:b], self.meta['kategori']))
+            potongan.append(df)
+        # Satu rentang = view langsung; beberapa stasiun sekaligus memerlukan concat (salinan kecil)
+        if len(potongan) == 1:
+            hasil = potongan[0]
+        elif potongan:
+            hasil = pd.concat(potongan, ignore_index=True)
+        else:
+            hasil = self.frame().iloc[0:0]
+        self._frame_cache[kunci] = hasil
+        return hasil
+
+    def scorer(self):
+        """Scorer linear dengan bobot langsung dari file (tanpa unpickle sklearn)."""
+        mean_kolom = self.array('mean_kolom') if 'mean_kolom' in self.meta['arrays'] else None
+        return LinearScorer(self.array('weights'), self.meta['bias'], self.fitur_list, self.meta['threshold'],
+                            mean_kolom)
+
+    def similarity(self, polutan='pm25'):
+        """Matriks cosine similarity stasiun x stasiun (view)."""
+        p = self.meta['polutan_similarity'].index(polutan)
+        return pd.DataFrame(self.array('similarity')[p], index=self.stations, columns=self.stations, copy=False)
+
+    def neighbour_index(self, k=K_TETANGGA_DEFAULT, polutan='pm25'):
+        """Indeks tetangga CF dari matriks kesamaan yang dipetakan (di-memo per k/polutan)."""
+        kunci = (k, polutan)
+        if kunci not in self._neighbour_cache:
+            self._neighbour_cache[kunci] = neighbour_index_from_matrix(
+                self.similarity(polutan).to_numpy(), self.stations, k
+            )
+        return self._neighbour_cache[kunci]
+
+
+def shared_assets_available(path=SHARED_ASSET_PATH):
+    """Mengecek apakah file aset bersama sudah dibangun."""
+    return os.path.exists(path)
@@ -0,0 +1,194 @@
+# similarity.py
+# Engine kesamaan antar stasiun (Cosine) berbasis statistik cukup yang diperbarui per hari.
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from config import POLUTAN_COLS, STATION_COL_NAME, normalize_station
+
+WINDOWS_DEFAULT = (30, 90)
+K_TETANGGA_DEFAULT = 5
+# Resolusi bucket waktu vektor kesamaan: 'D' = rata-rata harian (data per jam ikut di-downsample),
+# '1h' = satu vektor per jam. Window tetap dalam satuan hari.
+RESOLUSI_DEFAULT = 'D'
+
+
+def _stasiun_kanonik(df):
+    """Nama stasiun kanonik per baris (normalisasi dilakukan sekali per nama unik)."""
+    nama = df[STATION_COL_NAME]
+    return nama.map({s: normalize_station(s) for s in nama.unique()})
+
+
+def neighbour_index_from_matrix(sim, stations, k=K_TETANGGA_DEFAULT):
+    """Indeks k tetangga terdekat dari matriks kesamaan (stasiun x stasiun).
+
+    Dibangun sekali (argpartition per baris), sehingga langkah CF cukup lookup dictionary.
+    """
+    sim = np.array(sim, dtype=float)
+    np.fill_diagonal(sim, np.nan)
+    skor = np.where(np.isnan(sim), -np.inf, sim)
+    k_eff = min(k, max(len(stations) - 1, 0))
+    index = {}
+    for i, station in enumerate(stations):
+        if k_eff == 0:
+            index[station] = []
+            continue
+        kandidat = np.argpartition(-skor[i], k_eff - 1)[:k_eff]
+        kandidat = kandidat[np.argsort(-skor[i][kandidat], kind='stable')]
+        index[station] = [(stations[j], float(sim[i, j])) for j in kandidat if np.isfinite(skor[i, j])]
+    return index
+
+
+class StationSimilarityEngine:
+    """Menyimpan dot product dan norma per pasangan stasiun per polutan.
+
+    Untuk pasangan (i, j) hanya hari di mana KEDUA stasiun punya nilai yang dihitung,
+    sehingga data hilang tidak diperlakukan sebagai 0:
+
+        cos(i, j) = Σ x_i·x_j / sqrt(Σ x_i² · Σ x_j²)   (Σ atas hari yang sama-sama terisi)
+
+    Setiap hari baru menambah O(polutan · stasiun²); window (mis. 30/90 hari terakhir)
+    memakai akumulator terpisah yang juga mengurangi kontribusi hari yang keluar window.
+    Nama stasiun dinormalisasi lewat config.normalize_station, jadi alias digabung.
+    Satu "hari" di atas adalah satu bucket `resolusi` (default harian); beberapa baris
+    dalam satu bucket (mis. data per jam) dirata-rata terlebih dahulu.
+    """
+
+    resolusi = RESOLUSI_DEFAULT # Atribut kelas: state lama (tanpa resolusi) tetap harian
+
+    def __init__(self, polutan=POLUTAN_COLS, windows=WINDOWS_DEFAULT, resolusi=RESOLUSI_DEFAULT):
+        self.polutan = list(polutan)
+        self.windows = tuple(sorted(windows))
+        self.resolusi = resolusi
+        self.stations = []
+        self._idx = {}
+        self.last_day = None
+        n_pol = len(self.polutan)
+        # Kunci None = seluruh riwayat
+        self._dot = {w: np.zeros((n_pol, 0, 0)) for w in (None, *self.windows)}
+        self._nrm = {w: np.zeros((n_pol, 0, 0)) for w in (None, *self.windows)}
+        self._recent = {w: deque() for w in self.windows}
+
+    # --- PEMBARUAN ---
+    def _ensure_stations(self, names):
+        baru = [n for n in names if n not in self._idx]
+        if not baru:
+            return
+        for n in baru:
+            self._idx[n] = len(self.stations)
+            self.stations.append(n)
+        pad = len(baru)
+        for w in self._dot:
+            self._dot[w] = np.pad(self._dot[w], ((0, 0), (0, pad), (0, pad)))
+            self._nrm[w] = np.pad(self._nrm[w], ((0, 0), (0, pad), (0, pad)))
+
+    def _contribution(self, x):
+        # x: (polutan, stasiun) dengan NaN untuk data hilang
+        present = ~np.isnan(x)
+        x0 = np.where(present, x, 0.0)
+        dot = np.einsum('pi,pj->pij', x0, x0)
+        nrm = np.einsum('pi,pj->pij', x0 * x0, present.astype(float))
+        return dot, nrm
+
+    def _pad_to_current(self, x):
+        # Stasiun yang ditambahkan setelah hari tersebut dianggap tidak punya data (NaN)
+        n = len(self.stations) - x.shape[-1]
+        return np.pad(x, ((0, 0), (0, n)), constant_values=np.nan) if n else x
+
+    def bucket(self, waktu):
+        """Awal bucket waktu (Series datetime atau Timestamp) sesuai resolusi engine."""
+        if isinstance(waktu, pd.Series):
+            return pd.to_datetime(waktu).dt.floor(self.resolusi)
+        return pd.Timestamp(waktu).floor(self.resolusi)
+
+    def update_day(self, day, values):
+        """Menambahkan satu bucket (hari): `values` DataFrame (kolom stasiun + polutan) untuk bucket tersebut."""
+        day = self.bucket(day)
+        if self.last_day is not None and day <= self.last_day:
+            raise ValueError(f"Bucket {day} tidak lebih baru dari {self.last_day}.")
+
+        per_station = values.groupby(_stasiun_kanonik(values))[self.polutan].mean()
+        self._ensure_stations(per_station.index.tolist())
+        x = np.full((len(self.polutan), len(self.stations)), np.nan)
+        x[:, [self._idx[s] for s in per_station.index]] = per_station.to_numpy(dtype=float).T
+
+        dot, nrm = self._contribution(x)
+        for w in self._dot:
+            self._dot[w] += dot
+            self._nrm[w] += nrm
+        for w in self.windows:
+            # Hanya vektor harian yang disimpan (bukan matriks S x S) agar memori tetap kecil
+            self._recent[w].append((day, x))
+            batas = day - pd.Timedelta(days=w)
+            while self._recent[w] and self._recent[w][0][0] <= batas:
+                _, x_lama = self._recent[w].popleft()
+                old_dot, old_nrm = self._contribution(self._pad_to_current(x_lama))
+                self._dot[w] -= old_dot
+                self._nrm[w] -= old_nrm
+        self.last_day = day
+
+    @classmethod
+    def from_dataframe(cls, df, polutan=POLUTAN_COLS, windows=WINDOWS_DEFAULT, resolusi=RESOLUSI_DEFAULT):
+        """Membangun engine dari riwayat; pivot (rata-rata per bucket) dilakukan sekali per polutan."""
+        engine = cls(polutan=[p for p in polutan if p in df.columns], windows=windows, resolusi=resolusi)
+        df = df.assign(
+            _hari=engine.bucket(df['tanggal_lengkap']),
+            _stasiun=_stasiun_kanonik(df),
+        ).dropna(subset=['_hari'])
+        if df.empty:
+            return engine
+
+        stations = sorted(df['_stasiun'].unique().tolist())
+        engine._ensure_stations(stations)
+        days = np.sort(df['_hari'].unique())
+        # X: (hari, polutan, stasiun)
+        X = np.stack([
+            df.pivot_table(index='_hari', columns='_stasiun', values=p)
+              .reindex(index=days, columns=stations).to_numpy(dtype=float)
+            for p in engine.polutan
+        ], axis=1)
+        present = ~np.isnan(X)
+        X0 = np.where(present, X, 0.0)
+
+        def _akumulasi(sl):
+            return (np.einsum('dpi,dpj->pij', X0[sl], X0[sl]),
+                    np.einsum('dpi,dpj->pij', X0[sl] * X0[sl], present[sl].astype(float)))
+
+        engine._dot[None], engine._nrm[None] = _akumulasi(slice(None))
+        last_day = pd.Timestamp(days[-1])
+        for w in engine.windows:
+            start = np.searchsorted(days, np.datetime64(last_day - pd.Timedelta(days=w)), side='right')
+            engine._dot[w], engine._nrm[w] = _akumulasi(slice(start, None))
+            for d in range(start, len(days)):
+                engine._recent[w].append((pd.Timestamp(days[d]), X[d]))
+        engine.last_day = last_day
+        return engine
+
+    # --- KUERI ---
+    def similarity(self, polutan='pm25', window=None):
+        """Matriks cosine similarity (DataFrame stasiun x stasiun); NaN jika tidak ada hari bersama."""
+        p = self.polutan.index(polutan)
+        dot = self._dot[window][p]
+        nrm = self._nrm[window][p]
+        denom = np.sqrt(nrm * nrm.T)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sim = np.where(denom > 0, dot / denom, np.nan)
+        return pd.DataFrame(sim, index=self.stations, columns=self.stations)
+
+    def neighbour_index(self, k=K_TETANGGA_DEFAULT, polutan='pm25', window=None):
+        """Indeks k tetangga terdekat per stasiun: {stasiun: [(nama, skor), ...]} terurut menurun."""
+        return neighbour_index_from_matrix(self.similarity(polutan, window).to_numpy(), self.stations, k)
+
+    def top_k(self, station, k=1, polutan='pm25', window=None):
+        """k tetangga terdekat sebuah stasiun sebagai list (nama, skor), tanpa dirinya sendiri."""
+        station = normalize_station(station)
+        if station not in self._idx:
+            return []
+        row = self.similarity(polutan, window).loc[station].drop(station).dropna()
+        return list(row.nlargest(k).items())
+
+    def top_k_all(self, station, k=1, window=None):
+        """Tetangga terdekat untuk semua polutan sekaligus: {polutan: [(nama, skor), ...]}."""
+        return {p: self.top_k(station, k, p, window) for p in self.polutan}
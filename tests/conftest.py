@@ -0,0 +1,41 @@
+# conftest.py
+# Modul proyek berada di root repo (bukan paket), jadi root ditambahkan ke sys.path.
+# Jalankan dari root repo:  python -m pytest -q
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+POLUTAN = ['pm10', 'pm25', 'so2', 'co', 'o3', 'no2']
+
+
+def buat_data_mentah(freq='D', periode=120, stasiun=('DKI1', 'DKI2 Kelapa Gading', 'DKI3 Jagakarsa'),
+                     porsi_hilang=0.1, porsi_baris_hilang=0.05, seed=0):
+    """Data ISPU mentah sintetis (skema CSV gabungan) dengan nilai & baris yang hilang acak."""
+    rng = np.random.default_rng(seed)
+    waktu = pd.date_range('2024-01-01', periods=periode, freq=freq)
+    bagian = []
+    for s in stasiun:
+        df = pd.DataFrame({'tanggal_lengkap': waktu, 'stasiun': s})
+        for col in POLUTAN:
+            nilai = rng.gamma(4.0, 15.0, len(waktu))
+            nilai[rng.random(len(waktu)) < porsi_hilang] = np.nan
+            df[col] = nilai
+        df['kategori'] = np.where(df['pm25'].fillna(0) > 100, 'TIDAK SEHAT', 'SEDANG')
+        bagian.append(df[rng.random(len(df)) >= porsi_baris_hilang])
+    df = pd.concat(bagian, ignore_index=True)
+    fmt = '%Y-%m-%d' if freq == 'D' else '%Y-%m-%d %H:%M:%S'
+    df['tanggal_lengkap'] = df['tanggal_lengkap'].dt.strftime(fmt)
+    return df
+
+
+@pytest.fixture
+def data_mentah():
+    return buat_data_mentah()
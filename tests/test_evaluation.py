@@ -0,0 +1,32 @@
+# Laporan evaluasi tetap dibuat saat data uji kosong atau hanya berisi satu kelas.
+
+import numpy as np
+import pytest
+
+from evaluation import buat_laporan, cetak_ringkasan
+
+
+def _prediksi(y, proba):
+    n = len(y)
+    return {
+        'y': np.asarray(y, dtype=np.int8), 'proba': np.asarray(proba, dtype=np.float64),
+        'stasiun': np.array(['DKI1 Bunderan HI'] * n), 'musim': np.ones(n, dtype=np.int8),
+        'threshold_model': np.array(0.5), 'versi_model': np.array('uji'), 'versi': np.array('uji'),
+        'n_total': np.array(n), 'cutoff_uji': np.array('2025-01-01'),
+    }
+
+
+def test_laporan_dua_kelas_berisi_kurva():
+    rng = np.random.default_rng(3)
+    laporan = buat_laporan(_prediksi(rng.random(100) < 0.3, rng.random(100)))
+    assert laporan['kurva_roc'] is not None and laporan['threshold_rekomendasi'] is not None
+
+
+@pytest.mark.parametrize('y', [[0] * 20, [1] * 20, []])
+def test_laporan_satu_kelas_atau_kosong_tidak_gagal(y, capsys):
+    laporan = buat_laporan(_prediksi(y, np.linspace(0, 1, len(y))))
+    assert laporan['roc_auc'] is None
+    assert laporan['kurva_roc'] is None and laporan['kurva_pr'] is None
+    assert laporan['threshold_rekomendasi'] is None
+    cetak_ringkasan(laporan)
+    assert 'satu kelas' in capsys.readouterr().out
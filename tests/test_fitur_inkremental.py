@@ -0,0 +1,50 @@
+# Fitur mode inkremental (state per stasiun) harus identik dengan rebuild penuh
+# yang memakai imputer beku yang sama, baik untuk data harian maupun per jam.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import preprocessing as pp
+from conftest import POLUTAN, buat_data_mentah
+
+
+def _bangun_lama(df_mentah, window):
+    """Langkah build penuh yang menghasilkan imputer dan state inkremental."""
+    df = pp.bersihkan_data_mentah(df_mentah.copy())
+    last_observed = df[df['tanggal_lengkap'].notna()].groupby('stasiun')[POLUTAN].last()
+    cutoff = pp.cutoff_latih(df['tanggal_lengkap'])
+    df, imputer = pp.imputasi_polutan(df, cutoff=cutoff)
+    df = pp.tambah_fitur_lag_roll(pp.tambah_fitur_waktu(df), imputer, window)
+    state = pp.bangun_feature_state(df[pp.PRIMARY_KEY + POLUTAN], last_observed, list(df.columns))
+    return imputer, state
+
+
+@pytest.mark.parametrize('freq, periode, window, batas', [
+    ('D', 120, '7D', '2024-04-01'),
+    ('h', 24 * 20, '24h', '2024-01-15 07:00'),
+])
+def test_inkremental_sama_dengan_rebuild_penuh(monkeypatch, freq, periode, window, batas):
+    monkeypatch.setattr(pp, 'WINDOW_ROLL', window)
+    mentah = buat_data_mentah(freq=freq, periode=periode)
+    lama = mentah[pd.to_datetime(mentah['tanggal_lengkap']) < pd.Timestamp(batas)]
+    baru = mentah[pd.to_datetime(mentah['tanggal_lengkap']) >= pd.Timestamp(batas)]
+
+    imputer, state = _bangun_lama(lama, window)
+    inkremental = pp.hitung_fitur_inkremental(pp.bersihkan_data_mentah(baru.copy()), state, imputer)
+
+    penuh = pp.bersihkan_data_mentah(mentah.copy())
+    penuh, _ = pp.imputasi_polutan(penuh, imputer=imputer)
+    penuh = pp.tambah_fitur_lag_roll(penuh, imputer, window)
+
+    gabung = inkremental.merge(penuh, on=['stasiun', 'tanggal_lengkap'], suffixes=('', '_penuh'))
+    assert len(gabung) == len(inkremental) == len(baru)
+    for col in POLUTAN:
+        for kolom in (col, f'{col}_lag1', f'{col}_roll{window}'):
+            np.testing.assert_allclose(gabung[kolom], gabung[f'{kolom}_penuh'], rtol=1e-10, err_msg=kolom)
+
+
+def test_baris_duplikat_atau_terlambat_dilewati(data_mentah):
+    imputer, state = _bangun_lama(data_mentah, pp.WINDOW_ROLL)
+    ulang = pp.bersihkan_data_mentah(data_mentah.tail(5).copy())
+    assert pp.hitung_fitur_inkremental(ulang, state, imputer).empty
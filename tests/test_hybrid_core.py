@@ -0,0 +1,81 @@
+# Fusion hybrid tanpa Streamlit: input yang hilang diisi rata-rata kolom latih versi model,
+# jalur .pkl (scaler + sklearn) sama dengan jalur scorer linear registry, dan threshold .pkl
+# dibaca dari file pendampingnya.
+
+import os
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+import hybrid_core
+from linear_scorer import fold_scaler_into_model
+
+FITUR = ['pm10', 'pm25', 'so2', 'hari_dalam_minggu']
+
+
+@pytest.fixture
+def model_sklearn():
+    rng = np.random.default_rng(4)
+    X = pd.DataFrame(rng.normal(60, 25, (300, len(FITUR))), columns=FITUR)
+    X['hari_dalam_minggu'] = rng.integers(0, 7, 300)
+    y = (X['pm25'] + rng.normal(0, 10, 300) > 65).astype(int)
+    scaler = StandardScaler().fit(X)
+    return scaler, LogisticRegression().fit(scaler.transform(X), y), X
+
+
+def test_tanpa_streamlit():
+    # Proses terpisah: test lain boleh saja sudah mengimpor streamlit di proses pytest ini
+    kode = "import sys, hybrid_core, hybrid_recommender; sys.exit('streamlit' in sys.modules)"
+    assert subprocess.run([sys.executable, '-c', kode], cwd=os.path.dirname(hybrid_core.__file__)).returncode == 0
+
+
+def test_input_hilang_diisi_rata_rata_latih(model_sklearn):
+    scaler, model, X = model_sklearn
+    masukan = X.head(20).drop(columns=['so2'])
+    masukan.loc[masukan.index[::2], 'pm10'] = np.nan
+    lengkap = masukan.reindex(columns=FITUR).fillna(pd.Series(scaler.mean_, index=FITUR))
+    harapan = model.predict_proba(scaler.transform(lengkap))[:, 1]
+    stasiun = ['DKI1'] * len(masukan)
+
+    pkl = hybrid_core.get_hybrid_recommendation_batch(masukan, stasiun, {}, scaler, model, FITUR)
+    scorer = fold_scaler_into_model(scaler, model, FITUR, threshold=0.7)
+    linear = hybrid_core.get_hybrid_recommendation_batch(masukan, stasiun, {}, None, scorer, FITUR)
+    np.testing.assert_allclose(pkl['proba'], harapan, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(linear['proba'], harapan, rtol=1e-9, atol=1e-12)
+
+
+def test_ringkasan_dan_tampilan_dari_hasil_yang_sama(model_sklearn):
+    scaler, model, X = model_sklearn
+    scorer = fold_scaler_into_model(scaler, model, FITUR, threshold=0.5)
+    tetangga = {'DKI1 Bunderan HI': [('DKI2 Kelapa Gading', 0.9)]}
+    hasil = hybrid_core.get_hybrid_recommendation_batch(X.head(2), ['DKI1', 'DKI9'], tetangga, None, scorer, FITUR)
+
+    ada, tanpa = (hybrid_core.ringkasan_rekomendasi(hasil, i) for i in range(2))
+    assert (ada['cf_stasiun'], ada['cf_skor']) == ('DKI2 Kelapa Gading', 0.9)
+    assert tanpa['cf_stasiun'] is None and tanpa['cf_skor'] is None
+    tampilan = hybrid_core._format_rekomendasi(hasil, 0, 'DKI1')
+    assert tampilan['Status Prediksi (CBF)'] == ada['status_prediksi']
+    assert tampilan['Rekomendasi Kebijakan (Pejabat)'] == ada['rekomendasi_kebijakan']
+
+
+def test_threshold_pkl_dari_file_pendamping(model_sklearn, tmp_path):
+    scaler, model, X = model_sklearn
+    paths = {nama: str(tmp_path / f'{nama}.pkl') for nama in ('scaler', 'model', 'fitur', 'threshold')}
+    for nama, obj in (('scaler', scaler), ('model', model), ('fitur', FITUR)):
+        joblib.dump(obj, paths[nama])
+
+    # Belum ada file threshold: kembali ke 0.70, bukan config.OPTIMAL_THRESHOLD hasil tuning
+    _, cbf_model, _ = hybrid_core.muat_aset_pkl(paths['scaler'], paths['model'], paths['fitur'], paths['threshold'])
+    assert hybrid_core.threshold_model(cbf_model) == 0.70
+
+    joblib.dump(0.25, paths['threshold'])
+    aset = hybrid_core.muat_aset_pkl(paths['scaler'], paths['model'], paths['fitur'], paths['threshold'])
+    assert hybrid_core.threshold_model(aset[1]) == 0.25
+    hasil = hybrid_core.get_hybrid_recommendation_batch(X, ['DKI1'] * len(X), {}, *aset)
+    np.testing.assert_array_equal(hasil['prediksi'], (hasil['proba'] >= 0.25).astype(int))
@@ -0,0 +1,94 @@
+# Pemetaan skema ingest: varian nama kolom tahunan, format tanggal campuran, dan
+# nama stasiun diseragamkan ke KOLOM_STANDAR.
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+import ingest
+
+
+def _tulis_xlsx(path, header, baris):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(header)
+    for b in baris:
+        ws.append(b)
+    wb.save(path)
+    return str(path)
+
+
+def test_sumber_tanggal_lengkap_dipetakan():
+    mentah = pd.DataFrame({
+        'periode_data': ['202101', '202101', '202212', '202101'],
+        'tanggal': ['2021-01-02', '2021-01-03 00:00:00', '44926.625', 'bukan tanggal'],
+        'lokasi_spku': ['DKI1 (Bunderan HI)', 'DKI2', ' DKI3 Jagakarsa ', 'DKI4'],
+        'pm_sepuluh': ['40', 50, None, '-'],
+        'pm_duakomalima': [60, 70, 80, 90],
+        'sulfur_dioksida': [1, 2, 3, 4], 'karbon_monoksida': [5, 6, 7, 8],
+        'ozon': [9, 10, 11, 12], 'nitrogen_dioksida': [13, 14, 15, 16],
+        'max': [60, 70, 80, 90], 'critical': ['PM25'] * 4, 'categori': ['SEDANG'] * 4,
+    }, dtype=object)
+    df = ingest.finalisasi_skema(ingest.standardisasi_tanggal_lengkap(mentah))
+
+    assert list(df.columns) == ingest.KOLOM_STANDAR
+    assert df['stasiun'].tolist() == ['DKI1 Bunderan HI', 'DKI2 Kelapa Gading', 'DKI3 Jagakarsa', 'DKI4 Lubang Buaya']
+    # Teks, teks dengan jam, dan nomor seri Excel (jam dibuang); teks tidak valid -> NaT
+    assert df['tanggal_lengkap'].tolist()[:3] == [pd.Timestamp('2021-01-02'), pd.Timestamp('2021-01-03'),
+                                                  pd.Timestamp('2022-12-31')]
+    assert pd.isna(df['tanggal_lengkap'].iloc[3]) and np.isnan(df['tahun'].iloc[3])
+    assert df['hari'].iloc[2] == 31.0
+    np.testing.assert_array_equal(df['pm10'].to_numpy(), [40.0, 50.0, np.nan, np.nan])
+    assert df['max_ispu'].tolist() == [60, 70, 80, 90]
+    assert set(df['parameter_kritis']) == {'PM25'} and set(df['kategori']) == {'SEDANG'}
+
+
+def test_sumber_tanpa_pm25_diberi_kolom_kosong():
+    mentah = pd.DataFrame({'tanggal': ['2020-05-01'], 'stasiun': ['DKI5'], 'pm10': [30]}, dtype=object)
+    df = ingest.finalisasi_skema(ingest.standardisasi_tanggal_lengkap(mentah))
+    assert np.isnan(df['pm25'].iloc[0]) and df['pm10'].iloc[0] == 30
+
+
+def test_sumber_bulan_hari_dipetakan_dan_difilter():
+    mentah = pd.DataFrame({
+        'periode_data': ['202501', '202402', '202312', '202402'],
+        'bulan': ['1', '2', '12', '2'],
+        'tanggal': ['15', '29', '31', '30'], # 30 Februari tidak valid -> NaT
+        'stasiun': ['DKI1', 'DKI2', 'DKI3', 'DKI4'],
+        'pm_10': [1, 2, 3, 4],
+    }, dtype=object)
+    df = ingest.finalisasi_skema(ingest.standardisasi_bulan_hari(mentah))
+
+    assert list(df.columns) == ingest.KOLOM_STANDAR
+    # Tahun di luar 2024/2025 dibuang; 2024 lebih dulu dari 2025
+    assert df['stasiun'].tolist() == ['DKI2 Kelapa Gading', 'DKI4 Lubang Buaya', 'DKI1 Bunderan HI']
+    assert df['tanggal_lengkap'].iloc[0] == pd.Timestamp('2024-02-29')
+    assert pd.isna(df['tanggal_lengkap'].iloc[1])
+    assert df['tanggal_lengkap'].iloc[2] == pd.Timestamp('2025-01-15')
+    assert df['pm10'].tolist() == [2, 4, 1]
+
+
+def test_workbook_dibaca_dan_cache_dipakai_ulang(tmp_path, capsys):
+    path = _tulis_xlsx(tmp_path / 'ispu_uji.xlsx',
+                       ['Periode_Data', 'Tanggal', 'Lokasi_SPKU', 'PM_Sepuluh', 'Max', 'Categori'],
+                       [['202001', '2020-01-01', 'DKI1', 40, 40, 'BAIK'],
+                        ['202001', '2020-01-02', 'DKI2', 'N/A', None, 'SEDANG']])
+    cache_dir = str(tmp_path / 'cache')
+
+    pertama, = ingest.muat_sumber([(path, 'tanggal')], cache_dir=cache_dir, max_workers=1)
+    assert list(pertama.columns) == ingest.KOLOM_STANDAR
+    assert pertama['stasiun'].tolist() == ['DKI1 Bunderan HI', 'DKI2 Kelapa Gading']
+    assert pertama['pm10'].iloc[0] == 40 and np.isnan(pertama['pm10'].iloc[1])
+    assert '[Parse]' in capsys.readouterr().out
+
+    kedua, = ingest.muat_sumber([(path, 'tanggal')], cache_dir=cache_dir, max_workers=1)
+    assert '[Cache]' in capsys.readouterr().out
+    pd.testing.assert_frame_equal(kedua, pertama)
+
+
+@pytest.mark.parametrize('nilai', ['', 'NA', '#N/A', 'null'])
+def test_nilai_kosong_menjadi_nan(tmp_path, nilai):
+    path = _tulis_xlsx(tmp_path / 'kosong.xlsx', ['Tanggal', 'Stasiun', 'PM10'], [['2020-01-01', 'DKI1', nilai]])
+    df = ingest.proses_sumber(path, 'tanggal')
+    assert np.isnan(df['pm10'].iloc[0])
@@ -0,0 +1,50 @@
+# Kubus KPI yang digabung dari beberapa batch harus sama dengan kubus dari seluruh data,
+# termasuk jumlah hari TIDAK SEHAT saat satu hari terbagi di beberapa batch per jam.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import buat_data_mentah
+from kpi_cube import KOLOM_KUNCI, build_kpi_cube, merge_kpi_cube, ringkasan_kpi
+
+KOLOM_TEPAT = ['n', 'minimum', 'maksimum', 'hari_tidak_sehat', 'mask_hari_tidak_sehat']
+
+
+def _urut(cube):
+    return cube.sort_values(KOLOM_KUNCI).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('freq, periode, ukuran_batch', [('D', 200, 17), ('h', 24 * 40, 29)])
+def test_merge_batch_sama_dengan_build_penuh(freq, periode, ukuran_batch):
+    df = buat_data_mentah(freq=freq, periode=periode).sort_values('tanggal_lengkap', kind='stable')
+    penuh = _urut(build_kpi_cube(df))
+    batch = [build_kpi_cube(df.iloc[i:i + ukuran_batch]) for i in range(0, len(df), ukuran_batch)]
+    digabung = _urut(merge_kpi_cube(*batch))
+
+    assert penuh['hari_tidak_sehat'].sum() > 0
+    pd.testing.assert_frame_equal(digabung[KOLOM_KUNCI + KOLOM_TEPAT], penuh[KOLOM_KUNCI + KOLOM_TEPAT],
+                                  check_dtype=False)
+    np.testing.assert_allclose(digabung['jumlah'], penuh['jumlah'], rtol=1e-12)
+
+
+def test_hari_per_jam_dihitung_sekali():
+    waktu = pd.date_range('2024-03-05', periods=48, freq='h')
+    df = pd.DataFrame({'tanggal_lengkap': waktu, 'stasiun': 'DKI1', 'pm25': 150.0, 'kategori': 'TIDAK SEHAT'})
+    cube = merge_kpi_cube(*(build_kpi_cube(df.iloc[i:i + 5]) for i in range(0, 48, 5)))
+    assert cube['hari_tidak_sehat'].tolist() == [2]
+
+
+def test_kubus_lama_tanpa_mask_tetap_digabung():
+    df = buat_data_mentah(periode=60)
+    cube = build_kpi_cube(df)
+    lama = cube.drop(columns='mask_hari_tidak_sehat')
+    assert _urut(merge_kpi_cube(lama))['hari_tidak_sehat'].tolist() == _urut(cube)['hari_tidak_sehat'].tolist()
+
+
+def test_ringkasan_dari_kubus_sama_dengan_baris_mentah():
+    df = buat_data_mentah(periode=200)
+    kpi_monthly, rata_rata, _ = ringkasan_kpi(build_kpi_cube(df), [2024])
+    assert rata_rata == pytest.approx(df['pm25'].mean())
+    bulanan = df.groupby(pd.to_datetime(df['tanggal_lengkap']).dt.strftime('%Y-%m'))['pm25'].mean()
+    np.testing.assert_allclose(kpi_monthly.set_index('Bulan_Tahun')['pm25'], bulanan.loc[kpi_monthly['Bulan_Tahun']])
@@ -0,0 +1,68 @@
+# Scorer linear terlipat (tanpa sklearn) harus memberi probabilitas yang sama dengan
+# StandardScaler + LogisticRegression aslinya.
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from linear_scorer import LinearScorer, fold_scaler_into_model
+
+FITUR = ['pm10', 'pm25', 'so2', 'co', 'o3', 'no2', 'pm25_lag1', 'pm25_roll7D', 'stasiun_DKI1 Bunderan HI']
+
+
+@pytest.fixture
+def model_sklearn():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame(rng.normal(50, 20, (400, len(FITUR))), columns=FITUR)
+    X['stasiun_DKI1 Bunderan HI'] = rng.random(400) < 0.2
+    y = (X['pm25'] + rng.normal(0, 10, 400) > 60).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression(C=0.5, class_weight='balanced').fit(scaler.transform(X), y)
+    return scaler, model, X
+
+
+def test_probabilitas_sama_dengan_sklearn(model_sklearn):
+    scaler, model, X = model_sklearn
+    scorer = fold_scaler_into_model(scaler, model, FITUR, threshold=0.4)
+    harapan = model.predict_proba(scaler.transform(X))[:, 1]
+    np.testing.assert_allclose(scorer.predict_proba(X), harapan, rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(scorer.predict(X), (harapan >= 0.4).astype(int))
+
+
+def test_kolom_diselaraskan_seperti_jalur_sklearn(model_sklearn):
+    scaler, model, X = model_sklearn
+    scorer = fold_scaler_into_model(scaler, model, FITUR, threshold=0.5)
+    # Urutan kolom berbeda + kolom/nilai hilang: diselaraskan ke fitur_list, yang hilang = rata-rata latih
+    masukan = X[FITUR[::-1]].drop(columns=['so2'])
+    masukan.loc[::3, 'pm25'] = np.nan
+    lengkap = masukan.reindex(columns=FITUR).fillna(pd.Series(scaler.mean_, index=FITUR))
+    harapan = model.predict_proba(scaler.transform(lengkap))[:, 1]
+    np.testing.assert_allclose(scorer.predict_proba(masukan), harapan, rtol=1e-9, atol=1e-12)
+    # Array dengan NaN diperlakukan sama
+    np.testing.assert_allclose(scorer.predict_proba(masukan.reindex(columns=FITUR).to_numpy(dtype=float)),
+                               harapan, rtol=1e-9, atol=1e-12)
+
+
+def test_simpan_dan_muat_tanpa_perubahan(model_sklearn, tmp_path):
+    scaler, model, X = model_sklearn
+    scorer = fold_scaler_into_model(scaler, model, FITUR, threshold=0.35)
+    dimuat = LinearScorer.load(scorer.save(str(tmp_path / 'scorer.npz')))
+    assert dimuat.fitur_list == FITUR
+    assert dimuat.threshold == pytest.approx(0.35)
+    np.testing.assert_array_equal(dimuat.mean_kolom, scaler.mean_)
+    np.testing.assert_array_equal(dimuat.predict_proba(X), scorer.predict_proba(X))
+
+
+def test_artefak_lama_tanpa_rata_rata_mengisi_nol(model_sklearn, tmp_path):
+    scaler, model, X = model_sklearn
+    scorer = fold_scaler_into_model(scaler, model, FITUR, threshold=0.5)
+    path = str(tmp_path / 'lama.npz')
+    np.savez(path, weights=scorer.weights, bias=np.float64(scorer.bias), fitur_list=np.array(FITUR),
+             threshold=np.float64(0.5))
+    lama = LinearScorer.load(path)
+    assert lama.mean_kolom is None
+    masukan = X.drop(columns=['so2'])
+    np.testing.assert_allclose(lama.predict_proba(masukan), scorer.predict_proba(masukan.assign(so2=0.0)),
+                               rtol=1e-9, atol=1e-12)
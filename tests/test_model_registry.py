@@ -0,0 +1,98 @@
+# Registry model: publikasi idempoten, pointer aktif, rollback mengikuti riwayat aktivasi,
+# dan RegistryWatcher menukar versi tanpa restart.
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+import model_registry as mr
+
+FITUR = ['pm10', 'pm25', 'so2']
+
+
+@pytest.fixture
+def model_sklearn():
+    rng = np.random.default_rng(2)
+    X = pd.DataFrame(rng.normal(50, 20, (200, len(FITUR))), columns=FITUR)
+    y = (X['pm25'] > 55).astype(int)
+    scaler = StandardScaler().fit(X)
+    return scaler, LogisticRegression().fit(scaler.transform(X), y), X
+
+
+@pytest.fixture
+def publikasi(model_sklearn, tmp_path):
+    """Mempublikasikan versi baru ke registry sementara; `data` membedakan isi tiap versi."""
+    scaler, model, _ = model_sklearn
+    root = str(tmp_path / 'registry')
+
+    def _publikasi(tag, **kwargs):
+        return mr.publish_model(scaler, model, FITUR, 0.5, {'tag': tag}, root=root, **kwargs)
+    _publikasi.root = root
+    return _publikasi
+
+
+def test_publikasi_mengaktifkan_dan_idempoten(publikasi, model_sklearn):
+    scaler, model, X = model_sklearn
+    assert mr.active_version(publikasi.root) is None
+    versi = publikasi('a')
+    assert mr.active_version(publikasi.root) == versi
+    assert publikasi('a') == versi
+    assert [m['versi'] for m in mr.list_versions(publikasi.root)] == [versi]
+
+    dimuat = mr.ModelVersion(versi, publikasi.root)
+    assert dimuat.fitur_list == FITUR and dimuat.threshold == 0.5
+    np.testing.assert_allclose(dimuat.scorer.predict_proba(X), model.predict_proba(scaler.transform(X))[:, 1],
+                               rtol=1e-9, atol=1e-12)
+
+
+def test_publikasi_tanpa_aktivasi(publikasi):
+    a = publikasi('a')
+    b = publikasi('b', aktifkan=False)
+    assert b != a and mr.active_version(publikasi.root) == a
+
+
+def test_rollback_mengikuti_riwayat_aktivasi(publikasi):
+    a, b, c = publikasi('a'), publikasi('b'), publikasi('c')
+    assert mr.rollback(root=publikasi.root) == b
+    assert mr.rollback(root=publikasi.root) == a
+    with pytest.raises(ValueError):
+        mr.rollback(root=publikasi.root)
+    # Versi eksplisit selalu boleh; setelah itu rollback kembali ke versi sebelumnya
+    assert mr.rollback(c, root=publikasi.root) == c
+    assert mr.rollback(root=publikasi.root) == a
+
+
+def test_rollback_setelah_publikasi_ulang_isi_lama(publikasi):
+    a, b = publikasi('a'), publikasi('b')
+    assert publikasi('a') == a # Isi identik: versi lama diaktifkan lagi
+    assert mr.rollback(root=publikasi.root) == b
+
+
+def test_versi_tidak_dikenal_ditolak(publikasi):
+    publikasi('a')
+    with pytest.raises(FileNotFoundError):
+        mr.activate_version('tidakada', publikasi.root)
+
+
+def test_pemangkasan_tidak_menghapus_versi_aktif(publikasi):
+    a = publikasi('a')
+    for tag in 'bcd':
+        publikasi(tag, aktifkan=False, simpan=0)
+    dihapus = mr.prune_versions(simpan=1, root=publikasi.root)
+    tersisa = [m['versi'] for m in mr.list_versions(publikasi.root)]
+    assert a in tersisa and a not in dihapus
+    assert len(tersisa) <= 2 and len(dihapus) == 4 - len(tersisa)
+
+
+def test_watcher_menukar_versi_tanpa_restart(publikasi):
+    watcher = mr.RegistryWatcher(publikasi.root, interval=0)
+    assert watcher.model() is None
+    a = publikasi('a')
+    assert watcher.model().versi == a
+    lama = watcher.model()
+    b = publikasi('b')
+    watcher.periksa() # Sinkron; model() memuat versi baru di thread latar
+    assert watcher.model().versi == b
+    assert lama.versi == a # Pemegang referensi lama tetap memakai objeknya
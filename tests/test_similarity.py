@@ -0,0 +1,53 @@
+# Engine kesamaan yang diperbarui per hari harus sama dengan engine yang dibangun ulang
+# dari seluruh riwayat, untuk seluruh riwayat maupun window 30/90 hari.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import POLUTAN, buat_data_mentah
+from similarity import StationSimilarityEngine
+
+
+def _inkremental(df, batas, resolusi='D'):
+    tanggal = pd.to_datetime(df['tanggal_lengkap'])
+    engine = StationSimilarityEngine.from_dataframe(df.assign(tanggal_lengkap=tanggal)[tanggal < batas],
+                                                    resolusi=resolusi)
+    baru = df.assign(tanggal_lengkap=tanggal)[tanggal >= batas]
+    for hari, df_hari in baru.groupby(engine.bucket(baru['tanggal_lengkap'])):
+        engine.update_day(hari, df_hari)
+    return engine
+
+
+@pytest.mark.parametrize('freq, periode, resolusi', [('D', 200, 'D'), ('h', 24 * 30, '1h')])
+def test_update_per_hari_sama_dengan_build_penuh(freq, periode, resolusi):
+    df = buat_data_mentah(freq=freq, periode=periode, stasiun=('DKI1', 'DKI2', 'DKI3 Jagakarsa', 'DKI4'))
+    batas = pd.to_datetime(df['tanggal_lengkap']).quantile(0.6)
+    # Stasiun yang baru muncul setelah state dibangun ikut diperhitungkan
+    df = df[~((df['stasiun'] == 'DKI4') & (pd.to_datetime(df['tanggal_lengkap']) < batas))]
+
+    inkremental = _inkremental(df, batas, resolusi)
+    penuh = StationSimilarityEngine.from_dataframe(df.assign(tanggal_lengkap=pd.to_datetime(df['tanggal_lengkap'])),
+                                                   resolusi=resolusi)
+    assert sorted(inkremental.stations) == penuh.stations
+    for window in (None, *penuh.windows):
+        for polutan in POLUTAN:
+            harapan = penuh.similarity(polutan, window)
+            hasil = inkremental.similarity(polutan, window).reindex(index=harapan.index, columns=harapan.columns)
+            np.testing.assert_allclose(hasil.to_numpy(), harapan.to_numpy(), rtol=1e-9, atol=1e-12,
+                                       err_msg=f'{polutan} window={window}')
+
+
+def test_hari_lama_ditolak():
+    df = buat_data_mentah(periode=40)
+    engine = StationSimilarityEngine.from_dataframe(df.assign(tanggal_lengkap=pd.to_datetime(df['tanggal_lengkap'])))
+    with pytest.raises(ValueError):
+        engine.update_day(engine.last_day, df.head(3))
+
+
+def test_indeks_tetangga_tanpa_diri_sendiri():
+    df = buat_data_mentah(periode=60, stasiun=('DKI1', 'DKI2', 'DKI3', 'DKI4', 'DKI5'))
+    index = StationSimilarityEngine.from_dataframe(df).neighbour_index(k=2)
+    for stasiun, tetangga in index.items():
+        assert len(tetangga) == 2 and stasiun not in [nama for nama, _ in tetangga]
+        assert tetangga[0][1] >= tetangga[1][1]
@@ -0,0 +1,32 @@
+# Imputer tuning harus di-fit sebelum lipatan uji pertama, dengan lipatan dihitung dari
+# dataset model final (baris yang dibuang finalisasi menggeser batas lipatan).
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import tuning
+from conftest import buat_data_mentah
+
+
+def test_cutoff_imputer_tidak_melewati_lipatan_pertama(tmp_path, monkeypatch):
+    mentah = buat_data_mentah(periode=300)
+    mentah['parameter_kritis'] = 'PM25'
+    # Seperti data asli: satu periode panjang tanpa parameter_kritis dibuang utuh oleh dropna finalisasi
+    tanggal = pd.to_datetime(mentah['tanggal_lengkap'])
+    mentah.loc[tanggal >= '2024-06-01', 'parameter_kritis'] = np.nan
+    path = tmp_path / 'gabungan.csv'
+    mentah.to_csv(path, index=False)
+    monkeypatch.setattr(tuning, 'FILE_DATA', str(path))
+
+    n_lipatan = 3
+    # Batas dari tanggal mentah akan jatuh setelah awal lipatan yang sebenarnya
+    lipatan_mentah = tuning.lipatan_walk_forward(tanggal, n_lipatan)
+    paths = tuning.siapkan_fitur(['3D', '7D'], n_lipatan, cache_dir=str(tmp_path / 'cache'))
+
+    for path in paths.values():
+        cache = joblib.load(path)
+        lipatan = cache['lipatan']
+        assert lipatan == tuning.lipatan_walk_forward(cache['tanggal'], n_lipatan)
+        assert lipatan[0][0] < lipatan_mentah[0][0]
+        assert cache['cutoff_imputer'] <= lipatan[0][0]
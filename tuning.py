@@ -0,0 +1,287 @@
+# tuning.py
+# Tuning walk-forward (rolling-origin) model CBF: C, bobot kelas, ukuran window lag/roll,
+# dan threshold keputusan. Split berdasarkan tanggal (latih = masa lalu, uji = blok berikutnya),
+# kombinasi dievaluasi paralel di process pool, dan fitur per window di-cache ke disk.
+#
+# Jalankan:  python tuning.py [--acak N] [--lipatan K] [--workers W] [--paksa]
+# Output:    tuning_leaderboard.csv dan best_config.json (dibaca config.KONFIG_MODEL untuk model produksi)
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from config import BEST_CONFIG_PATH, BOBOT_KELAS
+from evaluation import metrik_per_threshold
+from ingest import hash_file
+from model_registry import tulis_atomik
+from preprocessing import (
+    FILE_DATA, bersihkan_data_mentah, finalisasi_dataset, imputasi_polutan, pilih_fitur_input,
+    tambah_fitur_lag_roll, tambah_fitur_waktu
+)
+
+TUNING_CACHE_DIR = 'cache_tuning_ispu'
+LEADERBOARD_PATH = 'tuning_leaderboard.csv'
+N_LIPATAN = 4
+SEED = 42
+
+# Naikkan jika logika fitur berubah, agar cache fitur lama otomatis tidak dipakai
+VERSI_FITUR = 4
+
+RUANG_PENCARIAN = {
+    'window': ['3D', '7D', '14D'], # Window rolling berbasis waktu (lihat preprocessing.WINDOW_ROLL)
+    'C': [0.01, 0.1, 1.0, 10.0],
+    'class_weight': list(BOBOT_KELAS),
+}
+
+THRESHOLDS = np.round(np.arange(0.05, 0.951, 0.05), 2)
+BETA = 2.0 # F-beta dengan beta > 1: recall TIDAK SEHAT lebih diutamakan dari presisi
+
+
+# --- A. FITUR PER WINDOW (di-cache per hash data + window) ---
+def _path_cache(window, cache_dir):
+    return os.path.join(cache_dir, f"fitur_w{window}.pkl")
+
+
+def bangun_fitur_window(df_dasar, imputer, window):
+    """Dataset model (X, y, tanggal) untuk satu ukuran window lag/roll."""
+    df = tambah_fitur_lag_roll(df_dasar.copy(), imputer, window=window)
+    df_clean = finalisasi_dataset(df)
+    fitur_list = pilih_fitur_input(df_clean)
+    return {
+        'X': df_clean[fitur_list].fillna(0).to_numpy(dtype=np.float64),
+        'y': df_clean['kategori_TIDAK SEHAT'].to_numpy(dtype=bool),
+        'tanggal': df_clean['tanggal_lengkap'].to_numpy(dtype='datetime64[ns]'),
+        'fitur_list': fitur_list,
+    }
+
+
+def imputasi_sebelum_lipatan(df_bersih, window, n_lipatan=N_LIPATAN):
+    """(df_imputasi, imputer, lipatan, data_window) dengan imputer di-fit sebelum lipatan uji pertama.
+
+    Lipatan dihitung dari tanggal dataset model FINAL (setelah dropna finalisasi), bukan dari
+    tanggal mentah: baris yang dibuang finalisasi bisa menggeser batas lipatan lebih awal.
+    Jika lipatan pertama ternyata mulai sebelum cutoff imputer, imputer di-fit ulang pada
+    awal lipatan itu sampai `imputer.cutoff <= lipatan[0][0]` (cutoff hanya bisa mundur).
+    """
+    cutoff = lipatan_walk_forward(df_bersih['tanggal_lengkap'].dropna(), n_lipatan)[0][0]
+    while True:
+        df, imputer = imputasi_polutan(df_bersih.copy(), cutoff=cutoff)
+        df = tambah_fitur_waktu(df)
+        data = bangun_fitur_window(df, imputer, window)
+        lipatan = lipatan_walk_forward(data['tanggal'], n_lipatan)
+        if lipatan[0][0] >= cutoff:
+            return df, imputer, lipatan, data
+        cutoff = lipatan[0][0]
+
+
+def siapkan_fitur(windows, n_lipatan=N_LIPATAN, cache_dir=TUNING_CACHE_DIR, paksa=False):
+    """Memastikan cache fitur setiap window sesuai data saat ini; mengembalikan path cache per window.
+
+    Data mentah dibersihkan dan diimputasi sekali; hanya lag/roll yang dihitung per window.
+    Batas lipatan (dari dataset final) ikut disimpan di cache dan imputer di-fit sebelum
+    lipatan uji pertama, jadi tidak ada lipatan yang memakai statistik dari periode ujinya sendiri.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    digest = hash_file(FILE_DATA)
+    paths, perlu_bangun = {}, []
+    for window in windows:
+        paths[window] = _path_cache(window, cache_dir)
+        if not paksa and os.path.exists(paths[window]):
+            cache = joblib.load(paths[window])
+            if cache.get('hash') == digest and cache.get('versi') == VERSI_FITUR and cache.get('n_lipatan') == n_lipatan:
+                print(f"   [Cache]: fitur window {window} tidak berubah ({len(cache['y'])} baris).")
+                continue
+        perlu_bangun.append(window)
+
+    if perlu_bangun:
+        df_bersih = bersihkan_data_mentah(pd.read_csv(FILE_DATA))
+        df, imputer, lipatan, data = imputasi_sebelum_lipatan(df_bersih, perlu_bangun[0], n_lipatan)
+        print(f"   [Imputer]: di-fit pada tanggal < {str(imputer.cutoff)[:10]} (lipatan uji pertama mulai {str(lipatan[0][0])[:10]}).")
+        for window in perlu_bangun:
+            if window != perlu_bangun[0]:
+                data = bangun_fitur_window(df, imputer, window)
+            joblib.dump({'hash': digest, 'versi': VERSI_FITUR, 'n_lipatan': n_lipatan, 'lipatan': lipatan,
+                         'cutoff_imputer': imputer.cutoff, **data}, paths[window])
+            print(f"   [Fitur]: window {window} dibangun ({len(data['y'])} baris, {len(data['fitur_list'])} fitur).")
+    return paths
+
+
+# --- B. SPLIT WALK-FORWARD BERDASARKAN TANGGAL ---
+def lipatan_walk_forward(tanggal, n_lipatan=N_LIPATAN):
+    """Membagi tanggal unik menjadi n_lipatan+1 blok berurutan.
+
+    Lipatan k melatih dengan semua tanggal sebelum blok k dan menguji pada blok k,
+    jadi model tidak pernah melihat masa depan. Mengembalikan [(awal_uji, akhir_uji), ...].
+    """
+    hari = np.unique(tanggal)
+    if len(hari) < n_lipatan + 1:
+        raise ValueError(f"Hanya {len(hari)} tanggal unik; tidak cukup untuk {n_lipatan} lipatan.")
+    blok = np.array_split(hari, n_lipatan + 1)
+    return [(b[0], b[-1]) for b in blok[1:]]
+
+
+# --- C. WORKER (state per proses: fitur dimuat sekali, hasil scaling di-memo) ---
+_DATA = {}
+_SKALA = {}
+
+
+def _init_worker(paths):
+    for window, path in paths.items():
+        _DATA[window] = joblib.load(path)
+
+
+def _data_lipatan(window, awal, akhir):
+    """(X_latih, y_latih, X_uji, y_uji) terskala; scaler di-fit pada data latih saja."""
+    kunci = (window, awal, akhir)
+    if kunci not in _SKALA:
+        data = _DATA[window]
+        latih = data['tanggal'] < awal
+        uji = (data['tanggal'] >= awal) & (data['tanggal'] <= akhir)
+        scaler = StandardScaler().fit(data['X'][latih])
+        _SKALA[kunci] = (
+            scaler.transform(data['X'][latih]), data['y'][latih],
+            scaler.transform(data['X'][uji]), data['y'][uji],
+        )
+    return _SKALA[kunci]
+
+
+def evaluasi_kandidat(kandidat, lipatan):
+    """Melatih satu kombinasi di semua lipatan; mengembalikan probabilitas out-of-fold."""
+    mulai = time.perf_counter()
+    proba, y, id_lipatan = [], [], []
+    for k, (awal, akhir) in enumerate(lipatan):
+        X_latih, y_latih, X_uji, y_uji = _data_lipatan(kandidat['window'], awal, akhir)
+        if len(y_uji) == 0 or len(np.unique(y_latih)) < 2:
+            continue
+        model = LogisticRegression(
+            solver='liblinear', random_state=SEED, C=kandidat['C'],
+            class_weight=BOBOT_KELAS[kandidat['class_weight']]
+        )
+        model.fit(X_latih, y_latih)
+        proba.append(model.predict_proba(X_uji)[:, 1])
+        y.append(y_uji)
+        id_lipatan.append(np.full(len(y_uji), k, dtype=np.int8))
+    return {
+        **kandidat,
+        'proba': np.concatenate(proba) if proba else np.empty(0),
+        'y': np.concatenate(y) if y else np.empty(0, dtype=bool),
+        'lipatan': np.concatenate(id_lipatan) if id_lipatan else np.empty(0, dtype=np.int8),
+        'detik': time.perf_counter() - mulai,
+    }
+
+
+# --- D. SAPUAN THRESHOLD (vektor: semua threshold sekaligus) ---
+def sapu_threshold(y, proba, thresholds=THRESHOLDS, beta=BETA):
+    """Presisi, recall, dan F-beta untuk setiap threshold (array sepanjang thresholds)."""
+    metrik = metrik_per_threshold(y, proba, thresholds, beta)
+    return metrik['presisi'], metrik['recall'], metrik[f'f{beta:g}']
+
+
+def ringkas_hasil(hasil, thresholds=THRESHOLDS, beta=BETA):
+    """Satu baris leaderboard: threshold terbaik untuk kombinasi ini dan sebaran skornya antar lipatan."""
+    presisi, recall, fbeta = sapu_threshold(hasil['y'], hasil['proba'], thresholds, beta)
+    i = int(np.argmax(fbeta))
+    per_lipatan = [
+        sapu_threshold(hasil['y'][hasil['lipatan'] == k], hasil['proba'][hasil['lipatan'] == k],
+                       thresholds[i:i + 1], beta)[2][0]
+        for k in np.unique(hasil['lipatan'])
+    ]
+    return {
+        'window': hasil['window'],
+        'C': hasil['C'],
+        'class_weight': hasil['class_weight'],
+        'threshold': float(thresholds[i]),
+        f'f{beta:g}': float(fbeta[i]),
+        f'f{beta:g}_std_lipatan': float(np.std(per_lipatan)) if per_lipatan else np.nan,
+        'presisi': float(presisi[i]),
+        'recall': float(recall[i]),
+        'n_uji': int(len(hasil['y'])),
+        'detik': round(hasil['detik'], 3),
+    }
+
+
+# --- E. PENCARIAN ---
+def daftar_kandidat(ruang=RUANG_PENCARIAN, n_acak=None, seed=SEED):
+    """Semua kombinasi grid, atau n_acak kombinasi acak (tanpa pengulangan) dari grid yang sama."""
+    grid = [dict(zip(ruang, nilai)) for nilai in itertools.product(*ruang.values())]
+    if n_acak is not None and n_acak < len(grid):
+        rng = np.random.default_rng(seed)
+        grid = [grid[i] for i in sorted(rng.choice(len(grid), size=n_acak, replace=False))]
+    return grid
+
+
+def jalankan_tuning(n_acak=None, n_lipatan=N_LIPATAN, max_workers=None, paksa=False):
+    print("--- ⚙️ TUNING WALK-FORWARD: C, BOBOT KELAS, WINDOW, THRESHOLD ---")
+    try:
+        paths = siapkan_fitur(RUANG_PENCARIAN['window'], n_lipatan, paksa=paksa)
+    except FileNotFoundError:
+        print(f"❌ ERROR: File '{FILE_DATA}' tidak ditemukan. Jalankan `python ingest.py` terlebih dahulu.")
+        return None
+
+    # Batas lipatan yang sama dengan yang dipakai untuk cutoff imputer (tersimpan di cache fitur),
+    # jadi semua window diuji pada periode yang sama
+    lipatan = joblib.load(paths[RUANG_PENCARIAN['window'][0]])['lipatan']
+    for k, (awal, akhir) in enumerate(lipatan, start=1):
+        print(f"   [Lipatan {k}]: latih < {str(awal)[:10]}, uji {str(awal)[:10]} s.d. {str(akhir)[:10]}")
+
+    kandidat = daftar_kandidat(n_acak=n_acak)
+    print(f"\n--- 🧠 MENGEVALUASI {len(kandidat)} KOMBINASI x {len(lipatan)} LIPATAN ---")
+
+    # Urut per window agar worker memakai ulang hasil scaling lipatan yang sama
+    kandidat.sort(key=lambda c: c['window'])
+    mulai = time.perf_counter()
+    baris = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(paths,)) as pool:
+        futures = [pool.submit(evaluasi_kandidat, c, lipatan) for c in kandidat]
+        for future in futures:
+            baris.append(ringkas_hasil(future.result()))
+
+    skor = f'f{BETA:g}'
+    leaderboard = pd.DataFrame(baris).sort_values([skor, 'recall'], ascending=False).reset_index(drop=True)
+    leaderboard.index += 1
+    leaderboard.to_csv(LEADERBOARD_PATH, index_label='peringkat')
+
+    terbaik = leaderboard.iloc[0]
+    best_config = {
+        'window': terbaik['window'],
+        'C': float(terbaik['C']),
+        'class_weight': terbaik['class_weight'],
+        'threshold': float(terbaik['threshold']),
+        'metrik': skor,
+        'skor': float(terbaik[skor]),
+        'presisi': float(terbaik['presisi']),
+        'recall': float(terbaik['recall']),
+        'n_lipatan': len(lipatan),
+        'data_hash': joblib.load(paths[terbaik['window']])['hash'],
+    }
+    def tulis(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(best_config, f, indent=2)
+    tulis_atomik(BEST_CONFIG_PATH, tulis)
+
+    print(leaderboard.head(10).to_string())
+    print(f"\n✅ {len(kandidat)} kombinasi selesai dalam {time.perf_counter() - mulai:.1f} detik.")
+    print(f"✅ Leaderboard tersimpan di: {LEADERBOARD_PATH}")
+    print(f"✅ Konfigurasi terbaik (threshold {best_config['threshold']}) tersimpan di: {BEST_CONFIG_PATH}")
+    print("   Jalankan ulang `python preprocessing.py` agar model produksi dilatih dengan C, bobot kelas,")
+    print("   dan window ini; threshold tersebut hanya berlaku untuk kombinasi yang sama.")
+    return leaderboard
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tuning walk-forward model CBF ISPU.")
+    parser.add_argument('--acak', type=int, default=None, help="Random search N kombinasi (default: grid penuh)")
+    parser.add_argument('--lipatan', type=int, default=N_LIPATAN, help="Jumlah lipatan walk-forward")
+    parser.add_argument('--workers', type=int, default=None, help="Jumlah proses worker")
+    parser.add_argument('--paksa', action='store_true', help="Bangun ulang cache fitur")
+    args = parser.parse_args()
+    jalankan_tuning(n_acak=args.acak, n_lipatan=args.lipatan, max_workers=args.workers, paksa=args.paksa)